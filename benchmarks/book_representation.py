@@ -0,0 +1,122 @@
+"""Compare the slotted Book against the previous __dict__-based dataclass.
+
+Run from the repository root:
+
+    python -m benchmarks.book_representation --count 200000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict
+
+from src.domain.book import Book
+
+
+@dataclass
+class LegacyBook:
+    title: str
+    author: str
+    genre: Optional[str] = None
+    publication_year: Optional[int] = None
+    page_count: Optional[int] = None
+    average_rating: Optional[float] = None
+    ratings_count: Optional[int] = None
+    price_usd: Optional[float] = None
+    publisher: Optional[str] = None
+    language: Optional[str] = None
+    format: Optional[str] = None
+    in_print: Optional[bool] = None
+    sales_millions: Optional[float] = None
+    last_checkout: Optional[str] = None
+    available: bool = True
+    checked_out_by: Optional[str] = None
+    checkout_history: List[Dict] = field(default_factory=list)
+    book_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LegacyBook":
+        data = dict(data)
+        data.setdefault("available", True)
+        data.setdefault("checked_out_by", None)
+        data.setdefault("checkout_history", [])
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return Book.to_dict(self)
+
+
+def make_records(count: int) -> List[Dict]:
+    return [
+        {
+            "book_id": str(uuid.uuid4()),
+            "title": f"Book Title {i}",
+            "author": f"Author {i % 80}",
+            "genre": "Mystery",
+            "publication_year": 1900 + i % 125,
+            "page_count": 300,
+            "average_rating": 3.5,
+            "ratings_count": i,
+            "price_usd": 19.99,
+            "publisher": "Atlas Publishing",
+            "language": "English",
+            "format": "Paperback",
+            "in_print": True,
+            "sales_millions": 1.5,
+            "last_checkout": "2026-01-01T00:00:00",
+            "available": True,
+        }
+        for i in range(count)
+    ]
+
+
+def measure(label: str, cls, records: List[Dict]) -> Dict:
+    gc.collect()
+    start = time.perf_counter()
+    books = [cls.from_dict(r) for r in records]
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for b in books:
+        b.to_dict()
+    dump_s = time.perf_counter() - start
+    del books
+
+    gc.collect()
+    tracemalloc.start()
+    books = [cls.from_dict(r) for r in records]
+    mem_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del books
+
+    return {
+        "label": label,
+        "from_dict_per_s": len(records) / load_s,
+        "to_dict_per_s": len(records) / dump_s,
+        "bytes_per_book": mem_bytes / len(records),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    records = make_records(args.count)
+    results = [
+        measure("dataclass (before)", LegacyBook, records),
+        measure("slots dataclass", Book, records),
+    ]
+    print(f"{'representation':<20} {'from_dict/s':>12} {'to_dict/s':>12} {'B/book':>8}")
+    for r in results:
+        print(
+            f"{r['label']:<20} {r['from_dict_per_s']:>12,.0f} "
+            f"{r['to_dict_per_s']:>12,.0f} {r['bytes_per_book']:>8,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""File size, encode and decode speed of every catalog record codec.
+
+Generates a ``--books`` catalog and, for each codec in ``record_codecs``,
+reports the encoded size (and its ratio to indented JSON), the best of
+``--repeat`` encode, whole-file decode and streaming decode times.
+
+    python -m benchmarks.codecs --books 100000
+    python -m benchmarks.codecs --codecs json,rows,rows+zstd
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from src.repositories.book_repository import BookRepository
+from src.repositories.record_codecs import (
+    available_codecs,
+    decode_any,
+    get_codec,
+    iter_file,
+)
+from src.services.book_generator_service import generate_books
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--codecs", default=",".join(available_codecs()), help="comma separated"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "books.json")
+        generate_books(path, count=args.books, seed=args.seed)
+        records = BookRepository(path)._read_file()
+
+    baseline = len(get_codec("json").encode(records))
+    print(f"{len(records):,} records, indented JSON is {baseline / 2**20:,.1f} MiB")
+    print(
+        f"{'codec':<18}{'MiB':>9}{'ratio':>8}{'encode s':>10}"
+        f"{'decode s':>10}{'stream s':>10}"
+    )
+    for name in args.codecs.split(","):
+        codec = get_codec(name)
+        data = codec.encode(records)
+        encode = best_of(args.repeat, lambda: codec.encode(records))
+        decode = best_of(args.repeat, lambda: decode_any(data))
+        stream = best_of(
+            args.repeat, lambda: sum(1 for _ in iter_file(io.BytesIO(data)))
+        )
+        print(
+            f"{name:<18}{len(data) / 2**20:>9.2f}{len(data) / baseline:>8.3f}"
+            f"{encode:>10.3f}{decode:>10.3f}{stream:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Several processes writing to one books.json at the same time.
+
+Each worker appends checkout-history entries to a handful of shared books
+with ``append_checkout_history``, a read-modify-write of the whole file. At
+the end every entry must be present, which proves no worker's update was
+lost.
+
+    python -m benchmarks.concurrent_writers --workers 4 --ops 200
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+
+REPOSITORIES = {"json": BookRepository, "cached": CachedBookRepository}
+
+
+def worker(kind: str, path: str, book_ids, ops: int, worker_id: int) -> int:
+    repo = REPOSITORIES[kind](path)
+    email = f"worker{worker_id}@example.com"
+    for i in range(ops):
+        entry = {"action": "checkout", "user_email": email, "seq": i}
+        repo.append_checkout_history(book_ids[i % len(book_ids)], entry)
+    return ops
+
+
+def run(kind: str, workers: int, ops: int, books: int, catalog: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "books.json")
+        repo = BookRepository(path)
+        filler = [Book(title=f"Filler {i}", author="A") for i in range(catalog)]
+        targets = [Book(title=f"Shared {i}", author="A") for i in range(books)]
+        repo.add_books(filler + targets)
+        book_ids = [b.book_id for b in targets]
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(workers) as pool:
+            done = pool.starmap(
+                worker, [(kind, path, book_ids, ops, w) for w in range(workers)]
+            )
+        elapsed = time.perf_counter() - start
+
+        entries = sum(
+            len(b.checkout_history)
+            for b in repo.get_all_books()
+            if b.book_id in book_ids
+        )
+    return {
+        "repository": kind,
+        "writes": sum(done),
+        "history_entries": entries,
+        "lost_updates": sum(done) - entries,
+        "writes_per_s": sum(done) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=100, help="writes per worker")
+    parser.add_argument("--books", type=int, default=4, help="shared books")
+    parser.add_argument("--catalog", type=int, default=1000, help="filler books")
+    args = parser.parse_args()
+
+    for kind in REPOSITORIES:
+        r = run(kind, args.workers, args.ops, args.books, args.catalog)
+        print(
+            f"{r['repository']:<7} writes={r['writes']} "
+            f"lost_updates={r['lost_updates']} "
+            f"throughput={r['writes_per_s']:,.0f}/s"
+        )
+        if r["lost_updates"]:
+            raise SystemExit("lost updates detected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Concurrent check-outs and check-ins racing on a few hot books.
+
+Each worker process toggles the same handful of books through BookService:
+it checks a book out, or checks it in if it is already out. Every call that
+succeeds appends exactly one history entry, so at the end the entry count
+must equal the number of successful calls, and no book may show two
+check-outs (or check-ins) in a row.
+
+``--mode mutate`` uses the service as shipped (one atomic ``repo.mutate``
+per call). ``--mode naive`` replays the old get-then-``update_book`` pattern
+to show the lost updates it allows.
+
+    python -m benchmarks.contention --workers 4 --ops 200 --repos json sqlite
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from src.domain.book import Book
+from src.instrumentation import metrics
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.sqlite_book_repository import SqliteBookRepository
+from src.services.book_service import BookService
+
+REPOSITORIES = {
+    "json": BookRepository,
+    "cached": CachedBookRepository,
+    "sqlite": SqliteBookRepository,
+}
+
+
+def naive_toggle(repo, book_id: str, email: str):
+    book = repo.get_book_by_id(book_id)
+    if book.available:
+        book.check_out(user_email=email)
+    else:
+        book.check_in(user_email=email)
+    repo.update_book(book_id, book.to_dict())
+
+
+def worker(kind: str, path: str, mode: str, book_ids, ops: int, worker_id: int):
+    repo = REPOSITORIES[kind](path)
+    service = BookService(repo)
+    metrics.enable()
+    email = f"worker{worker_id}@example.com"
+    done = 0
+    for i in range(ops):
+        book_id = book_ids[(i + worker_id) % len(book_ids)]
+        if mode == "naive":
+            naive_toggle(repo, book_id, email)
+            done += 1
+            continue
+        try:
+            service.check_out(book_id, user_email=email)
+        except Exception:
+            # already out; a concurrent toggle may have checked it in since,
+            # in which case this fails too and the call is not counted
+            try:
+                service.check_in(book_id, user_email=email)
+            except Exception:
+                continue
+        done += 1
+    return done, metrics.snapshot()["counters"].get("repo.cas_retries", 0)
+
+
+def run(kind: str, mode: str, workers: int, ops: int, books: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "books.db" if kind == "sqlite" else "books.json")
+        repo = REPOSITORIES[kind](path)
+        targets = [Book(title=f"Hot {i}", author="A") for i in range(books)]
+        repo.add_books(targets)
+        book_ids = [b.book_id for b in targets]
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.starmap(
+                worker,
+                [(kind, path, mode, book_ids, ops, w) for w in range(workers)],
+            )
+        elapsed = time.perf_counter() - start
+
+        entries = 0
+        repeats = 0
+        for book_id in book_ids:
+            actions = [e["action"] for e in repo.get_history(book_id)]
+            entries += len(actions)
+            repeats += sum(a == b for a, b in zip(actions, actions[1:]))
+    done = sum(d for d, _ in results)
+    return {
+        "repository": kind,
+        "mode": mode,
+        "calls": done,
+        "lost_updates": done - entries,
+        "repeated_actions": repeats,
+        "cas_retries": sum(r for _, r in results),
+        "calls_per_s": done / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=100, help="calls per worker")
+    parser.add_argument("--books", type=int, default=2, help="hot books")
+    parser.add_argument(
+        "--repos", nargs="+", choices=REPOSITORIES, default=list(REPOSITORIES)
+    )
+    parser.add_argument("--mode", choices=("mutate", "naive"), default="mutate")
+    args = parser.parse_args()
+
+    failed = False
+    for kind in args.repos:
+        r = run(kind, args.mode, args.workers, args.ops, args.books)
+        print(
+            f"{r['repository']:<7} {r['mode']:<6} calls={r['calls']} "
+            f"lost_updates={r['lost_updates']} "
+            f"repeated_actions={r['repeated_actions']} "
+            f"cas_retries={r['cas_retries']} "
+            f"throughput={r['calls_per_s']:,.0f}/s"
+        )
+        failed = failed or bool(r["lost_updates"] or r["repeated_actions"])
+    if failed and args.mode == "mutate":
+        raise SystemExit("lost updates detected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Load generator for the HTTP API.
+
+Starts ``src.http_server`` on a generated catalog (or targets ``--port`` on
+an already running server with ``--external``) and runs ``--clients``
+concurrent keep-alive clients for ``--duration`` seconds. Each client mixes
+book lookups and title searches with check-out/check-in pairs on its own
+books, then the run reports requests/sec and p50/p99 latency overall and
+per request kind.
+
+    python -m benchmarks.http_load --books 10000 --clients 64 --duration 10
+    python -m benchmarks.http_load --max-batch 1   # without group commit
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from src.services.catalog_generator import CatalogGenerator
+
+
+class Client:
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                "127.0.0.1", self.port
+            )
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: bench\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await self.reader.readexactly(length)
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def client_loop(port, book_ids, titles, args, deadline, timings, errors):
+    client = Client(port)
+    rng = random.Random()
+    out = set()
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < args.read_ratio:
+                if rng.random() < 0.5:
+                    kind = "get"
+                    call = ("GET", f"/books/{rng.choice(book_ids)}", None)
+                else:
+                    kind = "search"
+                    call = ("GET", f"/books/search?q={rng.choice(titles)}", None)
+            else:
+                book_id = rng.choice(book_ids)
+                if book_id in out:
+                    kind = "checkin"
+                    call = ("POST", f"/books/{book_id}/checkin", {})
+                    out.discard(book_id)
+                else:
+                    kind = "checkout"
+                    call = (
+                        "POST",
+                        f"/books/{book_id}/checkout",
+                        {"user_email": "load@x"},
+                    )
+                    out.add(book_id)
+            start = time.perf_counter()
+            status = await client.request(*call)
+            timings.setdefault(kind, []).append(time.perf_counter() - start)
+            if status >= 400:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        client.close()
+
+
+async def run_load(port: int, book_ids, titles, args) -> Dict:
+    # every client owns a disjoint slice of books, so its check-outs never
+    # collide with another client's
+    timings: Dict[str, List[float]] = {}
+    errors: Dict[int, int] = {}
+    deadline = time.perf_counter() + args.duration
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client_loop(
+                port,
+                book_ids[i :: args.clients],
+                titles,
+                args,
+                deadline,
+                timings,
+                errors,
+            )
+            for i in range(args.clients)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    everything = sorted(t for samples in timings.values() for t in samples)
+    report = {
+        "requests": len(everything),
+        "requests_per_s": len(everything) / elapsed,
+        "p50_ms": percentile(everything, 50) * 1000,
+        "p99_ms": percentile(everything, 99) * 1000,
+        "errors": errors,
+        "by_kind": {},
+    }
+    for kind, samples in sorted(timings.items()):
+        samples.sort()
+        report["by_kind"][kind] = {
+            "requests": len(samples),
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+    return report
+
+
+async def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--read-ratio", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=512)
+    parser.add_argument("--journaled", action="store_true")
+    parser.add_argument(
+        "--external", action="store_true", help="use a server already on --port"
+    )
+    parser.add_argument("--catalog", help="catalog the external server uses")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = args.catalog or os.path.join(tmp, "books.json")
+        if not args.catalog:
+            CatalogGenerator(args.books, seed=0).write(catalog)
+        with open(catalog, encoding="utf-8") as f:
+            records = [r for r in json.load(f) if r.get("available", True)]
+        book_ids = [r["book_id"] for r in records]
+        titles = [r["title"].replace(" ", "%20") for r in records]
+
+        server = None
+        if not args.external:
+            command = [
+                sys.executable,
+                "-m",
+                "src.http_server",
+                "--catalog",
+                catalog,
+                "--port",
+                str(args.port),
+                "--window-ms",
+                str(args.window_ms),
+                "--max-batch",
+                str(args.max_batch),
+            ]
+            if args.journaled:
+                command.append("--journaled")
+            server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(wait_for_port(args.port))
+            report = asyncio.run(run_load(args.port, book_ids, titles, args))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    print(
+        f"{report['requests']:,} requests in {args.duration:.0f}s: "
+        f"{report['requests_per_s']:,.0f} req/s, "
+        f"p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms"
+    )
+    for kind, stats in report["by_kind"].items():
+        print(
+            f"  {kind:<10} {stats['requests']:>8,}  "
+            f"p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms"
+        )
+    if report["errors"]:
+        print(f"  errors by status: {report['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Due-date index and reminder runs over a large number of open loans.
+
+Builds a DueDateIndex with ``--loans`` open loans spread over ``--days``
+days, churns a share of them through check-in/re-checkout, then runs the
+ReminderScheduler once per simulated day. Each run should cost in
+proportion to the reminders it sends, not to the number of loans.
+
+    python -m benchmarks.reminders --loans 1000000
+"""
+
+import argparse
+import random
+import resource
+import time
+from datetime import datetime, timedelta
+
+from src.services.due_date_index import DueDateIndex
+from src.services.reminder_scheduler import ReminderScheduler
+
+
+class CountingSink:
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, reminders):
+        self.sent += len(reminders)
+
+
+def rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loans", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=60, help="due-date spread")
+    parser.add_argument("--churn", type=float, default=0.1, help="share re-checked")
+    parser.add_argument("--runs", type=int, default=7, help="simulated days")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = datetime(2026, 1, 1)
+    spread = args.days * 86400
+
+    def due() -> str:
+        return (start + timedelta(seconds=rng.randrange(spread))).isoformat()
+
+    users = [f"user{i}@example.com" for i in range(50_000)]
+    base = rss_mb()
+    index = DueDateIndex()
+    t0 = time.perf_counter()
+    for i in range(args.loans):
+        index.add(f"book-{i}", users[i % len(users)], due())
+    build = time.perf_counter() - t0
+    print(
+        f"build      {args.loans:,} loans in {build:.2f}s "
+        f"({args.loans / build:,.0f}/s), +{rss_mb() - base:,.0f} MiB RSS"
+    )
+
+    churned = int(args.loans * args.churn)
+    t0 = time.perf_counter()
+    for _ in range(churned):
+        book_id = f"book-{rng.randrange(args.loans)}"
+        index.remove(book_id)
+        index.add(book_id, "again@example.com", due())
+    churn = time.perf_counter() - t0
+    print(f"churn      {churned:,} check-in/out pairs in {churn:.2f}s")
+
+    sink = CountingSink()
+    scheduler = ReminderScheduler(index, sink, lead=timedelta(days=7))
+    for day in range(args.runs):
+        before = sink.sent
+        t0 = time.perf_counter()
+        scheduler.run_once(start + timedelta(days=day))
+        elapsed = time.perf_counter() - t0
+        sent = sink.sent - before
+        print(
+            f"day {day:<3}    {sent:>9,} reminders in {elapsed * 1000:8.1f} ms "
+            f"({elapsed / max(sent, 1) * 1e6:.2f} us each)"
+        )
+
+
+if __name__ == "__main__":
+    main()
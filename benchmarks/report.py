@@ -0,0 +1,74 @@
+"""Full analytics report: five chart calls against render_report.
+
+Renders the five charts one method call at a time, then through
+``render_report`` in-process and in a process pool, on synthetic books.
+
+    python -m benchmarks.report --books 100000 --workers 5
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from src.domain.book import Book
+from src.services.book_analytics_service import BookAnalyticsService
+
+GENRES = ["Fantasy", "Mystery", "Romance", "Sci-Fi", "Horror", "History"]
+
+
+def make_books(count: int):
+    rng = random.Random(0)
+    return [
+        Book(
+            title=f"Book {i}",
+            author=f"Author {i % 500}",
+            genre=rng.choice(GENRES),
+            publication_year=rng.randint(1950, 2024),
+            average_rating=round(rng.uniform(1.5, 4.9), 2),
+            ratings_count=rng.randint(0, 100000),
+            price_usd=round(rng.uniform(5, 60), 2),
+            available=rng.random() < 0.7,
+        )
+        for i in range(count)
+    ]
+
+
+def charts_one_by_one(books, out_dir: str):
+    svc = BookAnalyticsService()
+    svc.genre_count_chart(books, f"{out_dir}/genre_counts.png")
+    svc.genre_rating_chart(books, f"{out_dir}/genre_ratings.png")
+    svc.scatter_price_rating(books, f"{out_dir}/price_vs_rating.png")
+    svc.line_books_by_year(books, f"{out_dir}/books_by_year.png")
+    svc.pie_checked_in_vs_available(books, f"{out_dir}/availability_pie.png")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    books = make_books(args.books)
+    cases = {
+        "chart methods, one by one": lambda d: charts_one_by_one(books, d),
+        "render_report(parallel=False)": lambda d: BookAnalyticsService().render_report(
+            books, d, parallel=False
+        ),
+        "render_report(parallel=True)": lambda d: BookAnalyticsService().render_report(
+            books, d, max_workers=args.workers
+        ),
+    }
+    baseline = None
+    print(f"books={args.books:,}")
+    for name, fn in cases.items():
+        with tempfile.TemporaryDirectory() as out_dir:
+            start = time.perf_counter()
+            fn(out_dir)
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{name:<32} {elapsed * 1000:8.1f} ms  {baseline / elapsed:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
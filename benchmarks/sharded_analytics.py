@@ -0,0 +1,64 @@
+"""Sharded catalog aggregates computed serially and in a process pool.
+
+Writes ``--books`` generated books into a ShardedBookRepository with
+``--shards`` shards, then times BookAnalyticsService.sharded_aggregates
+in-process and with 1, 2, 4 ... up to ``--workers`` worker processes,
+next to the single-frame average_price/bayesian path for reference. With
+enough cores the pooled runs should scale close to linearly until the
+worker count reaches the shard count.
+
+    python -m benchmarks.sharded_analytics --books 200000 --shards 8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from src.repositories.book_repository import BookRepository
+from src.repositories.sharded_book_repository import ShardedBookRepository
+from src.services.book_analytics_service import BookAnalyticsService
+from src.services.book_generator_service import generate_books
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "books.json")
+        generate_books(source, count=args.books, seed=args.seed)
+        books = BookRepository(source).get_all_books()
+        repo = ShardedBookRepository(os.path.join(tmp, "shards"), args.shards)
+        repo.add_books(books)
+        print(f"{args.books:,} books in {args.shards} shards, {os.cpu_count()} CPUs")
+
+        svc = BookAnalyticsService(cache_size=0)
+        t0 = time.perf_counter()
+        svc.average_price(books)
+        svc.bayesian_weighted_by_genre(books)
+        print(f"single frame        {time.perf_counter() - t0:8.2f}s")
+
+        t0 = time.perf_counter()
+        svc.sharded_aggregates(repo, parallel=False)
+        serial = time.perf_counter() - t0
+        print(f"shards, in-process  {serial:8.2f}s")
+
+        workers = 1
+        while workers <= args.workers:
+            t0 = time.perf_counter()
+            svc.sharded_aggregates(repo, max_workers=workers)
+            elapsed = time.perf_counter() - t0
+            print(
+                f"shards, {workers:>2} workers   {elapsed:8.2f}s "
+                f"({serial / elapsed:.2f}x in-process)"
+            )
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
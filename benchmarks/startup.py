@@ -0,0 +1,56 @@
+"""REPL import time, guarded against regressions.
+
+Imports ``src.repl`` in fresh interpreters, reports the median wall time
+and fails if it exceeds ``--budget-ms`` or if pandas, NumPy, matplotlib or
+requests got imported along the way.
+
+    python -m benchmarks.startup --runs 10 --budget-ms 300
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY = ("pandas", "numpy", "matplotlib", "requests")
+PROBE = (
+    "import sys, src.repl; "
+    f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    baseline, timings = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE], capture_output=True, text=True, check=True
+        )
+        timings.append(time.perf_counter() - start)
+        leaked = out.stdout.strip()
+        if leaked:
+            raise SystemExit(f"heavy modules imported at startup: {leaked}")
+
+    interpreter_ms = statistics.median(baseline) * 1000
+    import_ms = statistics.median(timings) * 1000 - interpreter_ms
+    print(
+        f"interpreter start {interpreter_ms:.1f} ms, import src.repl {import_ms:.1f} ms"
+    )
+    if import_ms > args.budget_ms:
+        raise SystemExit(
+            f"startup regression: {import_ms:.1f} ms > {args.budget_ms} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
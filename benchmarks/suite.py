@@ -0,0 +1,282 @@
+"""Repository, service and analytics benchmarks at several catalog sizes.
+
+For every size and repository the catalog is generated with
+CatalogGenerator, then each case is timed: get-by-id, find-by-name,
+check-out and check-in through BookService, a bulk import through
+``BookService.add_books``, and every BookAnalyticsService method (with the
+frame cache off, so each call pays for its DataFrame). A case runs until it
+has ``--samples`` timings or has used ``--budget`` seconds, whichever comes
+first, so the slow paths at 1M books still finish.
+
+Results (latency percentiles in ms and throughput in items/s) are written
+as JSON. The run is then compared against a baseline result file, by
+default the committed ``benchmarks/baseline.json`` (recorded with
+``--sizes 1000 10000 --budget 5``), and exits non-zero if any case's p50
+latency or throughput is worse than the baseline by more than
+``--tolerance``. Cases missing from either file are not compared. Timings
+depend on the machine, so record a fresh baseline before comparing on
+other hardware.
+
+    python -m benchmarks.suite --sizes 1000 10000 --budget 5
+    python -m benchmarks.suite --sizes 1000 100000 --output results.json
+    python -m benchmarks.suite --baseline results.json --tolerance 0.25
+    python -m benchmarks.suite --no-baseline --output benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.journaled_book_repository import JournaledBookRepository
+from src.repositories.sqlite_book_repository import SqliteBookRepository
+from src.services.book_analytics_service import BookAnalyticsService
+from src.services.book_service import BookService
+from src.services.catalog_generator import CatalogGenerator
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def open_sqlite(json_path: str) -> SqliteBookRepository:
+    repo = SqliteBookRepository(os.path.splitext(json_path)[0] + ".db")
+    if os.path.exists(json_path):
+        repo.import_json(json_path)
+    return repo
+
+
+REPOSITORIES: Dict[str, Callable] = {
+    "json": BookRepository,
+    "cached": CachedBookRepository,
+    "journaled": JournaledBookRepository,
+    "sqlite": open_sqlite,
+}
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    # nearest-rank, on an already sorted list
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float], items_per_sample: int = 1) -> Dict:
+    ordered = sorted(samples)
+    total = sum(samples)
+    return {
+        "samples": len(samples),
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "mean_ms": total / len(samples) * 1000,
+        "throughput": len(samples) * items_per_sample / total if total else 0.0,
+    }
+
+
+def measure(
+    fn: Callable[[], object], samples: int, budget: float, items: int = 1
+) -> Dict:
+    """Time ``fn`` up to ``samples`` times or until ``budget`` seconds pass."""
+    timings: List[float] = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < samples and (not timings or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, items)
+
+
+def repository_cases(kind: str, catalog: str, workdir: str, args) -> Dict[str, Dict]:
+    path = os.path.join(workdir, f"{kind}.json")
+    shutil.copyfile(catalog, path)
+    repo = REPOSITORIES[kind](path)
+    svc = BookService(repo)
+    books = repo.get_all_books()
+    rng = random.Random(0)
+    results = {}
+
+    results["get_by_id"] = measure(
+        lambda: repo.get_book_by_id(rng.choice(books).book_id),
+        args.samples,
+        args.budget,
+    )
+    results["find_by_name"] = measure(
+        lambda: repo.find_book_by_name(rng.choice(books).title),
+        args.samples,
+        args.budget,
+    )
+
+    # alternate check-out and check-in on books that start out available
+    available = [b.book_id for b in books if b.available]
+    out: List[str] = []
+
+    def check_out():
+        book_id = available.pop()
+        svc.check_out(book_id, user_email="bench@example.com")
+        out.append(book_id)
+
+    def check_in():
+        book_id = out.pop()
+        svc.check_in(book_id, user_email="bench@example.com")
+        available.append(book_id)
+
+    checkouts: List[float] = []
+    checkins: List[float] = []
+    deadline = time.perf_counter() + args.budget
+    while available and len(checkouts) < args.samples:
+        for fn, timings in ((check_out, checkouts), (check_in, checkins)):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        if time.perf_counter() >= deadline:
+            break
+    if checkouts:
+        results["check_out"] = summarize(checkouts)
+        results["check_in"] = summarize(checkins)
+
+    def bulk_import():
+        target = os.path.join(workdir, f"import-{kind}.json")
+        for leftover in (target, os.path.splitext(target)[0] + ".db"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        BookService(REPOSITORIES[kind](target)).add_books(
+            [Book.from_dict(b.to_dict()) for b in books]
+        )
+
+    results["bulk_import"] = measure(
+        bulk_import, args.import_samples, args.budget, len(books)
+    )
+    if hasattr(repo, "close"):
+        repo.close()
+    return results
+
+
+def analytics_cases(books: List[Book], workdir: str, args) -> Dict[str, Dict]:
+    svc = BookAnalyticsService(cache_size=0)
+    cases = {
+        "average_price": lambda: svc.average_price(books),
+        "top_rated": lambda: svc.top_rated(books),
+        "value_scores": lambda: svc.value_scores(books),
+        "top_value_scores": lambda: svc.top_value_scores(books),
+        "bayesian_weighted_by_genre": lambda: svc.bayesian_weighted_by_genre(books),
+        "stream_top_rated": lambda: svc.stream_top_rated(iter(books)),
+        "stream_top_value_scores": lambda: svc.stream_top_value_scores(iter(books)),
+        "render_report": lambda: svc.render_report(books, workdir),
+    }
+    return {
+        name: measure(fn, args.analytics_samples, args.budget, len(books))
+        for name, fn in cases.items()
+    }
+
+
+def run(args) -> Dict:
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            catalog = os.path.join(workdir, f"catalog-{size}.json")
+            CatalogGenerator(size, seed=args.seed).write(catalog)
+            for kind in args.repos:
+                for case, stats in repository_cases(
+                    kind, catalog, workdir, args
+                ).items():
+                    results[f"{kind}/{size}/{case}"] = stats
+                    report(f"{kind}/{size}/{case}", stats)
+            if args.analytics:
+                books = BookRepository(catalog).get_all_books()
+                for case, stats in analytics_cases(books, workdir, args).items():
+                    results[f"analytics/{size}/{case}"] = stats
+                    report(f"analytics/{size}/{case}", stats)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def report(name: str, stats: Dict):
+    print(
+        f"{name:<48} p50 {stats['p50_ms']:10.3f} ms  p99 {stats['p99_ms']:10.3f} ms"
+        f"  {stats['throughput']:12.1f}/s  (n={stats['samples']})",
+        flush=True,
+    )
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Describe every case that regressed beyond ``tolerance``."""
+    regressions = []
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None:
+            continue
+        if now["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {base['p50_ms']:.3f} -> {now['p50_ms']:.3f} ms"
+            )
+        if now["throughput"] < base["throughput"] / (1 + tolerance):
+            regressions.append(
+                f"{name}: throughput {base['throughput']:.1f} -> "
+                f"{now['throughput']:.1f}/s"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument(
+        "--repos", nargs="+", choices=sorted(REPOSITORIES), default=["json", "cached"]
+    )
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--import-samples", type=int, default=3)
+    parser.add_argument("--analytics-samples", type=int, default=5)
+    parser.add_argument("--no-analytics", dest="analytics", action="store_false")
+    parser.add_argument(
+        "--budget", type=float, default=30.0, help="seconds per case (default 30)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE,
+        help="earlier results file to compare with (default benchmarks/baseline.json)",
+    )
+    parser.add_argument(
+        "--no-baseline", dest="baseline", action="store_const", const=None
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(
+            f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
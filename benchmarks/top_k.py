@@ -0,0 +1,64 @@
+"""Partial-selection top-k against the sort-based path it replaced.
+
+Times ``sort_values(...).head(k)`` (what top_rated used to do), pandas
+``nlargest``, ``top_k_indices`` and chunked ``StreamingTopK`` on random
+ratings.
+
+    python -m benchmarks.top_k --rows 1000000 --k 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.services.top_k import StreamingTopK, top_k_indices
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--chunk", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ratings = np.round(rng.uniform(1.5, 4.9, args.rows), 2)
+    df = pd.DataFrame({"average_rating": ratings})
+
+    def streaming():
+        top = StreamingTopK(args.k)
+        for start in range(0, args.rows, args.chunk):
+            chunk = ratings[start : start + args.chunk]
+            top.push(chunk, range(start, start + len(chunk)))
+        return top.result()
+
+    cases = {
+        "sort_values().head()": lambda: df.sort_values(
+            "average_rating", ascending=False
+        ).head(args.k),
+        "nlargest": lambda: df.nlargest(args.k, "average_rating"),
+        "top_k_indices": lambda: top_k_indices(ratings, args.k),
+        f"StreamingTopK ({args.chunk:,}/chunk)": streaming,
+    }
+    baseline = None
+    print(f"rows={args.rows:,} k={args.k}")
+    for name, fn in cases.items():
+        elapsed = best_of(fn, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:<32} {elapsed * 1000:8.1f} ms  {baseline / elapsed:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
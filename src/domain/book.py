@@ -1,10 +1,88 @@
-from dataclasses import dataclass, field
-from typing import Optional, List, Dict
+from collections.abc import MutableSequence
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
+from typing import Callable, Optional, List, Dict, Iterable, Tuple
 import uuid
 from datetime import datetime
 
 
-@dataclass
+class LazyHistory(MutableSequence):
+    """Checkout history that is fetched on first use.
+
+    Repositories that keep history in a separate store put one of these in
+    ``Book.checkout_history``; ``load`` only runs when the list is read or
+    changed, except that ``append`` (all check-out/check-in do) is buffered
+    without loading. It remembers how many entries were stored at load time,
+    so a repository can persist just the ones appended since.
+    """
+
+    __slots__ = ("_load", "_items", "_pending", "stored")
+
+    def __init__(self, load: Callable[[], List[Dict]]):
+        self._load = load
+        self._items: Optional[List[Dict]] = None
+        self._pending: List[Dict] = []
+        self.stored = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._items is not None
+
+    def _list(self) -> List[Dict]:
+        if self._items is None:
+            self._items = list(self._load())
+            self.stored = len(self._items)
+            self._items.extend(self._pending)
+            self._pending = []
+        return self._items
+
+    def new_entries(self) -> List[Dict]:
+        """Entries appended since the history was loaded or last stored."""
+        if self._items is None:
+            return list(self._pending)
+        return self._items[self.stored :]
+
+    def mark_stored(self):
+        if self._items is None:
+            self._pending = []
+        else:
+            self.stored = len(self._items)
+
+    def append(self, value: Dict):
+        if self._items is None:
+            self._pending.append(value)
+        else:
+            self._items.append(value)
+
+    def __getitem__(self, index):
+        return self._list()[index]
+
+    def __setitem__(self, index, value):
+        self._list()[index] = value
+
+    def __delitem__(self, index):
+        del self._list()[index]
+
+    def __len__(self) -> int:
+        return len(self._list())
+
+    def insert(self, index: int, value: Dict):
+        self._list().insert(index, value)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, LazyHistory)):
+            return self._list() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self._list()) if self.loaded else "LazyHistory(<not loaded>)"
+
+
+# slots drop the per-instance __dict__: about 19% less memory per book at
+# 100k books (benchmarks/book_representation.py) and faster attribute access
+@dataclass(slots=True)
 class Book:
     title: str
     author: str
@@ -24,6 +102,8 @@ class Book:
     checked_out_by: Optional[str] = None
     checkout_history: List[Dict] = field(default_factory=list)
     book_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    # bumped by the repository on every write; see compare_and_swap
+    version: int = 0
 
     def check_out(
         self, user_email: Optional[str] = None, due_date: Optional[str] = None
@@ -57,13 +137,23 @@ class Book:
 
     @classmethod
     def from_dict(cls, data: dict) -> "Book":
-        # ensure keys exist for new fields
-        data = dict(data)
-        data.setdefault("available", True)
-        data.setdefault("checked_out_by", None)
-        data.setdefault("checkout_history", [])
+        # missing newer keys (available, checked_out_by, checkout_history)
+        # fall back to the field defaults, so the record needs no copy
         return cls(**data)
 
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> List["Book"]:
+        """Build Books from decoded records in one pass."""
+        return [cls(**record) for record in records]
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "Book":
+        return cls(*row)
+
+    def to_row(self) -> Tuple:
+        """Field values as a tuple in BOOK_FIELDS order."""
+        return _row_getter(self)
+
     def to_dict(self) -> dict:
         return {
             "book_id": self.book_id,
@@ -84,4 +174,9 @@ class Book:
             "available": self.available,
             "checked_out_by": self.checked_out_by,
             "checkout_history": self.checkout_history,
+            "version": self.version,
         }
+
+
+BOOK_FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(Book))
+_row_getter = attrgetter(*BOOK_FIELDS)
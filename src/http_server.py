@@ -0,0 +1,527 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src.domain.book import Book
+from src.instrumentation import metrics
+from src.repositories.book_query import coerce
+from src.repositories.book_repository_protocol import VersionConflictError
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.journaled_book_repository import JournaledBookRepository
+from src.repositories.record_codecs import available_codecs
+from src.services.book_service import BookService
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+MAX_BODY = 1 << 20
+
+
+def _book_json(book: Book) -> Dict:
+    data = book.to_dict()
+    del data["checkout_history"]
+    return data
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Storage:
+    """Runs blocking BookService calls on one storage thread.
+
+    Repositories are not safe to use from several threads at once, so all
+    storage work is serialized on a single worker; the event loop only
+    waits on it. At most ``max_pending`` calls may be queued; beyond that
+    requests are refused with 503 instead of piling up.
+    """
+
+    def __init__(self, service: BookService, max_pending: int = 1024):
+        self.service = service
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        self._pending = 0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        if self._pending >= self.max_pending:
+            raise HTTPError(503, "Server busy")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class WriteCoalescer:
+    """Group commit for mutations.
+
+    Mutations are queued and flushed by one background task: it waits
+    ``window`` seconds for more to arrive, then persists up to
+    ``max_batch`` of them through BookService's batch methods, so a burst of
+    check-outs costs one write instead of one each. Mutations that arrive
+    while a batch is being written go into the next one. Consecutive
+    mutations of the same kind share a write; a book updated or deleted
+    twice in a row starts a new write so each request sees the one before
+    it. Each run's requests are answered as soon as that run is stored, and
+    a request that fails (400 for bad input, 409 for a version conflict)
+    fails on its own without taking the rest of its batch with it.
+    """
+
+    def __init__(self, storage: Storage, window: float = 0.002, max_batch: int = 512):
+        self.storage = storage
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: List[Tuple[str, Any, asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.mutations = 0
+
+    async def submit(self, kind: str, payload: Any) -> Dict:
+        """Queue one mutation and wait for its batch result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((kind, payload, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            if self.window:
+                await asyncio.sleep(self.window)
+            batch = self._queue[: self.max_batch]
+            del self._queue[: self.max_batch]
+            ops = [(kind, payload) for kind, payload, _ in batch]
+            futures = [future for _, _, future in batch]
+
+            def committed(run, results, futures=futures):
+                loop.call_soon_threadsafe(self._settle, futures, run, results)
+
+            try:
+                await self.storage.run(self._apply, ops, committed)
+            except Exception as e:
+                # only futures of runs that never committed are still open
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.mutations += len(batch)
+
+    @staticmethod
+    def _settle(futures: List[asyncio.Future], run: List[int], results: List[Dict]):
+        for i in run:
+            if not futures[i].done():
+                futures[i].set_result(results[i])
+
+    @staticmethod
+    def _runs(ops: List[Tuple[str, Any]]) -> List[List[int]]:
+        runs: List[List[int]] = []
+        seen: set = set()
+        for i, (kind, payload) in enumerate(ops):
+            key = payload.book_id if kind == "add" else payload["book_id"]
+            repeat = kind in ("update", "delete") and key in seen
+            if not runs or ops[runs[-1][0]][0] != kind or repeat:
+                runs.append([])
+                seen = set()
+            runs[-1].append(i)
+            seen.add(key)
+        return runs
+
+    def _commit_run(self, kind: str, payloads: List[Any]) -> List[Dict]:
+        svc = self.storage.service
+        if kind == "add":
+            return svc.add_books(payloads)
+        if kind == "update":
+            return svc.update_books({p["book_id"]: p["data"] for p in payloads})
+        if kind == "delete":
+            return svc.delete_books([p["book_id"] for p in payloads])
+        return svc.circulate_books(payloads)
+
+    @staticmethod
+    def _failure(kind: str, payload: Any, error: Exception) -> Dict:
+        if isinstance(error, VersionConflictError):
+            status = 409
+        elif isinstance(error, (ValueError, TypeError, KeyError)):
+            status = 400
+        else:
+            status = 500
+        book_id = payload.book_id if kind == "add" else payload["book_id"]
+        return {"book_id": book_id, "ok": False, "error": str(error), "status": status}
+
+    def _apply(
+        self,
+        ops: List[Tuple[str, Any]],
+        committed: Optional[Callable[[List[int], List[Dict]], None]] = None,
+    ) -> List[Dict]:
+        """Persist ``ops`` (on the storage thread), one write per run.
+
+        ``committed(run, results)`` is called as each run is stored, so its
+        requests can be answered without waiting for the rest of the batch.
+        A run whose batch call raises stored nothing; its requests are then
+        retried one at a time so only the offending ones fail.
+        """
+        svc = self.storage.service
+        results: List[Optional[Dict]] = [None] * len(ops)
+        with metrics.timer("http.group_commit"):
+            for run in self._runs(ops):
+                kind = ops[run[0]][0]
+                try:
+                    batch = self._commit_run(kind, [ops[i][1] for i in run])
+                except Exception as e:
+                    if len(run) == 1:
+                        batch = [self._failure(kind, ops[run[0]][1], e)]
+                    else:
+                        batch = [self._apply_one(kind, ops[i][1]) for i in run]
+                for i, result in zip(run, batch):
+                    result = results[i] = dict(result, kind=kind)
+                    # attach the stored record so handlers need no extra round trip
+                    if result["ok"] and kind != "delete":
+                        book = svc.get_book_by_id(result["book_id"])
+                        result["book"] = _book_json(book) if book else None
+                if committed is not None:
+                    committed(run, results)
+        return results
+
+    def _apply_one(self, kind: str, payload: Any) -> Dict:
+        try:
+            return self._commit_run(kind, [payload])[0]
+        except Exception as e:
+            return self._failure(kind, payload, e)
+
+
+class BookHTTPServer:
+    """JSON-over-HTTP API for BookService.
+
+    Routes::
+
+        GET    /books?limit=100             first ``limit`` books
+        GET    /books?genre=Mystery&price_usd__lt=20&sort=-average_rating
+                                            filtered query (see book_query)
+        GET    /books/search?q=...&limit=10 title search
+        GET    /books/{id}
+        POST   /books                       add (JSON body of Book fields)
+        PATCH  /books/{id}                  update (JSON body)
+        DELETE /books/{id}
+        POST   /books/{id}/checkout         {"user_email", "due_date"}
+        POST   /books/{id}/checkin          {"user_email"}
+        GET    /books/{id}/history?offset=0&limit=20
+        GET    /users/{email}/history?offset=0&limit=20
+        GET    /stats                       metrics snapshot
+
+    Book bodies leave out ``checkout_history``; page through it with the
+    history routes instead.
+
+    Connections are HTTP/1.1 keep-alive. Reads run on the storage thread;
+    mutations go through the WriteCoalescer.
+    """
+
+    def __init__(
+        self,
+        service: BookService,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        window: float = 0.002,
+        max_batch: int = 512,
+        max_pending: int = 1024,
+    ):
+        self.host = host
+        self.port = port
+        self.storage = Storage(service, max_pending)
+        self.writes = WriteCoalescer(self.storage, window, max_batch)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        # port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.storage.shutdown()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    with metrics.timer(f"http.{method}"):
+                        status, payload = await self.dispatch(method, target, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                        "\r\n"
+                    ).encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        """Route one request; returns ``(status, JSON-able payload)``."""
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if parts == ["stats"] and method == "GET":
+                return 200, metrics.snapshot()
+            if len(parts) == 3 and parts[0] == "users" and parts[2] == "history":
+                if method != "GET":
+                    raise HTTPError(405, "Method not allowed")
+                return 200, await self._history("get_user_history", parts[1], query)
+            if not parts or parts[0] != "books":
+                raise HTTPError(404, "Not found")
+            if len(parts) == 1:
+                if method == "GET":
+                    return 200, await self._list(query)
+                if method == "POST":
+                    return await self._add(self._json(body))
+            elif parts[1] == "search" and len(parts) == 2 and method == "GET":
+                return 200, await self._search(query)
+            elif len(parts) == 2:
+                book_id = parts[1]
+                if method == "GET":
+                    return await self._get(book_id)
+                if method == "PATCH":
+                    data = self._json(body)
+                    return self._mutation(
+                        await self.writes.submit(
+                            "update", {"book_id": book_id, "data": data}
+                        )
+                    )
+                if method == "DELETE":
+                    return self._mutation(
+                        await self.writes.submit("delete", {"book_id": book_id})
+                    )
+            elif len(parts) == 3 and parts[2] == "history":
+                if method == "GET":
+                    return await self._book_history(parts[1], query)
+            elif len(parts) == 3 and parts[2] in ("checkout", "checkin"):
+                if method == "POST":
+                    data = self._json(body) if body else {}
+                    request = {
+                        "action": "check_out" if parts[2] == "checkout" else "check_in",
+                        "book_id": parts[1],
+                        "user_email": data.get("user_email"),
+                        "due_date": data.get("due_date"),
+                    }
+                    return self._mutation(
+                        await self.writes.submit("circulate", request)
+                    )
+            else:
+                raise HTTPError(404, "Not found")
+            raise HTTPError(405, "Method not allowed")
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    @staticmethod
+    def _json(body: bytes) -> Dict:
+        try:
+            data = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return data
+
+    @staticmethod
+    def _limit(query: Dict[str, str], default: int) -> int:
+        try:
+            return max(0, int(query.get("limit", default)))
+        except ValueError:
+            raise HTTPError(400, "limit must be an integer")
+
+    @staticmethod
+    def _offset(query: Dict[str, str]) -> int:
+        try:
+            return max(0, int(query.get("offset", 0)))
+        except ValueError:
+            raise HTTPError(400, "offset must be an integer")
+
+    async def _history(self, method: str, key: str, query: Dict[str, str]):
+        limit = max(1, self._limit(query, 20))
+        fetch = getattr(self.storage.service, method)
+        return await self.storage.run(fetch, unquote(key), self._offset(query), limit)
+
+    async def _book_history(self, book_id: str, query: Dict[str, str]):
+        book = await self.storage.run(self.storage.service.get_book_by_id, book_id)
+        if book is None:
+            raise HTTPError(404, "Book not found")
+        return 200, await self._history("get_history", book_id, query)
+
+    @staticmethod
+    def _mutation(result: Dict) -> Tuple[int, Any]:
+        if result["ok"]:
+            status = 201 if result["kind"] == "add" else 200
+            return status, result.get("book") or {"book_id": result["book_id"]}
+        error = result["error"]
+        if "status" in result:
+            return result["status"], {"error": error}
+        if error == "Book not found":
+            return 404, {"error": error}
+        return (409 if result["kind"] == "circulate" else 400), {"error": error}
+
+    async def _list(self, query: Dict[str, str]) -> List[Dict]:
+        limit = self._limit(query, 100)
+        sort = query.get("sort")
+        filters = {k: v for k, v in query.items() if k not in ("limit", "sort")}
+        if filters or sort:
+            try:
+                filters = {
+                    key: coerce(key.partition("__")[0], key.partition("__")[2], value)
+                    for key, value in filters.items()
+                }
+                books = await self.storage.run(
+                    self.storage.service.find_books, filters, sort, max(limit, 1)
+                )
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            return [_book_json(b) for b in books]
+
+        def first_books():
+            books = []
+            for book in self.storage.service.iter_books():
+                if len(books) >= limit:
+                    break
+                books.append(_book_json(book))
+            return books
+
+        return await self.storage.run(first_books)
+
+    async def _search(self, query: Dict[str, str]) -> List[Dict]:
+        limit = self._limit(query, 10)
+        books = await self.storage.run(
+            self.storage.service.search_by_name, query.get("q", ""), limit
+        )
+        return [_book_json(b) for b in books]
+
+    async def _get(self, book_id: str) -> Tuple[int, Any]:
+        book = await self.storage.run(self.storage.service.get_book_by_id, book_id)
+        if book is None:
+            raise HTTPError(404, "Book not found")
+        return 200, _book_json(book)
+
+    async def _add(self, data: Dict) -> Tuple[int, Any]:
+        try:
+            book = Book.from_dict(data)
+        except TypeError as e:
+            raise HTTPError(400, str(e))
+        return self._mutation(await self.writes.submit("add", book))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Book management HTTP API")
+    parser.add_argument("--catalog", default="books.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--journaled",
+        action="store_true",
+        help="append mutations to a journal instead of rewriting the catalog",
+    )
+    parser.add_argument(
+        "--codec",
+        default="json",
+        choices=available_codecs(),
+        help="encoding used when writing the catalog (any is read)",
+    )
+    parser.add_argument(
+        "--window-ms",
+        type=float,
+        default=2.0,
+        help="how long to gather mutations before each group commit",
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=512,
+        help="most mutations per group commit (1 disables coalescing)",
+    )
+    args = parser.parse_args(argv)
+    repo_cls = JournaledBookRepository if args.journaled else CachedBookRepository
+    repo = repo_cls(
+        args.catalog, history_path=args.catalog + ".history.jsonl", codec=args.codec
+    )
+    repo.migrate_checkout_history()
+    server = BookHTTPServer(
+        BookService(repo),
+        args.host,
+        args.port,
+        window=args.window_ms / 1000,
+        max_batch=args.max_batch,
+    )
+
+    async def run():
+        await server.start()
+        print(f"Serving on http://{server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Callable, Deque, Dict
+
+_NULL_TIMER = nullcontext()
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+def _percentile(ordered, q: float) -> float:
+    # nearest-rank on a sorted sequence
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Metrics:
+    """Per-operation timers and counters.
+
+    Disabled by default (enable with ``enable()`` or ``BOOKS_METRICS=1``);
+    while disabled ``timer`` returns a shared no-op context and ``timed``
+    wrappers add one attribute check per call. Percentiles are computed
+    over the last ``max_samples`` timings of each operation.
+    """
+
+    def __init__(self, enabled: bool = False, max_samples: int = 10000):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._calls: Dict[str, int] = {}
+        self._totals: Dict[str, float] = {}
+        self._counters: Dict[str, int] = {}
+        self._profiler = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._calls.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append(seconds)
+            self._calls[name] = self._calls.get(name, 0) + 1
+            self._totals[name] = self._totals.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    def timer(self, name: str):
+        """Context manager timing its body as one call of ``name``."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name: str) -> Callable:
+        """Decorator timing every call of a function as ``name``."""
+
+        def decorate(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorate
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """``{"timers": {name: stats}, "counters": {name: value}}``.
+
+        Timer stats are the call count, total and mean, and p50/p95/p99/max
+        latency, all in milliseconds.
+        """
+        with self._lock:
+            timers = {}
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                calls = self._calls[name]
+                timers[name] = {
+                    "count": calls,
+                    "total_ms": self._totals[name] * 1000,
+                    "mean_ms": self._totals[name] / calls * 1000,
+                    "p50_ms": _percentile(ordered, 50) * 1000,
+                    "p95_ms": _percentile(ordered, 95) * 1000,
+                    "p99_ms": _percentile(ordered, 99) * 1000,
+                    "max_ms": ordered[-1] * 1000,
+                }
+            return {"timers": timers, "counters": dict(self._counters)}
+
+    def report(self) -> str:
+        snap = self.snapshot()
+        if not snap["timers"] and not snap["counters"]:
+            return "No metrics recorded" + ("" if self.enabled else " (disabled)")
+        lines = [
+            f"{'operation':<36} {'count':>8} {'p50 ms':>10} {'p95 ms':>10} "
+            f"{'p99 ms':>10} {'total ms':>12}"
+        ]
+        for name, s in sorted(snap["timers"].items()):
+            lines.append(
+                f"{name:<36} {s['count']:>8} {s['p50_ms']:>10.3f} "
+                f"{s['p95_ms']:>10.3f} {s['p99_ms']:>10.3f} {s['total_ms']:>12.1f}"
+            )
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"{name:<36} {value:>8}")
+        return "\n".join(lines)
+
+    @property
+    def profiling(self) -> bool:
+        return self._profiler is not None
+
+    def start_profile(self):
+        """Start a cProfile capture of everything this thread runs."""
+        import cProfile
+
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profile(self, limit: int = 25, sort: str = "cumulative") -> str:
+        """Stop the capture and return the top ``limit`` functions."""
+        import io
+        import pstats
+
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return "No profile running"
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+metrics = Metrics(enabled=os.environ.get("BOOKS_METRICS") == "1")
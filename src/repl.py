@@ -1,16 +1,30 @@
+import argparse
+import os
 from src.services.book_generator_service import generate_books
 from src.domain.book import Book
+from src.instrumentation import metrics
+from src.repositories.book_query import parse_filter_text
 from src.services.book_service import BookService
-from src.services.book_analytics_service import BookAnalyticsService
-from src.repositories.book_repository import BookRepository
-import requests
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.record_codecs import available_codecs
+
+# pandas/NumPy/matplotlib (analytics) and requests (getJoke) are imported on
+# first use so the prompt appears without paying for them
 
 
 class BookREPL:
-    def __init__(self, book_svc, book_analytics_svc):
+    def __init__(self, book_svc, book_analytics_svc=None):
         self.running = True
         self.book_svc = book_svc
-        self.book_analytics_svc = book_analytics_svc
+        self._book_analytics_svc = book_analytics_svc
+
+    @property
+    def book_analytics_svc(self):
+        if self._book_analytics_svc is None:
+            from src.services.book_analytics_service import BookAnalyticsService
+
+            self._book_analytics_svc = BookAnalyticsService()
+        return self._book_analytics_svc
 
     def start(self):
         print("Welcome to the book app! Type 'Help' for a list of commands!")
@@ -28,6 +42,8 @@ class BookREPL:
             self.add_book()
         elif cmd == "findByName":
             self.find_book_by_name()
+        elif cmd == "findBooks":
+            self.find_books()
         elif cmd == "getJoke":
             self.get_joke()
         elif cmd == "getAveragePrice":
@@ -46,29 +62,58 @@ class BookREPL:
             self.delete_book()
         elif cmd == "getHistory":
             self.get_history()
+        elif cmd == "getUserHistory":
+            self.get_user_history()
+        elif cmd == "stats" or cmd.startswith("stats "):
+            self.stats(cmd.split()[1:])
         elif cmd == "help":
             print(
-                "Available commands: addBook, getAllRecords, findByName, getJoke, getAveragePrice, getTopBooks, getValueScores, checkOut, checkIn, updateBook, deleteBook, getHistory, help, exit"
+                "Available commands: addBook, getAllRecords, findByName, findBooks, getJoke, getAveragePrice, getTopBooks, getValueScores, checkOut, checkIn, updateBook, deleteBook, getHistory, getUserHistory, stats [on|off|reset|profile], help, exit"
             )
         else:
             print("Please use a valid command!")
 
+    def stats(self, args):
+        action = args[0] if args else ""
+        if action == "on":
+            metrics.enable()
+            print("Metrics enabled")
+        elif action == "off":
+            metrics.disable()
+            print("Metrics disabled")
+        elif action == "reset":
+            metrics.reset()
+            print("Metrics reset")
+        elif action == "profile":
+            # toggles: the second call stops the capture and prints it
+            if metrics.profiling:
+                print(metrics.stop_profile())
+            else:
+                metrics.start_profile()
+                print("Profiling; run 'stats profile' again to stop")
+        elif action:
+            print("Usage: stats [on|off|reset|profile]")
+        else:
+            print(metrics.report())
+
     def get_average_price(self):
-        books = self.book_svc.get_all_books()
+        books = self.book_svc.iter_books()
         avg_price = self.book_analytics_svc.average_price(books)
         print(avg_price)
 
     def get_top_books(self):
-        books = self.book_svc.get_all_books()
+        books = self.book_svc.iter_books()
         top_rated_books = self.book_analytics_svc.top_rated(books)
         print(top_rated_books)
 
     def get_value_scores(self):
-        books = self.book_svc.get_all_books()
+        books = self.book_svc.iter_books()
         value_scores = self.book_analytics_svc.value_scores(books)
         print(value_scores)
 
     def get_joke(self):
+        import requests
+
         try:
             url = "https://api.chucknorris.io/jokes/random"
             response = requests.get(url, timeout=5)
@@ -86,6 +131,24 @@ class BookREPL:
         books = self.book_svc.find_book_by_name(query)
         print(books)
 
+    def find_books(self):
+        text = input(
+            "Filters (e.g. genre=Mystery, publication_year__gt=1990, "
+            "price_usd__lt=20): "
+        )
+        sort = input("Sort by (optional, -field for descending): ").strip()
+        limit = input("Limit (optional): ").strip()
+        try:
+            books = self.book_svc.find_books(
+                parse_filter_text(text), sort or None, int(limit) if limit else None
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        for book in books:
+            print(book)
+        print(f"{len(books)} book(s) found")
+
     def check_out(self):
         book_id = input("Book ID to check out: ")
         email = input("Your email: ")
@@ -125,17 +188,44 @@ class BookREPL:
         except Exception as e:
             print(f"Error: {e}")
 
+    def _page_through(self, fetch, page_size=20):
+        offset = 0
+        while True:
+            entries = fetch(offset, page_size)
+            for entry in entries:
+                print(entry)
+            offset += len(entries)
+            if len(entries) < page_size or input("More? (y/n): ").lower() != "y":
+                return offset
+
     def get_history(self):
         book_id = input("Book ID for history: ")
-        book = self.book_svc.get_book_by_id(book_id)
-        if not book:
+        if not self.book_svc.get_book_by_id(book_id):
             print("Book not found")
-        else:
-            print(book.checkout_history)
+            return
+        shown = self._page_through(
+            lambda offset, limit: self.book_svc.get_history(book_id, offset, limit)
+        )
+        if not shown:
+            print("No checkout history")
 
-    def get_all_records(self):
-        books = self.book_svc.get_all_books()
-        print(books)
+    def get_user_history(self):
+        email = input("User email: ")
+        shown = self._page_through(
+            lambda offset, limit: self.book_svc.get_user_history(email, offset, limit)
+        )
+        if not shown:
+            print("No checkout history")
+
+    def get_all_records(self, page_size=20):
+        after = None
+        while True:
+            page = self.book_svc.list_books(after=after, limit=page_size)
+            for book in page["books"]:
+                print(book)
+            after = page["next"]
+            if after is None or input("More? (y/n): ").lower() != "y":
+                return
 
     def add_book(self):
         try:
@@ -149,10 +239,39 @@ class BookREPL:
             print(f"An unexpected error has occurred: {e}")
 
 
-if __name__ == "__main__":
-    generate_books()
-    repo = BookRepository("books.json")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Book management REPL")
+    parser.add_argument("--catalog", default="books.json")
+    parser.add_argument(
+        "--generate",
+        action="store_true",
+        help="regenerate the sample catalog even if one already exists",
+    )
+    parser.add_argument(
+        "--metrics", action="store_true", help="record timings from the start"
+    )
+    parser.add_argument(
+        "--codec",
+        default="json",
+        choices=available_codecs(),
+        help="encoding used when writing the catalog (any is read)",
+    )
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    if args.generate or not os.path.exists(args.catalog):
+        generate_books(args.catalog)
+    # checkout history lives beside the catalog so loading it stays cheap
+    repo = CachedBookRepository(
+        args.catalog,
+        history_path=args.catalog + ".history.jsonl",
+        codec=args.codec,
+    )
+    repo.migrate_checkout_history()
     book_service = BookService(repo)
-    book_analytics_service = BookAnalyticsService()
-    repl = BookREPL(book_service, book_analytics_service)
+    repl = BookREPL(book_service)
     repl.start()
+
+
+if __name__ == "__main__":
+    main()
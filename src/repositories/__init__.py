@@ -1,2 +1,6 @@
 from .book_repository import BookRepository
 from .book_repository_protocol import BookRepositoryProtocol
+from .cached_book_repository import CachedBookRepository
+from .journaled_book_repository import JournaledBookRepository
+from .sharded_book_repository import ShardedBookRepository
+from .sqlite_book_repository import SqliteBookRepository
@@ -0,0 +1,241 @@
+"""Filter/sort/limit queries over book records.
+
+Filters are a dict of ``field`` or ``field__op`` keys, Django style::
+
+    {"genre": "Mystery", "author__in": ["Author 12", "Author 7"],
+     "publication_year__gt": 1990, "price_usd__lt": 20}
+
+Conditions are ANDed. A missing or non-numeric value never satisfies a
+range comparison, and sorting puts missing values last in either direction.
+``sort`` is a field name, prefixed with ``-`` for descending; ties keep
+catalog order.
+
+``list_books`` pages use keyset pagination instead: rows are ordered by
+``(order_by field, book_id)`` and a page starts strictly after the key held
+in an opaque cursor, so pages stay stable while books are added or removed.
+"""
+
+import base64
+import heapq
+import json
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+CATEGORICAL_FIELDS = (
+    "genre",
+    "author",
+    "publisher",
+    "language",
+    "format",
+    "in_print",
+    "available",
+    "checked_out_by",
+)
+NUMERIC_FIELDS = (
+    "publication_year",
+    "page_count",
+    "average_rating",
+    "ratings_count",
+    "price_usd",
+    "sales_millions",
+)
+QUERY_FIELDS = CATEGORICAL_FIELDS + NUMERIC_FIELDS + ("title",)
+OPERATORS = ("eq", "in", "gt", "gte", "lt", "lte")
+BOOL_FIELDS = ("in_print", "available")
+
+
+class Condition(NamedTuple):
+    field: str
+    op: str
+    value: Any
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def parse_filters(filters: Optional[Dict[str, Any]]) -> List[Condition]:
+    """Validate ``filters`` and split the keys into Conditions."""
+    if filters is None:
+        return []
+    if not isinstance(filters, dict):
+        raise ValueError("Filters must be a dict")
+    conditions = []
+    for key, value in filters.items():
+        field, _, op = key.partition("__")
+        op = op or "eq"
+        if field not in QUERY_FIELDS:
+            raise ValueError(f"Cannot filter on {field!r}")
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown filter operator {op!r}")
+        if op == "in":
+            if isinstance(value, (str, bytes)) or not isinstance(value, Iterable):
+                raise ValueError(f"{key} needs a list of values")
+            value = list(value)
+        elif op != "eq" and not is_number(value):
+            raise ValueError(f"{key} needs a number")
+        conditions.append(Condition(field, op, value))
+    return conditions
+
+
+def parse_sort(sort: Optional[str]) -> Optional[Tuple[str, bool]]:
+    """``"-price_usd"`` -> ``("price_usd", True)``."""
+    if not sort:
+        return None
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field not in QUERY_FIELDS:
+        raise ValueError(f"Cannot sort on {field!r}")
+    return field, descending
+
+
+def matches(record: Dict, conditions: List[Condition]) -> bool:
+    for field, op, value in conditions:
+        actual = record.get(field)
+        if op == "eq":
+            if actual != value:
+                return False
+        elif op == "in":
+            if actual not in value:
+                return False
+        elif not is_number(actual):
+            return False
+        elif op == "gt":
+            if not actual > value:
+                return False
+        elif op == "gte":
+            if not actual >= value:
+                return False
+        elif op == "lt":
+            if not actual < value:
+                return False
+        elif not actual <= value:
+            return False
+    return True
+
+
+def order(
+    records: Iterable[Dict], sort: Optional[Tuple[str, bool]], limit: Optional[int]
+) -> List[Dict]:
+    """Sort already filtered ``records`` (in catalog order) and cut to ``limit``."""
+    if sort is None:
+        out = []
+        for record in records:
+            if limit is not None and len(out) >= limit:
+                break
+            out.append(record)
+        return out
+    field, descending = sort
+    sortable = is_number if field in NUMERIC_FIELDS else (lambda v: v is not None)
+    present = []
+    missing = []
+    for record in records:
+        (present if sortable(record.get(field)) else missing).append(record)
+    # reverse=True keeps equal keys in their original order
+    present.sort(key=lambda r: r[field], reverse=descending)
+    out = present + missing
+    return out if limit is None else out[:limit]
+
+
+def coerce(field: str, op: str, text: str) -> Any:
+    """Turn a typed-in filter value into the type stored for ``field``."""
+    if op == "in":
+        return [coerce(field, "eq", part.strip()) for part in text.split("|")]
+    if field in BOOL_FIELDS:
+        return text.strip().lower() in ("1", "true", "yes", "y")
+    if field in NUMERIC_FIELDS:
+        number = float(text)
+        return int(number) if number.is_integer() else number
+    return text
+
+
+def parse_filter_text(text: str) -> Dict[str, Any]:
+    """``"genre=Mystery, price_usd__lt=20"`` -> filters for ``find_books``.
+
+    Pairs are comma separated; ``__in`` values are separated by ``|``.
+    """
+    filters: Dict[str, Any] = {}
+    for pair in text.split(","):
+        if not pair.strip():
+            continue
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected field=value, got {pair.strip()!r}")
+        key = key.strip()
+        field, _, op = key.partition("__")
+        try:
+            filters[key] = coerce(field, op or "eq", value.strip())
+        except ValueError:
+            raise ValueError(f"{key} needs a number")
+    return filters
+
+
+ORDER_FIELDS = QUERY_FIELDS + ("book_id",)
+
+
+def parse_order(order_by: Optional[str]) -> Tuple[str, bool]:
+    """``list_books`` order: ``(field, descending)``, by book_id by default."""
+    if not order_by:
+        return "book_id", False
+    field = order_by.lstrip("-")
+    if field not in ORDER_FIELDS:
+        raise ValueError(f"Cannot order by {field!r}")
+    return field, order_by.startswith("-")
+
+
+class _Descending:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def order_key(field: str, descending: bool) -> Callable[[Dict], Tuple]:
+    """Total order of records for keyset pages; missing values go last."""
+    present = is_number if field in NUMERIC_FIELDS else (lambda v: v is not None)
+
+    def key(record: Dict) -> Tuple:
+        value = record.get(field)
+        book_id = record.get("book_id") or ""
+        if not present(value):
+            return (1, 0, book_id)
+        return (0, _Descending(value) if descending else value, book_id)
+
+    return key
+
+
+def encode_cursor(order_by: Optional[str], record: Dict) -> str:
+    """Opaque cursor pointing just past ``record`` in ``order_by`` order."""
+    field, descending = parse_order(order_by)
+    token = json.dumps(
+        ["-" + field if descending else field, record.get(field), record["book_id"]]
+    )
+    return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, order_by: Optional[str]) -> Dict:
+    """The ``{field: value, "book_id": ...}`` key a cursor points past."""
+    field, descending = parse_order(order_by)
+    try:
+        name, value, book_id = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if name != ("-" + field if descending else field):
+        raise ValueError("Cursor was made for a different order_by")
+    return {field: value, "book_id": book_id}
+
+
+def page(
+    records: Iterable[Dict], order_by: Optional[str], after: Optional[str], limit: int
+) -> List[Dict]:
+    """One keyset page from unordered ``records``, keeping only ``limit`` at a time."""
+    key = order_key(*parse_order(order_by))
+    if after is not None:
+        start = key(decode_cursor(after, order_by))
+        records = (r for r in records if key(r) > start)
+    return heapq.nsmallest(limit, records, key=key)
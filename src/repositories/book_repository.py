@@ -1,57 +1,302 @@
-import json
-from typing import List, Optional, Dict
-from src.domain.book import Book
-from src.repositories.book_repository_protocol import BookRepositoryProtocol
+import functools
+import heapq
+import itertools
+from typing import Callable, Iterator, List, Optional, Dict, Tuple, Union
+from src.domain.book import Book, LazyHistory
+from src.instrumentation import metrics
+from src.repositories.book_repository_protocol import (
+    BookRepositoryProtocol,
+    VersionConflictError,
+)
+from src.repositories.book_query import (
+    matches,
+    order,
+    page,
+    parse_filters,
+    parse_sort,
+)
+from src.repositories.file_io import FileLock, atomic_write, exclusive
+from src.repositories.history_store import CheckoutHistoryStore
+from src.repositories.record_codecs import CodecError, decode_any, get_codec, iter_file
+from src.repositories.title_index import match_rank
 import os
 
 
 class BookRepository(BookRepositoryProtocol):
-    def __init__(self, filepath: str = "books.json"):
+    """JSON-file repository, safe to share between processes.
+
+    Writes go to a temp file that is fsynced and renamed over ``filepath``,
+    and every read-modify-write holds an exclusive lock on
+    ``<filepath>.lock`` (plain reads take it shared).
+
+    With ``history_path`` checkout history lives in a separate append-only
+    CheckoutHistoryStore instead of inside each record: Books carry a
+    LazyHistory that reads the store only when used, and adding an entry
+    never rewrites the catalog. Run ``migrate_checkout_history()`` once to
+    move histories stored inline by older versions.
+
+    ``codec`` names the encoding used when writing the file (see
+    ``record_codecs``; indented JSON by default). Reads detect the encoding
+    from the file itself, so changing the codec converts the catalog on its
+    next write.
+    """
+
+    def __init__(
+        self,
+        filepath: str = "books.json",
+        history_path: Optional[str] = None,
+        codec="json",
+    ):
         self.filepath = filepath
+        self.codec = get_codec(codec)
+        self._file_lock = FileLock(filepath + ".lock")
+        self.history = CheckoutHistoryStore(history_path) if history_path else None
 
     def _read_file(self) -> List[Dict]:
         if not os.path.exists(self.filepath):
             return []
         try:
-            with open(self.filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if not isinstance(data, list):
-                    return []
-                return data
-        except (json.JSONDecodeError, IOError):
+            with self._file_lock.shared():
+                with metrics.timer("repo.read"):
+                    with open(self.filepath, "rb") as f:
+                        raw = f.read()
+            with metrics.timer("repo.parse"):
+                data = decode_any(raw)
+            metrics.count("repo.bytes_read", len(raw))
+            if not isinstance(data, list):
+                return []
+            return data
+        except (CodecError, IOError):
             return []
 
     def _write_file(self, data: List[Dict]):
-        with open(self.filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        with metrics.timer("repo.serialize"):
+            raw = self.codec.encode(data)
+        with self._file_lock.exclusive(), metrics.timer("repo.write"):
+            atomic_write(self.filepath, lambda f: f.write(raw), "wb")
+        metrics.count("repo.bytes_written", len(raw))
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Stream raw records from disk without loading the whole file.
+
+        Like ``_read_file``, a missing or malformed file counts as empty; if
+        the file turns out to be malformed partway through, iteration simply
+        stops there. No lock is held while streaming: writers replace the
+        file by rename, so an open iterator keeps reading the version it
+        started on.
+        """
+        if not os.path.exists(self.filepath):
+            return
+        try:
+            with open(self.filepath, "rb") as f:
+                for item in iter_file(f):
+                    if isinstance(item, dict):
+                        yield item
+        except (CodecError, IOError):
+            return
+
+    def _book(self, item: Dict) -> Book:
+        book = Book.from_dict(item)
+        if self.history is not None:
+            book.checkout_history = LazyHistory(
+                functools.partial(self.history.for_book, book.book_id)
+            )
+        return book
+
+    def _detach_history(self, book_id: str, data: Dict, pending: List) -> Dict:
+        """Take ``checkout_history`` out of ``data`` for the history store.
+
+        The entries the store does not have yet are queued on ``pending``
+        rather than appended, so that nothing reaches the store unless the
+        catalog write succeeds; ``_store_history`` appends them after it.
+        Without a store ``data`` is returned as is.
+        """
+        if self.history is None or "checkout_history" not in data:
+            return data
+        data = dict(data)
+        history = data.pop("checkout_history")
+        if isinstance(history, LazyHistory):
+            new = history.new_entries()
+        else:
+            entries = list(history or [])
+            stored = self.history.count(book_id)
+            if len(entries) < stored:
+                raise ValueError("Checkout history is append-only")
+            new = entries[stored:]
+        pending.append((book_id, new, history))
+        return data
+
+    def _store_history(self, pending: List):
+        """Append the entries ``_detach_history`` queued, once they are committed."""
+        if not pending:
+            return
+        self.history.append_many(
+            (book_id, entry) for book_id, new, _ in pending for entry in new
+        )
+        for _, _, history in pending:
+            if isinstance(history, LazyHistory):
+                history.mark_stored()
+
+    def _versioned(self, item: Dict, data: Dict, pending: List) -> Dict:
+        """``data`` ready to store over ``item``: history split off, version bumped."""
+        data = dict(self._detach_history(item["book_id"], data, pending))
+        data["version"] = item.get("version", 0) + 1
+        return data
+
+    @staticmethod
+    def _check_version(item: Dict, expected_version: int):
+        actual = item.get("version", 0)
+        if actual != expected_version:
+            raise VersionConflictError(item["book_id"], expected_version, actual)
 
     def get_all_books(self) -> List[Book]:
-        data = self._read_file()
-        return [Book.from_dict(item) for item in data]
+        records = self._read_file()
+        with metrics.timer("repo.from_records"):
+            if self.history is not None:
+                return [self._book(item) for item in records]
+            return Book.from_records(records)
+
+    def iter_books(self) -> Iterator[Book]:
+        for item in self.iter_records():
+            yield self._book(item)
 
+    @exclusive
     def add_book(self, book: Book) -> str:
         data = self._read_file()
-        data.append(book.to_dict())
+        pending = []
+        data.append(self._detach_history(book.book_id, book.to_dict(), pending))
         self._write_file(data)
+        self._store_history(pending)
         return book.book_id
 
+    @exclusive
+    def add_books(self, books: List[Book]) -> List[str]:
+        data = self._read_file()
+        pending = []
+        data.extend(
+            self._detach_history(book.book_id, book.to_dict(), pending)
+            for book in books
+        )
+        self._write_file(data)
+        self._store_history(pending)
+        return [book.book_id for book in books]
+
     def get_book_by_id(self, book_id: str) -> Optional[Book]:
         for item in self._read_file():
             if item.get("book_id") == book_id:
-                return Book.from_dict(item)
+                return self._book(item)
         return None
 
+    @exclusive
     def update_book(self, book_id: str, data: Dict) -> Optional[Book]:
         items = self._read_file()
         for idx, item in enumerate(items):
             if item.get("book_id") == book_id:
                 # update allowed fields
-                item.update(data)
+                pending = []
+                item.update(self._versioned(item, data, pending))
                 items[idx] = item
                 self._write_file(items)
-                return Book.from_dict(item)
+                self._store_history(pending)
+                return self._book(item)
+        return None
+
+    @exclusive
+    def update_books(self, updates: Dict[str, Dict]) -> List[Optional[Book]]:
+        items = self._read_file()
+        positions = {}
+        for idx, item in enumerate(items):
+            positions.setdefault(item.get("book_id"), idx)
+        results: List[Optional[Book]] = []
+        pending = []
+        for book_id, data in updates.items():
+            idx = positions.get(book_id)
+            if idx is None:
+                results.append(None)
+                continue
+            items[idx].update(self._versioned(items[idx], data, pending))
+            results.append(self._book(items[idx]))
+        if any(r is not None for r in results):
+            self._write_file(items)
+            self._store_history(pending)
+        return results
+
+    @exclusive
+    def compare_and_swap(
+        self, book_id: str, expected_version: int, data: Dict
+    ) -> Optional[Book]:
+        """Apply ``data`` only if the record is still at ``expected_version``.
+
+        Returns None when the book does not exist and raises
+        VersionConflictError when someone else wrote it first.
+        """
+        items = self._read_file()
+        for item in items:
+            if item.get("book_id") == book_id:
+                self._check_version(item, expected_version)
+                pending = []
+                item.update(self._versioned(item, data, pending))
+                self._write_file(items)
+                self._store_history(pending)
+                return self._book(item)
         return None
 
+    @exclusive
+    def compare_and_swap_books(
+        self, updates: Dict[str, Tuple[int, Dict]]
+    ) -> List[Union[Book, VersionConflictError, None]]:
+        """Batch compare_and_swap of ``{book_id: (expected_version, data)}``.
+
+        Every book is checked on its own and the ones that pass are stored
+        in one write. Per input, in order: the stored Book, None if there is
+        no such book, or the VersionConflictError (returned, not raised) of
+        a book that has moved on.
+        """
+        items = self._read_file()
+        positions = {}
+        for idx, item in enumerate(items):
+            positions.setdefault(item.get("book_id"), idx)
+        results: List[Union[Book, VersionConflictError, None]] = []
+        pending = []
+        for book_id, (expected_version, data) in updates.items():
+            idx = positions.get(book_id)
+            if idx is None:
+                results.append(None)
+                continue
+            try:
+                self._check_version(items[idx], expected_version)
+            except VersionConflictError as e:
+                results.append(e)
+                continue
+            items[idx].update(self._versioned(items[idx], data, pending))
+            results.append(self._book(items[idx]))
+        if any(isinstance(r, Book) for r in results):
+            self._write_file(items)
+            self._store_history(pending)
+        return results
+
+    @exclusive
+    def mutate(self, book_id: str, fn: Callable[[Book], None]) -> Optional[Book]:
+        """Read a book, let ``fn`` change it in place, and store it.
+
+        The file lock is held throughout, so this is one read and one write
+        and no other writer can interleave. If ``fn`` raises nothing is
+        written. Returns the stored Book, or None if there is no such book.
+        """
+        items = self._read_file()
+        for item in items:
+            if item.get("book_id") == book_id:
+                book = self._book(item)
+                fn(book)
+                pending = []
+                item.update(self._versioned(item, book.to_dict(), pending))
+                self._write_file(items)
+                self._store_history(pending)
+                book.version = item["version"]
+                return book
+        return None
+
+    @exclusive
     def delete_book(self, book_id: str) -> bool:
         items = self._read_file()
         new_items = [it for it in items if it.get("book_id") != book_id]
@@ -60,13 +305,84 @@ class BookRepository(BookRepositoryProtocol):
         self._write_file(new_items)
         return True
 
+    @exclusive
+    def delete_books(self, book_ids: List[str]) -> List[bool]:
+        items = self._read_file()
+        remaining = {it.get("book_id") for it in items}
+        doomed = set()
+        results = []
+        for book_id in book_ids:
+            found = book_id in remaining
+            remaining.discard(book_id)
+            if found:
+                doomed.add(book_id)
+            results.append(found)
+        if doomed:
+            self._write_file([it for it in items if it.get("book_id") not in doomed])
+        return results
+
     def find_book_by_name(self, query: str) -> List[Book]:
         if not isinstance(query, str):
             return []
         q = query.lower()
-        return [b for b in self.get_all_books() if b.title and q in b.title.lower()]
+        return [
+            self._book(item)
+            for item in self.iter_records()
+            if item.get("title") and q in item["title"].lower()
+        ]
+
+    def search_by_name(self, query: str, limit: int = 10) -> List[Book]:
+        if not isinstance(query, str):
+            return []
+        q = query.lower()
+        matches = []
+        for pos, item in enumerate(self.iter_records()):
+            title = (item.get("title") or "").lower()
+            if title and q in title:
+                matches.append(((match_rank(title, q), pos), item))
+        best = heapq.nsmallest(limit, matches, key=lambda m: m[0])
+        return [self._book(item) for _, item in best]
+
+    def find_books(
+        self,
+        filters: Optional[Dict] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Book]:
+        """Books matching every filter, optionally sorted and cut to ``limit``.
+
+        See ``book_query`` for the filter syntax. This streams the file and
+        tests each record; without ``sort`` it stops after ``limit`` matches.
+        """
+        conditions = parse_filters(filters)
+        sort_key = parse_sort(sort)
+        found = (item for item in self.iter_records() if matches(item, conditions))
+        return [self._book(item) for item in order(found, sort_key, limit)]
 
+    def list_books(
+        self,
+        after: Optional[str] = None,
+        limit: int = 20,
+        order_by: Optional[str] = None,
+    ) -> List[Book]:
+        """One keyset page of books ordered by ``(order_by, book_id)``.
+
+        ``after`` is a cursor from ``book_query.encode_cursor``. The file is
+        streamed with only ``limit`` records held at a time, and only the
+        page is turned into Books.
+        """
+        return [
+            self._book(item)
+            for item in page(self.iter_records(), order_by, after, limit)
+        ]
+
+    @exclusive
     def append_checkout_history(self, book_id: str, entry: Dict) -> None:
+        if self.history is not None:
+            # streamed existence check; the catalog itself is not rewritten
+            if any(item.get("book_id") == book_id for item in self.iter_records()):
+                self.history.append(book_id, entry)
+            return
         items = self._read_file()
         for idx, item in enumerate(items):
             if item.get("book_id") == book_id:
@@ -76,3 +392,62 @@ class BookRepository(BookRepositoryProtocol):
                 items[idx] = item
                 self._write_file(items)
                 return
+
+    def get_history(
+        self, book_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """A page of one book's checkout history, oldest first."""
+        if self.history is not None:
+            return self.history.for_book(book_id, offset, limit)
+        for item in self.iter_records():
+            if item.get("book_id") == book_id:
+                history = item.get("checkout_history") or []
+                end = None if limit is None else offset + limit
+                return list(history[offset:end])
+        return []
+
+    def get_user_history(
+        self, user_email: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """A page of one user's entries across books; each has its book_id."""
+        if self.history is not None:
+            return self.history.for_user(user_email, offset, limit)
+        entries = (
+            dict(entry, book_id=item.get("book_id"))
+            for item in self.iter_records()
+            for entry in item.get("checkout_history") or []
+            if entry.get("user_email") == user_email
+        )
+        end = None if limit is None else offset + limit
+        return list(itertools.islice(entries, offset, end))
+
+    @exclusive
+    def migrate_checkout_history(self) -> int:
+        """Move inline histories into the history store; returns entries moved.
+
+        Safe to re-run after a crash: a book whose entries are already in the
+        store is not appended again.
+        """
+        if self.history is None:
+            return 0
+        items = self._read_file()
+        moved = self._move_inline_history(items)
+        if moved is not None:
+            self._write_file(items)
+        return moved or 0
+
+    def _move_inline_history(self, items) -> Optional[int]:
+        # strips checkout_history from ``items`` in place; None if none had it
+        pending = []
+        touched = False
+        for item in items:
+            if "checkout_history" not in item:
+                continue
+            touched = True
+            history = item.pop("checkout_history") or []
+            book_id = item.get("book_id")
+            # a crash may have stored some of them already
+            stored = self.history.count(book_id)
+            pending.extend((book_id, entry) for entry in history[stored:])
+        self.history.append_many(pending)
+        return len(pending) if touched else None
@@ -1,10 +1,22 @@
-from typing import Protocol, List, Optional, Dict
+from typing import Callable, Protocol, Iterator, List, Optional, Dict, Tuple, Union
 from src.domain.book import Book
 
 
+class VersionConflictError(Exception):
+    """A compare-and-swap found the record at a different version."""
+
+    def __init__(self, book_id: str, expected: int, actual: int):
+        super().__init__(f"Book {book_id} is at version {actual}, expected {expected}")
+        self.book_id = book_id
+        self.expected = expected
+        self.actual = actual
+
+
 class BookRepositoryProtocol(Protocol):
     def get_all_books(self) -> List[Book]: ...
 
+    def iter_books(self) -> Iterator[Book]: ...
+
     def add_book(self, book: Book) -> str: ...
 
     def get_book_by_id(self, book_id: str) -> Optional[Book]: ...
@@ -15,4 +27,44 @@ class BookRepositoryProtocol(Protocol):
 
     def find_book_by_name(self, query: str) -> List[Book]: ...
 
+    def search_by_name(self, query: str, limit: int = 10) -> List[Book]: ...
+
     def append_checkout_history(self, book_id: str, entry: Dict) -> None: ...
+
+    def add_books(self, books: List[Book]) -> List[str]: ...
+
+    def update_books(self, updates: Dict[str, Dict]) -> List[Optional[Book]]: ...
+
+    def delete_books(self, book_ids: List[str]) -> List[bool]: ...
+
+    def get_history(
+        self, book_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]: ...
+
+    def get_user_history(
+        self, user_email: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]: ...
+
+    def compare_and_swap(
+        self, book_id: str, expected_version: int, data: Dict
+    ) -> Optional[Book]: ...
+
+    def mutate(self, book_id: str, fn: Callable[[Book], None]) -> Optional[Book]: ...
+
+    def compare_and_swap_books(
+        self, updates: Dict[str, Tuple[int, Dict]]
+    ) -> List[Union[Book, VersionConflictError, None]]: ...
+
+    def find_books(
+        self,
+        filters: Optional[Dict] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Book]: ...
+
+    def list_books(
+        self,
+        after: Optional[str] = None,
+        limit: int = 20,
+        order_by: Optional[str] = None,
+    ) -> List[Book]: ...
@@ -0,0 +1,461 @@
+import bisect
+import heapq
+import os
+from typing import Callable, Iterator, List, Optional, Dict, Sequence, Tuple, Union
+from src.domain.book import Book
+from src.instrumentation import metrics
+from src.repositories.book_repository import BookRepository
+from src.repositories.book_repository_protocol import VersionConflictError
+from src.repositories.book_query import (
+    decode_cursor,
+    matches,
+    order,
+    order_key,
+    parse_filters,
+    parse_order,
+    parse_sort,
+)
+from src.repositories.field_index import FieldIndexes
+from src.repositories.file_io import exclusive
+from src.repositories.title_index import TrigramIndex, match_rank
+
+
+class CachedBookRepository(BookRepository):
+    """JSON repository that keeps the parsed catalog in memory.
+
+    Records live in an insertion-ordered ``book_id -> record`` dict, so point
+    lookups are O(1) and iteration preserves file order. The file is only
+    re-read when its (mtime, size, inode) signature changes, which picks up
+    edits made by other processes. Book ids are assumed to be unique.
+
+    Titles are kept in a trigram index so name searches only touch the
+    records that can match. ``find_books`` builds hash and sorted field
+    indexes on first use and keeps them current from then on; ``list_books``
+    keeps each sort order it has served until a write touches its field.
+    """
+
+    def __init__(
+        self,
+        filepath: str = "books.json",
+        history_path: Optional[str] = None,
+        codec="json",
+    ):
+        super().__init__(filepath, history_path, codec)
+        self._index: Dict[str, Dict] = {}
+        self._positions: Dict[str, int] = {}
+        self._next_position = 0
+        self._titles = TrigramIndex()
+        self._fields: Optional[FieldIndexes] = None
+        # (field, descending) -> (sorted keys, book ids in that order)
+        self._orderings: Dict[Tuple[str, bool], Tuple[List, List[str]]] = {}
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._loaded = False
+
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.filepath)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _load(self) -> Dict[str, Dict]:
+        # mutators hold the exclusive file lock here, so a reload picks up
+        # every write another process committed before ours
+        signature = self._file_signature()
+        if self._loaded and signature == self._signature:
+            return self._index
+        metrics.count("repo.cache_reloads")
+        index: Dict[str, Dict] = {}
+        for item in self._read_file():
+            book_id = item.get("book_id")
+            if book_id is not None and book_id not in index:
+                index[book_id] = item
+        self._index = index
+        with metrics.timer("repo.reindex"):
+            self._reindex()
+        self._signature = signature
+        self._loaded = True
+        return self._index
+
+    def _reindex(self):
+        """Rebuild the derived indexes after ``_index`` was replaced."""
+        self._positions = {book_id: pos for pos, book_id in enumerate(self._index)}
+        self._next_position = len(self._positions)
+        self._titles.rebuild(
+            (book_id, item.get("title")) for book_id, item in self._index.items()
+        )
+        self._fields = None
+        self._orderings = {}
+
+    def _field_indexes(self) -> FieldIndexes:
+        if self._fields is None:
+            with metrics.timer("repo.field_index_build"):
+                fields = FieldIndexes()
+                fields.rebuild(
+                    (book_id, self._positions[book_id], item)
+                    for book_id, item in self._index.items()
+                )
+            self._fields = fields
+        return self._fields
+
+    def _put(self, record: Dict):
+        book_id = record["book_id"]
+        old = self._index.get(book_id)
+        if old is None:
+            self._positions[book_id] = self._next_position
+            self._next_position += 1
+        elif self._fields is not None:
+            self._fields.remove(book_id, self._positions[book_id], old)
+        self._index[book_id] = record
+        self._orderings.clear()
+        self._titles.add(book_id, record.get("title"))
+        if self._fields is not None:
+            self._fields.add(book_id, self._positions[book_id], record)
+
+    def _patch(self, item: Dict, data: Dict):
+        book_id = item["book_id"]
+        if self._fields is not None:
+            self._fields.remove(book_id, self._positions[book_id], item, data)
+        item.update(data)
+        if self._fields is not None:
+            self._fields.add(book_id, self._positions[book_id], item, data)
+        for ordering in [o for o in self._orderings if o[0] in data]:
+            del self._orderings[ordering]
+        if "title" in data:
+            self._titles.add(book_id, item.get("title"))
+
+    def _drop(self, book_id: str) -> bool:
+        item = self._index.pop(book_id, None)
+        if item is None:
+            return False
+        pos = self._positions.pop(book_id)
+        self._orderings.clear()
+        self._titles.remove(book_id)
+        if self._fields is not None:
+            self._fields.remove(book_id, pos, item)
+        return True
+
+    def _commit(self, ops: List[Dict]):
+        """Persist mutations that have already been applied to the cache.
+
+        Each op describes one change (``add``/``update``/``delete``) so
+        subclasses can store them incrementally; here the whole file is
+        rewritten once from the cached records.
+        """
+        self._write_file(list(self._index.values()))
+        self._signature = self._file_signature()
+
+    def _persist(self, ops: List[Dict], pending: Sequence = ()):
+        """``_commit`` the ops, then store the history ``pending`` for them.
+
+        If the commit fails the cache is dropped and the error re-raised:
+        the ops are already applied to the cache, and a failed write leaves
+        the file signature as it was, so the cache would otherwise keep
+        serving changes that never reached disk.
+        """
+        try:
+            self._commit(ops)
+        except BaseException:
+            self.invalidate()
+            raise
+        self._store_history(pending)
+
+    @staticmethod
+    def _copy_record(item: Dict) -> Dict:
+        # callers mutate Book.checkout_history in place, so never share it
+        record = dict(item)
+        if record.get("checkout_history") is not None:
+            record["checkout_history"] = list(record["checkout_history"])
+        return record
+
+    def _to_book(self, item: Dict) -> Book:
+        return self._book(self._copy_record(item))
+
+    def _rewrite(self):
+        """Persist the whole cached catalog, e.g. after a migration."""
+        self._write_file(list(self._index.values()))
+        self._signature = self._file_signature()
+
+    def invalidate(self):
+        """Drop the cache so the next call reloads from disk."""
+        self._loaded = False
+
+    def get_all_books(self) -> List[Book]:
+        return [self._to_book(item) for item in self._load().values()]
+
+    def iter_records(self) -> Iterator[Dict]:
+        for item in list(self._load().values()):
+            yield self._copy_record(item)
+
+    def iter_books(self) -> Iterator[Book]:
+        for item in list(self._load().values()):
+            yield self._to_book(item)
+
+    @exclusive
+    def add_book(self, book: Book) -> str:
+        self._load()
+        pending = []
+        record = self._copy_record(
+            self._detach_history(book.book_id, book.to_dict(), pending)
+        )
+        self._put(record)
+        self._persist([{"op": "add", "record": record}], pending)
+        return book.book_id
+
+    @exclusive
+    def add_books(self, books: List[Book]) -> List[str]:
+        self._load()
+        # prepare every record before touching the cache, so one that is
+        # rejected leaves the cache as it is on disk
+        pending = []
+        records = [
+            self._copy_record(
+                self._detach_history(book.book_id, book.to_dict(), pending)
+            )
+            for book in books
+        ]
+        for record in records:
+            self._put(record)
+        if records:
+            self._persist([{"op": "add", "record": r} for r in records], pending)
+        return [book.book_id for book in books]
+
+    def get_book_by_id(self, book_id: str) -> Optional[Book]:
+        item = self._load().get(book_id)
+        return self._to_book(item) if item is not None else None
+
+    @exclusive
+    def update_book(self, book_id: str, data: Dict) -> Optional[Book]:
+        item = self._load().get(book_id)
+        if item is None:
+            return None
+        pending = []
+        data = self._copy_record(self._versioned(item, data, pending))
+        self._patch(item, data)
+        self._persist([{"op": "update", "book_id": book_id, "data": data}], pending)
+        return self._to_book(item)
+
+    @exclusive
+    def update_books(self, updates: Dict[str, Dict]) -> List[Optional[Book]]:
+        index = self._load()
+        found: List[Optional[Dict]] = []
+        staged = []
+        pending = []
+        for book_id, data in updates.items():
+            item = index.get(book_id)
+            found.append(item)
+            if item is not None:
+                data = self._copy_record(self._versioned(item, data, pending))
+                staged.append((item, data))
+        self._patch_many(staged, pending)
+        return [self._to_book(item) if item is not None else None for item in found]
+
+    def _patch_many(self, staged: List[Tuple[Dict, Dict]], pending: List):
+        """Apply already versioned ``(item, data)`` pairs and commit them.
+
+        ``pending`` is the history their versioning queued, stored once the
+        commit has succeeded.
+
+        Everything that can reject an update has run by now, so the cache
+        only has to be dropped if the commit itself fails.
+        """
+        ops = []
+        for item, data in staged:
+            self._patch(item, data)
+            ops.append({"op": "update", "book_id": item["book_id"], "data": data})
+        if ops:
+            self._persist(ops, pending)
+
+    @exclusive
+    def compare_and_swap_books(
+        self, updates: Dict[str, Tuple[int, Dict]]
+    ) -> List[Union[Book, VersionConflictError, None]]:
+        index = self._load()
+        results: List[Union[Dict, VersionConflictError, None]] = []
+        staged = []
+        pending = []
+        for book_id, (expected_version, data) in updates.items():
+            item = index.get(book_id)
+            if item is None:
+                results.append(None)
+                continue
+            try:
+                self._check_version(item, expected_version)
+            except VersionConflictError as e:
+                results.append(e)
+                continue
+            data = self._copy_record(self._versioned(item, data, pending))
+            staged.append((item, data))
+            results.append(item)
+        self._patch_many(staged, pending)
+        return [self._to_book(r) if isinstance(r, dict) else r for r in results]
+
+    def _store(self, item: Dict, data: Dict) -> Dict:
+        pending = []
+        data = self._copy_record(self._versioned(item, data, pending))
+        # journal only what changed; version always does
+        data = {k: v for k, v in data.items() if item.get(k) != v}
+        self._patch(item, data)
+        op = {"op": "update", "book_id": item["book_id"], "data": data}
+        self._persist([op], pending)
+        return data
+
+    @exclusive
+    def compare_and_swap(
+        self, book_id: str, expected_version: int, data: Dict
+    ) -> Optional[Book]:
+        item = self._load().get(book_id)
+        if item is None:
+            return None
+        self._check_version(item, expected_version)
+        self._store(item, data)
+        return self._to_book(item)
+
+    @exclusive
+    def mutate(self, book_id: str, fn: Callable[[Book], None]) -> Optional[Book]:
+        item = self._load().get(book_id)
+        if item is None:
+            return None
+        book = self._to_book(item)
+        fn(book)
+        self._store(item, book.to_dict())
+        book.version = item["version"]
+        return book
+
+    @exclusive
+    def delete_book(self, book_id: str) -> bool:
+        self._load()
+        if not self._drop(book_id):
+            return False
+        self._persist([{"op": "delete", "book_id": book_id}])
+        return True
+
+    @exclusive
+    def delete_books(self, book_ids: List[str]) -> List[bool]:
+        self._load()
+        results = []
+        ops = []
+        for book_id in book_ids:
+            found = self._drop(book_id)
+            results.append(found)
+            if found:
+                ops.append({"op": "delete", "book_id": book_id})
+        if ops:
+            self._persist(ops)
+        return results
+
+    def find_book_by_name(self, query: str) -> List[Book]:
+        if not isinstance(query, str):
+            return []
+        index = self._load()
+        matches = sorted(self._titles.search(query), key=self._positions.__getitem__)
+        return [self._to_book(index[book_id]) for book_id in matches]
+
+    def search_by_name(self, query: str, limit: int = 10) -> List[Book]:
+        if not isinstance(query, str):
+            return []
+        index = self._load()
+        q = query.lower()
+        best = heapq.nsmallest(
+            limit,
+            self._titles.search(query),
+            key=lambda book_id: (
+                match_rank(self._titles.text(book_id), q),
+                self._positions[book_id],
+            ),
+        )
+        return [self._to_book(index[book_id]) for book_id in best]
+
+    @exclusive
+    def append_checkout_history(self, book_id: str, entry: Dict) -> None:
+        item = self._load().get(book_id)
+        if item is None:
+            return
+        if self.history is not None:
+            self.history.append(book_id, entry)
+            return
+        history = list(item.get("checkout_history") or [])
+        history.append(entry)
+        item["checkout_history"] = history
+        # record the full history so replaying the op is idempotent
+        self._persist(
+            [
+                {
+                    "op": "update",
+                    "book_id": book_id,
+                    "data": {"checkout_history": history},
+                }
+            ]
+        )
+
+    def get_history(
+        self, book_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        if self.history is not None:
+            return self.history.for_book(book_id, offset, limit)
+        item = self._load().get(book_id)
+        history = (item or {}).get("checkout_history") or []
+        end = None if limit is None else offset + limit
+        return [dict(entry) for entry in history[offset:end]]
+
+    @exclusive
+    def migrate_checkout_history(self) -> int:
+        if self.history is None:
+            return 0
+        moved = self._move_inline_history(self._load().values())
+        if moved is not None:
+            self._rewrite()
+        return moved or 0
+
+    def find_books(
+        self,
+        filters: Optional[Dict] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Book]:
+        conditions = parse_filters(filters)
+        sort_key = parse_sort(sort)
+        index = self._load()
+        ids = self._field_indexes().candidates(conditions) if conditions else None
+        if ids is None:
+            records = index.values()
+        else:
+            records = (index[i] for i in sorted(ids, key=self._positions.__getitem__))
+        found = (item for item in records if matches(item, conditions))
+        return [self._to_book(item) for item in order(found, sort_key, limit)]
+
+    def _ordering(self, field: str, descending: bool) -> Tuple[List, List[str]]:
+        ordering = self._orderings.get((field, descending))
+        if ordering is None:
+            key = order_key(field, descending)
+            with metrics.timer("repo.ordering_build"):
+                keyed = sorted(
+                    (key(item), book_id) for book_id, item in self._index.items()
+                )
+            ordering = ([k for k, _ in keyed], [book_id for _, book_id in keyed])
+            self._orderings[(field, descending)] = ordering
+        return ordering
+
+    def list_books(
+        self,
+        after: Optional[str] = None,
+        limit: int = 20,
+        order_by: Optional[str] = None,
+    ) -> List[Book]:
+        field, descending = parse_order(order_by)
+        index = self._load()
+        keys, ids = self._ordering(field, descending)
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(
+                keys, order_key(field, descending)(decode_cursor(after, order_by))
+            )
+        return [self._to_book(index[book_id]) for book_id in ids[start : start + limit]]
+
+    def explain(self, filters: Optional[Dict] = None) -> Dict:
+        """How ``find_books`` would run: the index it picks and its row estimate."""
+        self._load()
+        plan = self._field_indexes().plan(parse_filters(filters))
+        if plan is None:
+            return {"index": None, "rows": len(self._index)}
+        return {"index": plan[0], "rows": plan[1]}
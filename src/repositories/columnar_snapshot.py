@@ -0,0 +1,207 @@
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+NUMERIC_COLUMNS = [
+    "publication_year",
+    "page_count",
+    "average_rating",
+    "ratings_count",
+    "price_usd",
+    "sales_millions",
+]
+CATEGORICAL_COLUMNS = ["genre", "author", "publisher", "language", "format"]
+BOOL_COLUMNS = ["available", "in_print"]
+STRING_COLUMNS = ["book_id", "title"]
+COLUMNS = STRING_COLUMNS + CATEGORICAL_COLUMNS + NUMERIC_COLUMNS + BOOL_COLUMNS
+
+_CATEGORIES = "__categories"
+_SIGNATURE = "__source_signature"
+
+
+def _to_float(value) -> float:
+    # same outcome as pd.to_numeric(errors="coerce") for the values we store
+    if value is None or isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def source_signature(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+class ColumnarSnapshot:
+    """Typed, column-oriented copy of the catalog for analytics.
+
+    Numeric fields are float64 arrays with NaN for missing values,
+    categorical fields are int32 codes plus a category array (-1 for
+    missing), and booleans are ``available`` (missing counts as available)
+    and ``in_print`` as float (NaN for missing). Checkout history is not
+    included.
+
+    A snapshot is saved as an ``.npz`` file next to ``books.json``. Loading it
+    is lazy: a column is read from disk the first time it is asked for, so an
+    analytics call only pays for the columns it uses. A loaded snapshot keeps
+    the file open until ``close()`` (or the end of a ``with`` block); columns
+    already read stay usable after that.
+    """
+
+    def __init__(self, arrays, signature: Optional[List[int]] = None):
+        self._arrays = arrays
+        self._cache: Dict[str, np.ndarray] = {}
+        self.signature = signature
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Dict], signature: Optional[List[int]] = None
+    ) -> "ColumnarSnapshot":
+        values: Dict[str, list] = {c: [] for c in COLUMNS}
+        codes: Dict[str, Dict[str, int]] = {c: {} for c in CATEGORICAL_COLUMNS}
+        for record in records:
+            get = record.get
+            for c in STRING_COLUMNS:
+                values[c].append(get(c) or "")
+            for c in CATEGORICAL_COLUMNS:
+                v = get(c)
+                if v is None:
+                    values[c].append(-1)
+                else:
+                    values[c].append(codes[c].setdefault(v, len(codes[c])))
+            for c in NUMERIC_COLUMNS:
+                values[c].append(_to_float(get(c)))
+            available = get("available")
+            values["available"].append(True if available is None else available)
+            in_print = get("in_print")
+            values["in_print"].append(math.nan if in_print is None else in_print)
+
+        arrays: Dict[str, np.ndarray] = {}
+        for c in STRING_COLUMNS:
+            arrays[c] = np.array(values[c], dtype=str)
+        for c in CATEGORICAL_COLUMNS:
+            arrays[c] = np.array(values[c], dtype=np.int32)
+            arrays[c + _CATEGORIES] = np.array(list(codes[c]), dtype=str)
+        for c in NUMERIC_COLUMNS:
+            arrays[c] = np.array(values[c], dtype=np.float64)
+        arrays["available"] = np.array(values["available"], dtype=bool)
+        arrays["in_print"] = np.array(values["in_print"], dtype=np.float64)
+        return cls(arrays, signature)
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Dict[str, np.ndarray],
+        categories: Dict[str, np.ndarray],
+        signature: Optional[List[int]] = None,
+    ) -> "ColumnarSnapshot":
+        """Build a snapshot from arrays already in snapshot layout.
+
+        ``columns`` holds every column in COLUMNS (categorical ones as int32
+        codes) and ``categories`` the category array of each categorical
+        column.
+        """
+        arrays = dict(columns)
+        for c in CATEGORICAL_COLUMNS:
+            arrays[c + _CATEGORIES] = np.asarray(categories[c], dtype=str)
+        return cls(arrays, signature)
+
+    @classmethod
+    def from_repository(cls, repo) -> "ColumnarSnapshot":
+        """Build a snapshot from a repository, skipping Book objects if possible."""
+        if hasattr(repo, "iter_records"):
+            records = repo.iter_records()
+        else:
+            records = (b.to_dict() for b in repo.iter_books())
+        signature = source_signature(getattr(repo, "filepath", ""))
+        return cls.from_records(records, signature)
+
+    @staticmethod
+    def path_for(filepath: str) -> str:
+        root, _ = os.path.splitext(filepath)
+        return root + ".columns.npz"
+
+    def save(self, path: str):
+        arrays = {name: self._arrays[name] for name in self._arrays.keys()}
+        if self.signature is not None:
+            arrays[_SIGNATURE] = np.array(self.signature, dtype=np.int64)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ColumnarSnapshot":
+        npz = np.load(path, allow_pickle=False)
+        try:
+            signature = npz[_SIGNATURE].tolist() if _SIGNATURE in npz.files else None
+        except BaseException:
+            npz.close()
+            raise
+        return cls(npz, signature)
+
+    def close(self):
+        """Close the ``.npz`` file of a loaded snapshot; a no-op otherwise."""
+        if hasattr(self._arrays, "close"):
+            self._arrays.close()
+
+    def __enter__(self) -> "ColumnarSnapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @classmethod
+    def for_repository(cls, repo, path: Optional[str] = None) -> "ColumnarSnapshot":
+        """Load the saved snapshot for ``repo``, rebuilding it if stale.
+
+        Staleness is judged by the mtime and size of the repository file
+        recorded when the snapshot was written.
+        """
+        path = path or cls.path_for(repo.filepath)
+        current = source_signature(repo.filepath)
+        if current is not None and os.path.exists(path):
+            snapshot = cls.load(path)
+            if snapshot.signature == current:
+                return snapshot
+            snapshot.close()
+        snapshot = cls.from_repository(repo)
+        snapshot.save(path)
+        return snapshot
+
+    @property
+    def version(self):
+        return tuple(self.signature) if self.signature is not None else id(self)
+
+    def __len__(self) -> int:
+        return len(self.column("available"))
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._cache:
+            self._cache[name] = self._arrays[name]
+        return self._cache[name]
+
+    def categories(self, name: str) -> np.ndarray:
+        return self.column(name + _CATEGORIES)
+
+    def to_frame(self, columns: Optional[List[str]] = None):
+        """Build a DataFrame holding just ``columns`` (all if None)."""
+        import pandas as pd
+
+        data = {}
+        for c in columns or COLUMNS:
+            if c not in COLUMNS:
+                continue
+            if c in CATEGORICAL_COLUMNS:
+                data[c] = pd.Categorical.from_codes(
+                    self.column(c), categories=self.categories(c)
+                )
+            else:
+                data[c] = self.column(c)
+        return pd.DataFrame(data)
@@ -0,0 +1,187 @@
+import bisect
+import math
+from collections import defaultdict
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.repositories.book_query import (
+    CATEGORICAL_FIELDS,
+    NUMERIC_FIELDS,
+    Condition,
+)
+
+_BEFORE = -math.inf
+_AFTER = math.inf
+
+
+def _sortable(value) -> bool:
+    # exact type test skips bools; NaN (!= itself) would break the bisects
+    return type(value) in (int, float) and value == value
+
+
+class SortedIndex:
+    """Numeric values of one field kept sorted, for range lookups.
+
+    Entries are ``(value, position, book_id)``; the catalog position keeps
+    entries unique so one can be found and removed with a bisect. Records
+    whose value is missing or not a number are left out, which is what a
+    range comparison would do with them anyway.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[float, int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, items: Iterable[Tuple[str, int, object]]):
+        """Load ``(book_id, position, value)`` items given in position order."""
+        self._entries = [
+            (value, pos, book_id)
+            for book_id, pos, value in items
+            if type(value) in (int, float) and value == value
+        ]
+        # items arrive in position order, so a stable sort on the value alone
+        # gives (value, position) order without comparing whole tuples
+        self._entries.sort(key=itemgetter(0))
+
+    def add(self, book_id: str, pos: int, value):
+        if _sortable(value):
+            bisect.insort(self._entries, (value, pos, book_id))
+
+    def remove(self, book_id: str, pos: int, value):
+        if not _sortable(value):
+            return
+        i = bisect.bisect_left(self._entries, (value, pos, book_id))
+        if i < len(self._entries) and self._entries[i][2] == book_id:
+            del self._entries[i]
+
+    def span(self, lo=None, lo_open=False, hi=None, hi_open=False) -> Tuple[int, int]:
+        """Slice bounds of the entries within ``lo``..``hi``."""
+        entries = self._entries
+        if lo is None:
+            start = 0
+        elif lo_open:
+            start = bisect.bisect_right(entries, (lo, _AFTER))
+        else:
+            start = bisect.bisect_left(entries, (lo, _BEFORE))
+        if hi is None:
+            end = len(entries)
+        elif hi_open:
+            end = bisect.bisect_left(entries, (hi, _BEFORE))
+        else:
+            end = bisect.bisect_right(entries, (hi, _AFTER))
+        return start, max(start, end)
+
+    def ids(self, start: int, end: int) -> List[str]:
+        return [entry[2] for entry in self._entries[start:end]]
+
+
+class FieldIndexes:
+    """Hash indexes on categorical fields and sorted ones on numeric fields.
+
+    ``candidates`` is the query planner: it estimates how many records each
+    indexable condition lets through (a posting-set size or a bisected
+    range width, both exact) and returns the ids from the narrowest one.
+    The caller still checks every condition against those records.
+    """
+
+    def __init__(self):
+        self._hash: Dict[str, Dict[object, Set[str]]] = {
+            f: defaultdict(set) for f in CATEGORICAL_FIELDS
+        }
+        self._sorted: Dict[str, SortedIndex] = {
+            f: SortedIndex() for f in NUMERIC_FIELDS
+        }
+
+    def rebuild(self, records: Iterable[Tuple[str, int, Dict]]):
+        records = list(records)
+        for field, postings in self._hash.items():
+            postings.clear()
+            for book_id, _, record in records:
+                try:
+                    postings[record.get(field)].add(book_id)
+                except TypeError:  # unhashable junk value; never matches
+                    pass
+        for field, index in self._sorted.items():
+            index.rebuild(
+                (book_id, pos, rec.get(field)) for book_id, pos, rec in records
+            )
+
+    def _fields(self, fields) -> Iterable[str]:
+        return (*self._hash, *self._sorted) if fields is None else fields
+
+    def add(self, book_id: str, pos: int, record: Dict, fields=None):
+        """Index ``record``; ``fields`` limits this to the fields named."""
+        for field in self._fields(fields):
+            value = record.get(field)
+            if field in self._hash:
+                if value.__hash__ is not None:
+                    self._hash[field][value].add(book_id)
+            elif field in self._sorted:
+                self._sorted[field].add(book_id, pos, value)
+
+    def remove(self, book_id: str, pos: int, record: Dict, fields=None):
+        for field in self._fields(fields):
+            value = record.get(field)
+            if field in self._hash:
+                if value.__hash__ is None:
+                    continue
+                postings = self._hash[field].get(value)
+                if postings is not None:
+                    postings.discard(book_id)
+                    if not postings:
+                        del self._hash[field][value]
+            elif field in self._sorted:
+                self._sorted[field].remove(book_id, pos, value)
+
+    def _hash_plan(self, cond: Condition) -> Tuple[int, List[Set[str]]]:
+        postings = self._hash[cond.field]
+        values = cond.value if cond.op == "in" else [cond.value]
+        sets = [postings[v] for v in values if v.__hash__ is not None and v in postings]
+        return sum(len(s) for s in sets), sets
+
+    def _range_plans(self, conditions: List[Condition]) -> Dict[str, Tuple[int, int]]:
+        # fold every range/equality condition on a field into one interval
+        bounds: Dict[str, List] = {}
+        for field, op, value in conditions:
+            if field not in self._sorted or op == "in" or not _sortable(value):
+                continue
+            lo, lo_open, hi, hi_open = bounds.get(field, [None, False, None, False])
+            if op in ("gt", "gte", "eq") and (lo is None or value >= lo):
+                lo_open = op == "gt" or (value == lo and lo_open)
+                lo = value
+            if op in ("lt", "lte", "eq") and (hi is None or value <= hi):
+                hi_open = op == "lt" or (value == hi and hi_open)
+                hi = value
+            bounds[field] = [lo, lo_open, hi, hi_open]
+        return {f: self._sorted[f].span(*b) for f, b in bounds.items()}
+
+    def _best(self, conditions: List[Condition]):
+        best = None
+        for cond in conditions:
+            if cond.field in self._hash:
+                size, sets = self._hash_plan(cond)
+                if best is None or size < best[0]:
+                    best = (size, cond.field, sets)
+        for field, (start, end) in self._range_plans(conditions).items():
+            if best is None or end - start < best[0]:
+                best = (end - start, field, (start, end))
+        return best
+
+    def plan(self, conditions: List[Condition]) -> Optional[Tuple[str, int]]:
+        """``(field, estimated rows)`` of the index to use, or None to scan."""
+        best = self._best(conditions)
+        return None if best is None else (best[1], best[0])
+
+    def candidates(self, conditions: List[Condition]) -> Optional[Set[str]]:
+        """Ids that may match, from the most selective index; None means scan."""
+        best = self._best(conditions)
+        if best is None:
+            return None
+        _, field, found = best
+        if field in self._sorted:
+            return set(self._sorted[field].ids(*found))
+        ids: Set[str] = set()
+        for postings in found:
+            ids |= postings
+        return ids
@@ -0,0 +1,120 @@
+import functools
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, IO
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class FileLock:
+    """Reentrant shared/exclusive lock backed by ``flock`` on a sidecar file.
+
+    Threads of one process are serialized by an RLock; other processes see
+    the flock. Nested acquisitions reuse the lock already held, and a shared
+    hold is converted to exclusive if needed (not atomically, so callers
+    that will write should take the exclusive lock up front). On platforms
+    without ``fcntl`` only the in-process lock applies.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+
+    @contextmanager
+    def _hold(self, exclusive: bool):
+        with self._thread_lock:
+            upgraded = False
+            if self._depth == 0:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._exclusive = exclusive
+            elif exclusive and not self._exclusive:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+                self._exclusive = upgraded = True
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if upgraded:
+                    if fcntl is not None:
+                        fcntl.flock(self._fd, fcntl.LOCK_SH)
+                    self._exclusive = False
+                if self._depth == 0:
+                    if fcntl is not None:
+                        fcntl.flock(self._fd, fcntl.LOCK_UN)
+                    os.close(self._fd)
+                    self._fd = None
+
+    def shared(self):
+        return self._hold(exclusive=False)
+
+    def exclusive(self):
+        return self._hold(exclusive=True)
+
+
+def exclusive(method: Callable) -> Callable:
+    """Run a repository method under ``self._file_lock.exclusive()``.
+
+    Used on every read-modify-write so concurrent writers cannot lose each
+    other's updates.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._file_lock.exclusive():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def atomic_write(path: str, write: Callable[[IO], None], mode: str = "w"):
+    """Write ``path`` via a temp file, fsync and rename.
+
+    Readers see either the old or the new file, never a partial one, and a
+    crash leaves the previous contents in place.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory
+    )
+    try:
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except OSError:
+            os.chmod(tmp_path, 0o644)
+        encoding = None if "b" in mode else "utf-8"
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory: str):
+    # make the rename itself durable; not supported everywhere
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,133 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.instrumentation import metrics
+from src.repositories.file_io import FileLock
+
+
+class CheckoutHistoryStore:
+    """Append-only checkout history, one JSON line per entry.
+
+    Lines are ``{"book_id": ..., "entry": {...}}``. The file is indexed by
+    byte offset per book and per ``user_email`` the first time it is
+    queried, and only the new tail is indexed after that, so reading one
+    book's history seeks straight to its lines. Appends from other processes
+    are picked up on the next query; appends hold ``<path>.lock``.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self._file_lock = FileLock(path + ".lock")
+        self._by_book: Dict[str, List[int]] = {}
+        self._by_user: Dict[str, List[int]] = {}
+        self._indexed_to = 0
+
+    def _index(self, offset: int, line: bytes) -> bool:
+        try:
+            item = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return False
+        entry = item.get("entry") or {}
+        self._by_book.setdefault(item.get("book_id"), []).append(offset)
+        email = entry.get("user_email")
+        if email is not None:
+            self._by_user.setdefault(email, []).append(offset)
+        return True
+
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size < self._indexed_to:
+            # replaced or truncated underneath us: start over
+            self._by_book.clear()
+            self._by_user.clear()
+            self._indexed_to = 0
+        if size == self._indexed_to:
+            return
+        with metrics.timer("history.index"):
+            with open(self.path, "rb") as f:
+                f.seek(self._indexed_to)
+                offset = self._indexed_to
+                for line in f:
+                    # stop at a torn last line; the next append repairs it
+                    if not line.endswith(b"\n") or not self._index(offset, line):
+                        break
+                    offset += len(line)
+        self._indexed_to = offset
+
+    def _read(self, offsets: List[int]) -> List[Tuple[str, Dict]]:
+        if not offsets:
+            # the file may not exist yet
+            return []
+        items = []
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                item = json.loads(f.readline())
+                items.append((item["book_id"], item["entry"]))
+        return items
+
+    @staticmethod
+    def _page(offsets: List[int], offset: int, limit: Optional[int]) -> List[int]:
+        return offsets[offset:] if limit is None else offsets[offset : offset + limit]
+
+    def append(self, book_id: str, entry: Dict):
+        self.append_many([(book_id, entry)])
+
+    def append_many(self, items: Iterable[Tuple[str, Dict]]):
+        """Append ``(book_id, entry)`` pairs in order with one write."""
+        lines = [
+            json.dumps({"book_id": book_id, "entry": entry}) + "\n"
+            for book_id, entry in items
+        ]
+        if not lines:
+            return
+        with self._file_lock.exclusive():
+            self._refresh()
+            with open(self.path, "ab") as f:
+                if f.tell() > self._indexed_to:
+                    # drop a torn tail left by a crash mid-append
+                    f.truncate(self._indexed_to)
+                data = "".join(lines).encode("utf-8")
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            metrics.count("history.bytes_written", len(data))
+            offset = self._indexed_to
+            for line in lines:
+                self._index(offset, line)
+                offset += len(line.encode("utf-8"))
+            self._indexed_to = offset
+
+    def count(self, book_id: str) -> int:
+        with self._file_lock.shared():
+            self._refresh()
+            return len(self._by_book.get(book_id, ()))
+
+    def for_book(
+        self, book_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """A page of one book's entries, oldest first."""
+        with self._file_lock.shared():
+            self._refresh()
+            offsets = self._page(self._by_book.get(book_id, []), offset, limit)
+            return [entry for _, entry in self._read(offsets)]
+
+    def for_user(
+        self, user_email: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """A page of one user's entries across all books, oldest first.
+
+        Each entry carries its ``book_id``.
+        """
+        with self._file_lock.shared():
+            self._refresh()
+            offsets = self._page(self._by_user.get(user_email, []), offset, limit)
+            return [
+                dict(entry, book_id=book_id) for book_id, entry in self._read(offsets)
+            ]
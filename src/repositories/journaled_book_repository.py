@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+from typing import List, Optional, Dict
+from src.instrumentation import metrics
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.file_io import atomic_write
+
+
+class JournaledBookRepository(CachedBookRepository):
+    """Snapshot-plus-journal storage engine.
+
+    ``filepath`` holds a snapshot in the same layout as BookRepository.
+    Every mutation is appended as one JSON line to ``<filepath>.journal``
+    instead of rewriting the snapshot, and loading replays the journal on top
+    of the snapshot. ``compact()`` folds the journal back into the snapshot;
+    it also runs automatically once ``compact_threshold`` entries pile up.
+
+    Journal ops set values rather than increment them, so replaying an op
+    that is already reflected in the snapshot is harmless. The engine
+    assumes a single writing process.
+    """
+
+    def __init__(
+        self,
+        filepath: str = "books.json",
+        compact_threshold: Optional[int] = 10000,
+        background_compaction: bool = False,
+        fsync: bool = False,
+        history_path: Optional[str] = None,
+        codec="json",
+    ):
+        super().__init__(filepath, history_path, codec)
+        self.journal_path = filepath + ".journal"
+        self.compact_threshold = compact_threshold
+        self.background_compaction = background_compaction
+        self.fsync = fsync
+        self._journal = None
+        self._journal_entries = 0
+        self._lock = threading.RLock()
+        self._compaction: Optional[threading.Thread] = None
+
+    @property
+    def _compacting_path(self) -> str:
+        return self.journal_path + ".compacting"
+
+    def _replay(self, path: str, index: Dict[str, Dict]) -> int:
+        if not os.path.exists(path):
+            return 0
+        applied = 0
+        good_offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                self._apply(index, op)
+                applied += 1
+                good_offset += len(line)
+        if good_offset < os.path.getsize(path):
+            # drop a torn tail left by a crash mid-append so later appends
+            # are not hidden behind it
+            with open(path, "r+b") as f:
+                f.truncate(good_offset)
+        return applied
+
+    @staticmethod
+    def _apply(index: Dict[str, Dict], op: Dict):
+        kind = op.get("op")
+        if kind == "add":
+            record = op["record"]
+            index[record["book_id"]] = record
+        elif kind == "update":
+            item = index.get(op["book_id"])
+            if item is not None:
+                item.update(op["data"])
+        elif kind == "delete":
+            index.pop(op["book_id"], None)
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._loaded:
+            return self._index
+        with self._lock:
+            self._wait_for_compaction()
+            index: Dict[str, Dict] = {}
+            for item in self._read_file():
+                book_id = item.get("book_id")
+                if book_id is not None and book_id not in index:
+                    index[book_id] = item
+            with metrics.timer("journal.replay"):
+                self._replay(self._compacting_path, index)
+                self._journal_entries = self._replay(self.journal_path, index)
+            self._index = index
+            with metrics.timer("repo.reindex"):
+                self._reindex()
+            self._loaded = True
+        return self._index
+
+    def _open_journal(self):
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        return self._journal
+
+    def _commit(self, ops: List[Dict]):
+        with self._lock, metrics.timer("journal.append"):
+            journal = self._open_journal()
+            text = "".join(json.dumps(op, separators=(",", ":")) + "\n" for op in ops)
+            journal.write(text)
+            journal.flush()
+            if self.fsync:
+                os.fsync(journal.fileno())
+            metrics.count("journal.bytes_written", len(text))
+            self._journal_entries += len(ops)
+            if (
+                self.compact_threshold is not None
+                and self._journal_entries >= self.compact_threshold
+            ):
+                self.compact(background=self.background_compaction)
+
+    def _rewrite(self):
+        self.compact()
+
+    def invalidate(self):
+        with self._lock:
+            self._wait_for_compaction()
+            self._close_journal()
+            self._loaded = False
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _wait_for_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def _write_snapshot(self, records: List[Dict]):
+        with metrics.timer("journal.snapshot"):
+            raw = self.codec.encode(records)
+            atomic_write(self.filepath, lambda f: f.write(raw), "wb")
+        if os.path.exists(self._compacting_path):
+            os.remove(self._compacting_path)
+
+    def _set_journal_aside(self):
+        if not os.path.exists(self.journal_path):
+            return
+        if not os.path.exists(self._compacting_path):
+            os.replace(self.journal_path, self._compacting_path)
+            return
+        # an earlier compaction never finished; keep its ops as well
+        with open(self._compacting_path, "ab") as dst, open(
+            self.journal_path, "rb"
+        ) as src:
+            dst.write(src.read())
+        os.remove(self.journal_path)
+
+    def compact(self, background: bool = False):
+        """Write a fresh snapshot and start an empty journal.
+
+        The current journal is set aside first, so mutations made while a
+        background compaction is writing go to a new journal. Until the new
+        snapshot is in place, loading replays both journals.
+        """
+        with self._lock:
+            self._load()
+            self._wait_for_compaction()
+            records = [dict(item) for item in self._index.values()]
+            self._close_journal()
+            self._set_journal_aside()
+            self._journal_entries = 0
+            if background:
+                self._compaction = threading.Thread(
+                    target=self._write_snapshot, args=(records,), daemon=True
+                )
+                self._compaction.start()
+            else:
+                self._write_snapshot(records)
+
+    def close(self):
+        """Wait for any running compaction and close the journal."""
+        with self._lock:
+            self._wait_for_compaction()
+            self._close_journal()
@@ -0,0 +1,96 @@
+import json
+import re
+from typing import Any, Iterator, TextIO
+
+_WHITESPACE = re.compile(r"\s*")
+_DELIMITERS = frozenset(",] \t\n\r")
+# how far before the window edge the decoder can stop on a token the edge
+# has cut: "-Infinity", or a \uXXXX\uXXXX surrogate pair
+_CUT_MARGIN = 16
+# characters one element may span before it is given up on
+MAX_ELEMENT = 1 << 26
+
+
+def _maybe_cut(e: json.JSONDecodeError, buf: str) -> bool:
+    # whether more input could fix the error; an unterminated string is
+    # reported where it starts, anything else at the bad character
+    return e.msg.startswith("Unterminated string") or e.pos > len(buf) - _CUT_MARGIN
+
+
+def iter_json_array(
+    f: TextIO, chunk_size: int = 1 << 16, max_element: int = MAX_ELEMENT
+) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time.
+
+    Only a window of ``chunk_size`` characters plus the element being decoded
+    is held in memory, so a large ``books.json`` can be scanned without
+    building the whole list. Raises ``json.JSONDecodeError`` on malformed
+    input, which may happen after some elements were already yielded. An
+    element that fails to decode is only read further while its error could
+    be the window edge, and never past ``max_element`` characters, so bad
+    input does not pull the rest of the file into memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos < len(buf) or not fill():
+                return
+
+    skip_ws()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise json.JSONDecodeError("Expected '['", buf, pos)
+    pos += 1
+    skip_ws()
+    if pos < len(buf) and buf[pos] == "]":
+        return
+    while True:
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if not _maybe_cut(e, buf):
+                    raise
+                if len(buf) - pos > max_element:
+                    raise json.JSONDecodeError(
+                        f"Element longer than {max_element} characters", buf, pos
+                    )
+                if fill():
+                    continue
+                raise
+            # a number cut at the window edge can decode "successfully", so
+            # only accept a value once the character after it is visible
+            cut = end == len(buf) or (
+                buf[end] not in _DELIMITERS and end > len(buf) - _CUT_MARGIN
+            )
+            if cut and fill():
+                continue
+            break
+        pos = end
+        yield value
+        skip_ws()
+        if pos >= len(buf):
+            raise json.JSONDecodeError("Unterminated array", buf, pos)
+        if buf[pos] == "]":
+            return
+        if buf[pos] != ",":
+            raise json.JSONDecodeError("Expected ',' or ']'", buf, pos)
+        pos += 1
+        skip_ws()
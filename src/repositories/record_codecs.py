@@ -0,0 +1,309 @@
+"""Encodings of the catalog file: a record format plus optional compression.
+
+Formats:
+
+* ``json`` - an indented JSON array, the original layout
+* ``json-compact`` - the same array without whitespace
+* ``jsonl`` - one JSON object per line
+* ``rows`` - binary: a field-name header, then frames of up to
+  ``ROWS_PER_FRAME`` records stored as marshalled tuples in header order
+
+Any of them may be compressed with ``gzip``, ``bz2``, ``lzma`` or, on
+Python 3.14+, ``zstd``; a codec is named ``"<format>"`` or
+``"<format>+<compression>"``, e.g. ``"rows+zstd"``. Reading never needs the
+name: ``detect`` recognizes the compression from its magic bytes and the
+format from the first decompressed bytes, so a repository configured with
+one codec still reads files written with another.
+
+``rows`` uses ``marshal``, whose C decoder is what makes it fast. It
+writes marshal version 2, which has no back-references, so two records
+never come back sharing one list; the header records the version and a
+file needing a newer marshal than the reader's is rejected, not misread.
+
+Whole-file decodes (and each ``rows`` frame) run with the cyclic garbage
+collector paused: building many dicts and lists otherwise triggers
+collections that cost as much as the parsing itself.
+"""
+
+import bz2
+import gc
+import gzip
+import io
+import json
+import lzma
+import marshal
+import struct
+from contextlib import contextmanager
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, List, Optional, Protocol, Tuple
+
+try:  # stdlib from Python 3.14
+    from compression import zstd
+except ImportError:  # pragma: no cover - depends on the Python version
+    zstd = None
+
+from src.repositories.json_stream import iter_json_array
+
+ROWS_MAGIC = b"\x00BKROWS"
+ROWS_PER_FRAME = 4096
+ROWS_MARSHAL_VERSION = 2
+_FRAME = struct.Struct("<I")
+# JSON cannot hold Ellipsis, so it marks a field a record does not have
+_MISSING = ...
+
+# name -> (magic bytes, module with compress/decompress/open)
+COMPRESSIONS = {
+    "gzip": (b"\x1f\x8b", gzip),
+    "bz2": (b"BZh", bz2),
+    "lzma": (b"\xfd7zXZ\x00", lzma),
+}
+if zstd is not None:
+    COMPRESSIONS["zstd"] = (b"\x28\xb5\x2f\xfd", zstd)
+
+
+class CodecError(ValueError):
+    """The data is not in the expected (or any recognized) format."""
+
+
+@contextmanager
+def _gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class RecordFormat(Protocol):
+    name: str
+
+    def encode(self, records: List[Dict]) -> bytes: ...
+
+    def decode(self, data: bytes) -> List[Dict]: ...
+
+    def iter_decode(self, f: BinaryIO) -> Iterator[Dict]:
+        """Stream records from a binary file object."""
+        ...
+
+
+class JsonFormat(RecordFormat):
+    def __init__(self, name: str = "json", indent: Optional[int] = 2):
+        self.name = name
+        self.indent = indent
+        self.separators = None if indent else (",", ":")
+
+    def encode(self, records: List[Dict]) -> bytes:
+        text = json.dumps(records, indent=self.indent, separators=self.separators)
+        return text.encode("utf-8")
+
+    def decode(self, data: bytes) -> List[Dict]:
+        return json.loads(data)
+
+    def iter_decode(self, f: BinaryIO) -> Iterator[Dict]:
+        yield from iter_json_array(io.TextIOWrapper(f, encoding="utf-8"))
+
+
+class JsonLinesFormat(RecordFormat):
+    name = "jsonl"
+
+    def encode(self, records: List[Dict]) -> bytes:
+        dumps = json.JSONEncoder(separators=(",", ":")).encode
+        return "".join([dumps(r) + "\n" for r in records]).encode("utf-8")
+
+    def decode(self, data: bytes) -> List[Dict]:
+        # one array parse instead of a json.loads call per line
+        lines = [line for line in data.splitlines() if line.strip()]
+        return json.loads(b"[" + b",".join(lines) + b"]")
+
+    def iter_decode(self, f: BinaryIO) -> Iterator[Dict]:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class RowsFormat(RecordFormat):
+    """Binary rows: ``ROWS_MAGIC``, a header frame, then record frames.
+
+    Every frame is a 4-byte little-endian length and a marshal blob. The
+    header is ``(marshal version, field names)``; each record frame is a
+    list of tuples with one value per field, ``...`` where the record has
+    no such key.
+    """
+
+    name = "rows"
+
+    @staticmethod
+    def _fields(records: List[Dict]) -> Tuple[str, ...]:
+        fields: Dict[str, None] = {}
+        for record in records:
+            if not fields.keys() >= record.keys():
+                fields.update(dict.fromkeys(record))
+        return tuple(fields)
+
+    @staticmethod
+    def _frame(value) -> bytes:
+        blob = marshal.dumps(value, ROWS_MARSHAL_VERSION)
+        return _FRAME.pack(len(blob)) + blob
+
+    def encode(self, records: List[Dict]) -> bytes:
+        fields = self._fields(records)
+        parts = [ROWS_MAGIC, self._frame((ROWS_MARSHAL_VERSION, fields))]
+        it = iter(records)
+        while chunk := list(islice(it, ROWS_PER_FRAME)):
+            rows = [tuple([r.get(f, _MISSING) for f in fields]) for r in chunk]
+            parts.append(self._frame(rows))
+        return b"".join(parts)
+
+    @staticmethod
+    def _read_frame(f: BinaryIO):
+        size = f.read(_FRAME.size)
+        if not size:
+            return None
+        if len(size) < _FRAME.size:
+            raise CodecError("Truncated rows frame")
+        (length,) = _FRAME.unpack(size)
+        blob = f.read(length)
+        if len(blob) < length:
+            raise CodecError("Truncated rows frame")
+        try:
+            return marshal.loads(blob)
+        except (EOFError, ValueError, TypeError) as e:
+            raise CodecError(f"Corrupt rows frame: {e}")
+
+    def iter_decode(self, f: BinaryIO) -> Iterator[Dict]:
+        if f.read(len(ROWS_MAGIC)) != ROWS_MAGIC:
+            raise CodecError("Not a rows file")
+        header = self._read_frame(f)
+        if not isinstance(header, tuple) or len(header) != 2:
+            raise CodecError("Corrupt rows header")
+        version, fields = header
+        if version > marshal.version:
+            raise CodecError(f"Rows file needs marshal version {version}")
+        while True:
+            with _gc_paused():
+                rows = self._read_frame(f)
+                if rows is None:
+                    return
+                records = [dict(zip(fields, row)) for row in rows]
+            for row, record in zip(rows, records):
+                if _MISSING in row:
+                    record = {k: v for k, v in record.items() if v is not _MISSING}
+                yield record
+
+    def decode(self, data: bytes) -> List[Dict]:
+        return list(self.iter_decode(io.BytesIO(data)))
+
+
+FORMATS = {
+    f.name: f
+    for f in (
+        JsonFormat("json", indent=2),
+        JsonFormat("json-compact", indent=None),
+        JsonLinesFormat(),
+        RowsFormat(),
+    )
+}
+
+
+class RecordCodec:
+    """A record format, optionally wrapped in a compression."""
+
+    def __init__(self, fmt: RecordFormat, compression: Optional[str] = None):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Compression {compression!r} is not available")
+        self.format = fmt
+        self.compression = compression
+        self._module = COMPRESSIONS[compression][1] if compression else None
+
+    @property
+    def name(self) -> str:
+        if self.compression is None:
+            return self.format.name
+        return f"{self.format.name}+{self.compression}"
+
+    def __repr__(self) -> str:
+        return f"RecordCodec({self.name!r})"
+
+    def encode(self, records: List[Dict]) -> bytes:
+        data = self.format.encode(records)
+        return self._module.compress(data) if self._module else data
+
+    def decode(self, data: bytes) -> List[Dict]:
+        try:
+            if self._module:
+                data = self._module.decompress(data)
+            with _gc_paused():
+                return self.format.decode(data)
+        except CodecError:
+            raise
+        except (ValueError, EOFError, OSError, lzma.LZMAError) as e:
+            raise CodecError(str(e))
+
+    def iter_decode(self, f: BinaryIO) -> Iterator[Dict]:
+        try:
+            if self._module:
+                f = self._module.open(f, "rb")
+            yield from self.format.iter_decode(f)
+        except CodecError:
+            raise
+        except (ValueError, EOFError, OSError, lzma.LZMAError) as e:
+            raise CodecError(str(e))
+
+
+def get_codec(codec) -> RecordCodec:
+    """A RecordCodec from its name (``"jsonl+gzip"``) or as given."""
+    if isinstance(codec, RecordCodec):
+        return codec
+    fmt, _, compression = codec.partition("+")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown record format {fmt!r}")
+    return RecordCodec(FORMATS[fmt], compression or None)
+
+
+def available_codecs() -> List[str]:
+    return [
+        name for fmt in FORMATS for name in (fmt, *(f"{fmt}+{c}" for c in COMPRESSIONS))
+    ]
+
+
+def _sniff_format(head: bytes) -> RecordFormat:
+    if head.startswith(ROWS_MAGIC):
+        return FORMATS["rows"]
+    first = head.lstrip()[:1]
+    if first == b"[":
+        return FORMATS["json"]
+    if first == b"{":
+        return FORMATS["jsonl"]
+    raise CodecError("Unrecognized catalog format")
+
+
+def detect(f: BinaryIO) -> RecordCodec:
+    """The codec of a seekable binary file, which is left at offset 0."""
+    head = f.read(16)
+    f.seek(0)
+    compression = next(
+        (name for name, (magic, _) in COMPRESSIONS.items() if head.startswith(magic)),
+        None,
+    )
+    if compression is not None:
+        try:
+            with COMPRESSIONS[compression][1].open(f, "rb") as inner:
+                head = inner.read(64)
+        except (EOFError, OSError, lzma.LZMAError) as e:
+            raise CodecError(str(e))
+        finally:
+            f.seek(0)
+    return RecordCodec(_sniff_format(head), compression)
+
+
+def iter_file(f: BinaryIO) -> Iterator[Dict]:
+    """Stream the records of a file in any supported encoding."""
+    codec = detect(f)
+    yield from codec.iter_decode(f)
+
+
+def decode_any(data: bytes) -> List[Dict]:
+    """Decode a whole catalog held in memory, whatever its encoding."""
+    return detect(io.BytesIO(data)).decode(data)
@@ -0,0 +1,251 @@
+import heapq
+import json
+import os
+import zlib
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+from src.domain.book import Book
+from src.repositories.book_query import order, order_key, parse_order, parse_sort
+from src.repositories.book_repository import BookRepository
+from src.repositories.book_repository_protocol import (
+    BookRepositoryProtocol,
+    VersionConflictError,
+)
+from src.repositories.title_index import match_rank
+
+MANIFEST = "shards.json"
+
+
+def shard_of(book_id: str, shards: int) -> int:
+    """Shard number of ``book_id``; crc32 is stable across processes, unlike hash()."""
+    return zlib.crc32(book_id.encode("utf-8")) % shards
+
+
+class ShardedBookRepository(BookRepositoryProtocol):
+    """Books spread over ``shards`` files in ``directory`` by book_id hash.
+
+    Each shard is an ordinary repository (``repository_class``, a
+    BookRepository by default) with its own file and lock, so writes to
+    different shards do not contend and shards can be scanned in parallel
+    (see ``BookAnalyticsService.sharded_aggregates``). Point operations go to
+    one shard; scans, name search and queries ask every shard and merge.
+
+    The shard count is recorded in ``shards.json`` on first use and must
+    match afterwards, since changing it would route ids to the wrong files.
+    With ``history`` all shards share one checkout history store, so a
+    user's history needs no merging. ``codec`` is passed to every shard.
+
+    Batch writes (``add_books``, ``update_books``, ``compare_and_swap_books``,
+    ``delete_books``) make one call per shard they touch. Each of those calls
+    is as atomic as its shard makes it, but the batch as a whole is not: if
+    one shard fails, the shards written before it keep their changes.
+    """
+
+    def __init__(
+        self,
+        directory: str = "books",
+        shards: int = 8,
+        repository_class: Type[BookRepository] = BookRepository,
+        history: bool = False,
+        codec="json",
+    ):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.directory = directory
+        self.repository_class = repository_class
+        os.makedirs(directory, exist_ok=True)
+        self._check_manifest(shards)
+        history_path = os.path.join(directory, "history.jsonl") if history else None
+        self.shards: List[BookRepository] = [
+            repository_class(path, history_path=history_path, codec=codec)
+            for path in self.shard_paths
+        ]
+
+    def _check_manifest(self, shards: int):
+        path = os.path.join(self.directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                recorded = json.load(f).get("shards")
+            if recorded != shards:
+                raise ValueError(
+                    f"{self.directory} holds {recorded} shards, not {shards}"
+                )
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"shards": shards, "hash": "crc32"}, f)
+        self.shard_count = shards
+
+    @property
+    def shard_paths(self) -> List[str]:
+        return [
+            os.path.join(self.directory, f"books-{i:03d}.json")
+            for i in range(self.shard_count)
+        ]
+
+    def shard_specs(self) -> List[Tuple[Type[BookRepository], str]]:
+        """``(repository_class, path)`` per shard, picklable for worker processes."""
+        return [(self.repository_class, path) for path in self.shard_paths]
+
+    def shard_for(self, book_id: str) -> BookRepository:
+        return self.shards[shard_of(book_id, self.shard_count)]
+
+    def _group(self, book_ids) -> Dict[int, List[int]]:
+        # shard number -> positions in ``book_ids``, in their original order
+        groups: Dict[int, List[int]] = {}
+        for i, book_id in enumerate(book_ids):
+            groups.setdefault(shard_of(book_id, self.shard_count), []).append(i)
+        return groups
+
+    def close(self):
+        for shard in self.shards:
+            if hasattr(shard, "close"):
+                shard.close()
+
+    # point operations
+
+    def add_book(self, book: Book) -> str:
+        return self.shard_for(book.book_id).add_book(book)
+
+    def get_book_by_id(self, book_id: str) -> Optional[Book]:
+        return self.shard_for(book_id).get_book_by_id(book_id)
+
+    def update_book(self, book_id: str, data: Dict) -> Optional[Book]:
+        return self.shard_for(book_id).update_book(book_id, data)
+
+    def delete_book(self, book_id: str) -> bool:
+        return self.shard_for(book_id).delete_book(book_id)
+
+    def compare_and_swap(
+        self, book_id: str, expected_version: int, data: Dict
+    ) -> Optional[Book]:
+        return self.shard_for(book_id).compare_and_swap(book_id, expected_version, data)
+
+    def mutate(self, book_id: str, fn: Callable[[Book], None]) -> Optional[Book]:
+        return self.shard_for(book_id).mutate(book_id, fn)
+
+    def append_checkout_history(self, book_id: str, entry: Dict) -> None:
+        self.shard_for(book_id).append_checkout_history(book_id, entry)
+
+    def get_history(
+        self, book_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        return self.shard_for(book_id).get_history(book_id, offset, limit)
+
+    # batches: one call per shard touched, results back in input order
+
+    def add_books(self, books: List[Book]) -> List[str]:
+        for shard, positions in self._group([b.book_id for b in books]).items():
+            self.shards[shard].add_books([books[i] for i in positions])
+        return [book.book_id for book in books]
+
+    def update_books(self, updates: Dict[str, Dict]) -> List[Optional[Book]]:
+        book_ids = list(updates)
+        results: List[Optional[Book]] = [None] * len(book_ids)
+        for shard, positions in self._group(book_ids).items():
+            batch = {book_ids[i]: updates[book_ids[i]] for i in positions}
+            for i, book in zip(positions, self.shards[shard].update_books(batch)):
+                results[i] = book
+        return results
+
+    def compare_and_swap_books(
+        self, updates: Dict[str, Tuple[int, Dict]]
+    ) -> List[Union[Book, VersionConflictError, None]]:
+        book_ids = list(updates)
+        results: List[Union[Book, VersionConflictError, None]] = [None] * len(book_ids)
+        for shard, positions in self._group(book_ids).items():
+            batch = {book_ids[i]: updates[book_ids[i]] for i in positions}
+            swapped = self.shards[shard].compare_and_swap_books(batch)
+            for i, outcome in zip(positions, swapped):
+                results[i] = outcome
+        return results
+
+    def delete_books(self, book_ids: List[str]) -> List[bool]:
+        results = [False] * len(book_ids)
+        for shard, positions in self._group(book_ids).items():
+            found = self.shards[shard].delete_books([book_ids[i] for i in positions])
+            for i, ok in zip(positions, found):
+                results[i] = ok
+        return results
+
+    # fan-out reads
+
+    def get_all_books(self) -> List[Book]:
+        return [book for shard in self.shards for book in shard.get_all_books()]
+
+    def iter_books(self) -> Iterator[Book]:
+        return chain.from_iterable(shard.iter_books() for shard in self.shards)
+
+    def iter_records(self) -> Iterator[Dict]:
+        return chain.from_iterable(shard.iter_records() for shard in self.shards)
+
+    def find_book_by_name(self, query: str) -> List[Book]:
+        return [
+            book for shard in self.shards for book in shard.find_book_by_name(query)
+        ]
+
+    def search_by_name(self, query: str, limit: int = 10) -> List[Book]:
+        if not isinstance(query, str):
+            return []
+        q = query.lower()
+        # each shard's best ``limit`` are re-ranked together; ties keep shard order
+        ranked = (
+            (match_rank((book.title or "").lower(), q), n, pos, book)
+            for n, shard in enumerate(self.shards)
+            for pos, book in enumerate(shard.search_by_name(query, limit))
+        )
+        return [m[3] for m in heapq.nsmallest(limit, ranked, key=lambda m: m[:3])]
+
+    def find_books(
+        self,
+        filters: Optional[Dict] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Book]:
+        """Each shard answers with its own top ``limit``; those are merged."""
+        sort_key = parse_sort(sort)
+        found = [
+            book
+            for shard in self.shards
+            for book in shard.find_books(filters, sort, limit)
+        ]
+        if sort_key is None:
+            return found if limit is None else found[:limit]
+        field = sort_key[0]
+        merged = order(
+            ({field: getattr(b, field), "book": b} for b in found), sort_key, limit
+        )
+        return [view["book"] for view in merged]
+
+    def list_books(
+        self,
+        after: Optional[str] = None,
+        limit: int = 20,
+        order_by: Optional[str] = None,
+    ) -> List[Book]:
+        """Merge of every shard's page after the same cursor."""
+        field, descending = parse_order(order_by)
+        key = order_key(field, descending)
+        pages = chain.from_iterable(
+            shard.list_books(after, limit, order_by) for shard in self.shards
+        )
+        return heapq.nsmallest(
+            limit,
+            pages,
+            key=lambda b: key({field: getattr(b, field), "book_id": b.book_id}),
+        )
+
+    def get_user_history(
+        self, user_email: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        # the shared store sees every shard's entries; without one, each shard
+        # holds its books' inline histories
+        if self.shards[0].history is not None:
+            return self.shards[0].get_user_history(user_email, offset, limit)
+        entries = chain.from_iterable(
+            shard.get_user_history(user_email) for shard in self.shards
+        )
+        end = None if limit is None else offset + limit
+        return list(entries)[offset:end]
+
+    def migrate_checkout_history(self) -> int:
+        return sum(shard.migrate_checkout_history() for shard in self.shards)
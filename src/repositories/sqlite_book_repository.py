@@ -0,0 +1,472 @@
+import functools
+import itertools
+import json
+import sqlite3
+from typing import Callable, Iterator, List, Optional, Dict, Iterable, Tuple, Union
+from src.domain.book import Book, LazyHistory
+from src.instrumentation import metrics
+from src.repositories.book_query import (
+    decode_cursor,
+    parse_filters,
+    parse_order,
+    parse_sort,
+)
+from src.repositories.book_repository import BookRepository
+from src.repositories.book_repository_protocol import (
+    BookRepositoryProtocol,
+    VersionConflictError,
+)
+
+BOOK_COLUMNS = [
+    "book_id",
+    "title",
+    "author",
+    "genre",
+    "publication_year",
+    "page_count",
+    "average_rating",
+    "ratings_count",
+    "price_usd",
+    "publisher",
+    "language",
+    "format",
+    "in_print",
+    "sales_millions",
+    "last_checkout",
+    "available",
+    "checked_out_by",
+    "version",
+]
+
+BOOL_COLUMNS = {"in_print", "available"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    book_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    genre TEXT,
+    publication_year INTEGER,
+    page_count INTEGER,
+    average_rating REAL,
+    ratings_count INTEGER,
+    price_usd REAL,
+    publisher TEXT,
+    language TEXT,
+    format TEXT,
+    in_print INTEGER,
+    sales_millions REAL,
+    last_checkout TEXT,
+    available INTEGER NOT NULL DEFAULT 1,
+    checked_out_by TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_books_title ON books (title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_books_genre ON books (genre);
+CREATE INDEX IF NOT EXISTS idx_books_author ON books (author);
+CREATE INDEX IF NOT EXISTS idx_books_publisher ON books (publisher);
+CREATE INDEX IF NOT EXISTS idx_books_year ON books (publication_year);
+CREATE INDEX IF NOT EXISTS idx_books_price ON books (price_usd);
+CREATE INDEX IF NOT EXISTS idx_books_rating ON books (average_rating);
+CREATE TABLE IF NOT EXISTS checkout_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    book_id TEXT NOT NULL REFERENCES books (book_id) ON DELETE CASCADE,
+    action TEXT,
+    timestamp TEXT,
+    user_email TEXT,
+    due_date TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_book ON checkout_history (book_id, id);
+CREATE INDEX IF NOT EXISTS idx_history_user ON checkout_history (user_email);
+"""
+
+SQL_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+HISTORY_INSERT = (
+    "INSERT INTO checkout_history "
+    "(book_id, action, timestamp, user_email, due_date, entry) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+class SqliteBookRepository(BookRepositoryProtocol):
+    """BookRepositoryProtocol implementation on top of SQLite.
+
+    Books live in one row each with checkout history in a child table that
+    is only queried when a Book's history is used. The database runs in WAL
+    mode so readers in other processes are not blocked by a writer.
+    Insertion order (rowid) is used wherever the JSON repository would
+    return file order.
+    """
+
+    def __init__(self, db_path: str = "books.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(books)")}
+        if "version" not in columns:
+            # databases created before per-record versions
+            self.conn.execute(
+                "ALTER TABLE books ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+        # SQLite's lower() only folds ASCII; match str.lower used elsewhere
+        self.conn.create_function(
+            "py_lower",
+            1,
+            lambda s: s.lower() if s is not None else None,
+            deterministic=True,
+        )
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _to_column(col: str, value):
+        if col in BOOL_COLUMNS and value is not None:
+            return int(bool(value))
+        if col == "version":
+            return value or 0
+        return value
+
+    def _to_row(self, record: Dict) -> List:
+        return [self._to_column(col, record.get(col)) for col in BOOK_COLUMNS]
+
+    @staticmethod
+    def _history_rows(book_id: str, history: Iterable[Dict]) -> List:
+        return [
+            (
+                book_id,
+                entry.get("action"),
+                entry.get("timestamp"),
+                entry.get("user_email"),
+                entry.get("due_date"),
+                json.dumps(entry),
+            )
+            for entry in history
+        ]
+
+    def _to_books(self, rows: List[sqlite3.Row]) -> List[Book]:
+        books = []
+        for row in rows:
+            data = dict(row)
+            for col in BOOL_COLUMNS:
+                if data[col] is not None:
+                    data[col] = bool(data[col])
+            data["checkout_history"] = LazyHistory(
+                functools.partial(self.get_history, row["book_id"])
+            )
+            books.append(Book.from_dict(data))
+        return books
+
+    def _insert(self, records: Iterable[Dict], replace: bool = False) -> int:
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        placeholders = ",".join("?" * len(BOOK_COLUMNS))
+        count = 0
+        for record in records:
+            if replace:
+                self.conn.execute(
+                    "DELETE FROM checkout_history WHERE book_id = ?",
+                    (record["book_id"],),
+                )
+            self.conn.execute(
+                f"{verb} INTO books ({','.join(BOOK_COLUMNS)}) VALUES ({placeholders})",
+                self._to_row(record),
+            )
+            self.conn.executemany(
+                HISTORY_INSERT,
+                self._history_rows(
+                    record["book_id"], record.get("checkout_history") or []
+                ),
+            )
+            count += 1
+        return count
+
+    def import_json(self, json_path: str) -> int:
+        """Copy every record from a books.json file into the database.
+
+        Existing rows with the same book_id are replaced. Returns the number
+        of records imported.
+        """
+        records = BookRepository(json_path)._read_file()
+        with self.conn:
+            return self._insert((r for r in records if r.get("book_id")), replace=True)
+
+    def get_all_books(self) -> List[Book]:
+        rows = self.conn.execute("SELECT * FROM books ORDER BY rowid").fetchall()
+        return self._to_books(rows)
+
+    def iter_books(self, batch_size: int = 1000) -> Iterator[Book]:
+        cursor = self.conn.execute("SELECT * FROM books ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from self._to_books(rows)
+
+    def add_book(self, book: Book) -> str:
+        with self.conn:
+            self._insert([book.to_dict()])
+        return book.book_id
+
+    def add_books(self, books: List[Book]) -> List[str]:
+        with self.conn:
+            self._insert(book.to_dict() for book in books)
+        return [book.book_id for book in books]
+
+    def get_book_by_id(self, book_id: str) -> Optional[Book]:
+        rows = self.conn.execute(
+            "SELECT * FROM books WHERE book_id = ?", (book_id,)
+        ).fetchall()
+        books = self._to_books(rows)
+        return books[0] if books else None
+
+    def _update(
+        self, book_id: str, data: Dict, expected_version: Optional[int] = None
+    ) -> bool:
+        unknown = set(data) - set(BOOK_COLUMNS) - {"checkout_history"}
+        if unknown:
+            raise ValueError(f"Unknown book field(s): {', '.join(sorted(unknown))}")
+        row = self.conn.execute(
+            "SELECT version FROM books WHERE book_id = ?", (book_id,)
+        ).fetchone()
+        if not row:
+            return False
+        columns = [
+            c for c in BOOK_COLUMNS if c in data and c not in ("book_id", "version")
+        ]
+        assignments = "".join(f"{c} = ?, " for c in columns)
+        sql = f"UPDATE books SET {assignments}version = version + 1 WHERE book_id = ?"
+        params = [*[self._to_column(c, data[c]) for c in columns], book_id]
+        if expected_version is not None:
+            sql += " AND version = ?"
+            params.append(expected_version)
+        if self.conn.execute(sql, params).rowcount == 0:
+            # the row exists, so only the version check can have failed
+            raise VersionConflictError(book_id, expected_version, row["version"])
+        history = data.get("checkout_history")
+        if isinstance(history, LazyHistory):
+            # only what was appended since the Book was read
+            self.conn.executemany(
+                HISTORY_INSERT, self._history_rows(book_id, history.new_entries())
+            )
+            history.mark_stored()
+        elif "checkout_history" in data:
+            self.conn.execute(
+                "DELETE FROM checkout_history WHERE book_id = ?", (book_id,)
+            )
+            self.conn.executemany(
+                HISTORY_INSERT, self._history_rows(book_id, history or [])
+            )
+        return True
+
+    def update_book(self, book_id: str, data: Dict) -> Optional[Book]:
+        with self.conn:
+            found = self._update(book_id, data)
+        return self.get_book_by_id(book_id) if found else None
+
+    def update_books(self, updates: Dict[str, Dict]) -> List[Optional[Book]]:
+        with self.conn:
+            found = [self._update(book_id, data) for book_id, data in updates.items()]
+        return [
+            self.get_book_by_id(book_id) if ok else None
+            for book_id, ok in zip(updates, found)
+        ]
+
+    def compare_and_swap(
+        self, book_id: str, expected_version: int, data: Dict
+    ) -> Optional[Book]:
+        with self.conn:
+            found = self._update(book_id, data, expected_version)
+        return self.get_book_by_id(book_id) if found else None
+
+    def compare_and_swap_books(
+        self, updates: Dict[str, Tuple[int, Dict]]
+    ) -> List[Union[Book, VersionConflictError, None]]:
+        results: List[Union[str, VersionConflictError, None]] = []
+        with self.conn:
+            for book_id, (expected_version, data) in updates.items():
+                try:
+                    found = self._update(book_id, data, expected_version)
+                except VersionConflictError as e:
+                    # the guarded UPDATE matched no row, so nothing to undo
+                    results.append(e)
+                    continue
+                results.append(book_id if found else None)
+        return [self.get_book_by_id(r) if isinstance(r, str) else r for r in results]
+
+    def mutate(
+        self, book_id: str, fn: Callable[[Book], None], retries: int = 10
+    ) -> Optional[Book]:
+        """Read-modify-write with compare-and-swap.
+
+        Another connection may write the row between the read and the
+        write; the conflict is detected by the version check and the whole
+        read-``fn``-write is retried, up to ``retries`` times.
+        """
+        for attempt in itertools.count():
+            book = self.get_book_by_id(book_id)
+            if book is None:
+                return None
+            expected = book.version
+            fn(book)
+            try:
+                with self.conn:
+                    if not self._update(book_id, book.to_dict(), expected):
+                        return None
+            except VersionConflictError:
+                metrics.count("repo.cas_retries")
+                if attempt >= retries:
+                    raise
+                continue
+            book.version = expected + 1
+            return book
+
+    def delete_book(self, book_id: str) -> bool:
+        with self.conn:
+            cur = self.conn.execute("DELETE FROM books WHERE book_id = ?", (book_id,))
+        return cur.rowcount > 0
+
+    def delete_books(self, book_ids: List[str]) -> List[bool]:
+        with self.conn:
+            return [
+                self.conn.execute(
+                    "DELETE FROM books WHERE book_id = ?", (book_id,)
+                ).rowcount
+                > 0
+                for book_id in book_ids
+            ]
+
+    def find_book_by_name(self, query: str) -> List[Book]:
+        if not isinstance(query, str):
+            return []
+        # substring matches cannot use the title index, but the scan stays in
+        # SQLite and only matching rows are turned into Book objects
+        rows = self.conn.execute(
+            "SELECT * FROM books WHERE title != '' AND instr(py_lower(title), ?) > 0 "
+            "ORDER BY rowid",
+            (query.lower(),),
+        ).fetchall()
+        return self._to_books(rows)
+
+    def search_by_name(self, query: str, limit: int = 10) -> List[Book]:
+        if not isinstance(query, str):
+            return []
+        rows = self.conn.execute(
+            "SELECT * FROM books "
+            "WHERE title != '' AND instr(py_lower(title), :q) > 0 "
+            "ORDER BY CASE WHEN py_lower(title) = :q THEN 0 "
+            "WHEN instr(py_lower(title), :q) = 1 THEN 1 ELSE 2 END, "
+            "instr(py_lower(title), :q), length(py_lower(title)), rowid "
+            "LIMIT :limit",
+            {"q": query.lower(), "limit": limit},
+        ).fetchall()
+        return self._to_books(rows)
+
+    def _where(self, filters: Optional[Dict]) -> Tuple[str, List]:
+        clauses = []
+        params: List = []
+        for field, op, value in parse_filters(filters):
+            # field names come from book_query's whitelist
+            if op in SQL_OPERATORS:
+                clauses.append(f"{field} {SQL_OPERATORS[op]} ?")
+                params.append(value)
+                continue
+            values = value if op == "in" else [value]
+            terms = []
+            present = [self._to_column(field, v) for v in values if v is not None]
+            if present:
+                terms.append(f"{field} IN ({','.join('?' * len(present))})")
+                params.extend(present)
+            if len(present) < len(values):
+                terms.append(f"{field} IS NULL")
+            clauses.append(f"({' OR '.join(terms)})" if terms else "0")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def find_books(
+        self,
+        filters: Optional[Dict] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Book]:
+        """Filtered query in SQL; SQLite's planner picks among the indexes."""
+        where, params = self._where(filters)
+        sort_key = parse_sort(sort)
+        if sort_key is None:
+            order_by = " ORDER BY rowid"
+        else:
+            field, descending = sort_key
+            direction = "DESC" if descending else "ASC"
+            order_by = f" ORDER BY {field} IS NULL, {field} {direction}, rowid"
+        sql = "SELECT * FROM books" + where + order_by
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._to_books(self.conn.execute(sql, params).fetchall())
+
+    def list_books(
+        self,
+        after: Optional[str] = None,
+        limit: int = 20,
+        order_by: Optional[str] = None,
+    ) -> List[Book]:
+        """Keyset page: seeks past the cursor's key instead of using OFFSET."""
+        field, descending = parse_order(order_by)
+        where = ""
+        params: List = []
+        if after is not None:
+            key = decode_cursor(after, order_by)
+            value = self._to_column(field, key[field])
+            if value is None:
+                # missing values sort last, ordered by book_id among themselves
+                where = f" WHERE {field} IS NULL AND book_id > ?"
+                params = [key["book_id"]]
+            else:
+                beyond = "<" if descending else ">"
+                where = (
+                    f" WHERE ({field} IS NULL OR {field} {beyond} ? "
+                    f"OR ({field} = ? AND book_id > ?))"
+                )
+                params = [value, value, key["book_id"]]
+        direction = "DESC" if descending else "ASC"
+        sql = (
+            f"SELECT * FROM books{where} "
+            f"ORDER BY {field} IS NULL, {field} {direction}, book_id LIMIT ?"
+        )
+        rows = self.conn.execute(sql, [*params, limit]).fetchall()
+        return self._to_books(rows)
+
+    def append_checkout_history(self, book_id: str, entry: Dict) -> None:
+        with self.conn:
+            exists = self.conn.execute(
+                "SELECT 1 FROM books WHERE book_id = ?", (book_id,)
+            ).fetchone()
+            if exists:
+                self.conn.executemany(
+                    HISTORY_INSERT,
+                    self._history_rows(book_id, [entry]),
+                )
+
+    def get_history(
+        self, book_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT entry FROM checkout_history WHERE book_id = ? "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (book_id, -1 if limit is None else limit, offset),
+        )
+        return [json.loads(row["entry"]) for row in rows]
+
+    def get_user_history(
+        self, user_email: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT book_id, entry FROM checkout_history WHERE user_email = ? "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (user_email, -1 if limit is None else limit, offset),
+        )
+        return [dict(json.loads(row["entry"]), book_id=row["book_id"]) for row in rows]
@@ -0,0 +1,78 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def match_rank(text: str, query: str) -> Tuple[int, int, int]:
+    """Sort key for a lowercased ``text`` that contains ``query``.
+
+    Exact matches come first, then prefix matches, then earlier and
+    shorter matches.
+    """
+    pos = text.find(query)
+    return (0 if text == query else 1 if pos == 0 else 2, pos, len(text))
+
+
+class TrigramIndex:
+    """Case-insensitive substring index over short strings such as titles.
+
+    Each key's lowercased text is split into trigrams with a posting set per
+    trigram. A query intersects the postings of its own trigrams, starting
+    with the rarest, and verifies the survivors with a plain substring test,
+    so results are exactly those of ``query.lower() in text.lower()``.
+    Queries shorter than three characters fall back to scanning the stored
+    texts.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._texts: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, key: str, text: Optional[str]):
+        self.remove(key)
+        if not text:
+            return
+        text = text.lower()
+        self._texts[key] = text
+        for gram in trigrams(text):
+            self._postings[gram].add(key)
+
+    def remove(self, key: str):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def rebuild(self, items: Iterable[Tuple[str, Optional[str]]]):
+        self._postings = defaultdict(set)
+        self._texts = {}
+        for key, text in items:
+            self.add(key, text)
+
+    def text(self, key: str) -> Optional[str]:
+        return self._texts.get(key)
+
+    def search(self, query: str) -> List[str]:
+        """Return the keys whose text contains ``query`` (unordered)."""
+        q = query.lower()
+        grams = trigrams(q)
+        if not grams:
+            return [key for key, text in self._texts.items() if q in text]
+        postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            if not candidates:
+                break
+            candidates &= keys
+        return [key for key in candidates if q in self._texts[key]]
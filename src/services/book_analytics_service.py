@@ -1,17 +1,144 @@
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from operator import attrgetter
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from src.domain.book import Book
-from typing import List
+from src.domain.book import Book, BOOK_FIELDS
+from src.instrumentation import metrics
+from src.repositories.columnar_snapshot import ColumnarSnapshot
+from src.services.chart_rendering import render_scatter, render_series
+from src.services.shard_aggregates import CatalogPartial, shard_partial
+from src.services.top_k import StreamingTopK, top_k_indices
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# every analytics method takes either Books (any iterable, e.g.
+# BookService.iter_books()) or a ColumnarSnapshot
+BookSource = Union[Iterable[Book], ColumnarSnapshot]
+
+# checkout history is left out: it is not kept in the cached frames (see
+# df_from_books), so a history-only change cannot make one stale
+_fingerprint_fields = attrgetter(*(f for f in BOOK_FIELDS if f != "checkout_history"))
+
+# chart name -> (default file name, columns it reads)
+CHARTS = {
+    "genre_counts": ("genre_counts.png", ["genre"]),
+    "genre_ratings": ("genre_ratings.png", ["genre", "average_rating"]),
+    "price_vs_rating": ("price_vs_rating.png", ["price_usd", "average_rating"]),
+    "books_by_year": ("books_by_year.png", ["publication_year"]),
+    "availability_pie": ("availability_pie.png", ["available"]),
+}
+
+
+def _freeze(value):
+    # a hashable stand-in for a field value that holds a list, dict or set
+    if isinstance(value, dict):
+        return (dict, tuple((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(map(_freeze, value)))
+    if isinstance(value, (set, frozenset)):
+        return (frozenset, frozenset(map(_freeze, value)))
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value), repr(value))
+    return value
+
+
+def catalog_fingerprint(books: List[Book]) -> int:
+    try:
+        return hash(tuple(map(_fingerprint_fields, books)))
+    except TypeError:
+        return hash(tuple(_freeze(row) for row in map(_fingerprint_fields, books)))
 
 
 class BookAnalyticsService:
+    """Pandas analytics over the catalog.
+
+    Cleaned DataFrames are cached per catalog version (a snapshot's source
+    signature, or a fingerprint of the Books' fields) in a small LRU, so
+    calling several methods on the same catalog builds the frame once.
+    Cached frames are shared and must not be modified in place.
+    """
+
+    def __init__(self, cache_size: int = 4):
+        self.cache_size = cache_size
+        self._frames: OrderedDict = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def cache_info(self) -> Dict[str, int]:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._frames),
+            "max_size": self.cache_size,
+        }
+
+    def clear_cache(self):
+        self._frames.clear()
+
+    def cleaned_frame(
+        self, books: BookSource, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Return ``clean_df(df_from_books(...))``, reusing a cached frame.
+
+        A cached frame is reused when it was built from the same catalog
+        version and holds every requested column.
+        """
+        if isinstance(books, ColumnarSnapshot):
+            version = ("snapshot", books.version)
+        else:
+            if not isinstance(books, list):
+                books = list(books)
+            version = ("books", catalog_fingerprint(books))
+        wanted = set(columns) if columns else None
+        for key in reversed(self._frames):
+            key_version, have = key
+            if key_version == version and (
+                have is None or (wanted is not None and wanted <= have)
+            ):
+                self.cache_hits += 1
+                metrics.count("analytics.frame_cache_hits")
+                self._frames.move_to_end(key)
+                return self._frames[key]
+        self.cache_misses += 1
+        metrics.count("analytics.frame_cache_misses")
+        if isinstance(books, ColumnarSnapshot) and wanted is not None:
+            # widen an older frame of the same snapshot instead of keeping
+            # one partial frame per method
+            for key in [k for k in self._frames if k[0] == version]:
+                wanted |= key[1]
+                del self._frames[key]
+            have = frozenset(wanted)
+            columns = sorted(wanted)
+        else:
+            have = None  # frames built from Books carry every column
+        df = self.clean_df(self.df_from_books(books, columns))
+        if self.cache_size > 0:
+            self._frames[(version, have)] = df
+            while len(self._frames) > self.cache_size:
+                self._frames.popitem(last=False)
+        return df
 
-    def df_from_books(self, books: List[Book]) -> pd.DataFrame:
+    @metrics.timed("analytics.df_from_books")
+    def df_from_books(
+        self, books: BookSource, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        # a snapshot only materializes the requested columns; Books are
+        # always converted in full, except for checkout history: it is never
+        # aggregated and would go stale in a cached frame
+        if isinstance(books, ColumnarSnapshot):
+            return books.to_frame(columns)
         records = [b.to_dict() for b in books]
+        for record in records:
+            del record["checkout_history"]
         df = pd.DataFrame(records)
         return df
 
+    @metrics.timed("analytics.clean_df")
     def clean_df(self, df: pd.DataFrame) -> pd.DataFrame:
         # basic cleaning: ensure numeric types and fill missing values sensibly
         df = df.copy()
@@ -27,24 +154,34 @@ class BookAnalyticsService:
             if c in df.columns:
                 df[c] = pd.to_numeric(df[c], errors="coerce")
         df["genre"] = df.get("genre")
-        df["available"] = df.get("available").fillna(True)
+        if "available" in df.columns:
+            df["available"] = df["available"].fillna(True)
         return df
 
-    def average_price(self, books: List[Book]) -> float:
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
+    @metrics.timed("analytics.average_price")
+    def average_price(self, books: BookSource) -> float:
+        df = self.cleaned_frame(books, ["price_usd"])
         return float(df["price_usd"].mean())
 
-    def top_rated(self, books: List[Book], min_ratings: int = 1000, limit: int = 10):
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
+    @metrics.timed("analytics.top_rated")
+    def top_rated(self, books: BookSource, min_ratings: int = 1000, limit: int = 10):
+        if not isinstance(books, (ColumnarSnapshot, list)):
+            books = list(books)
+        df = self.cleaned_frame(books)
         filt = df["ratings_count"] >= min_ratings
-        res = df.loc[filt].sort_values("average_rating", ascending=False).head(limit)
-        return res.to_dict(orient="records")
+        res = df.loc[filt]
+        # partial selection instead of sorting every qualifying row
+        best = top_k_indices(res["average_rating"].to_numpy(dtype=float), limit)
+        top = res.iloc[best]
+        records = top.to_dict(orient="records")
+        if not isinstance(books, ColumnarSnapshot):
+            # the frame has no history; take it from the Books, by row position
+            for record, pos in zip(records, top.index):
+                record["checkout_history"] = books[pos].checkout_history
+        return records
 
-    def value_scores(self, books: List[Book]) -> dict:
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
+    @staticmethod
+    def _scores(df: pd.DataFrame) -> pd.DataFrame:
         # score = rating * log1p(ratings_count) / price_usd
         df = df[
             (df["average_rating"].notna())
@@ -54,13 +191,90 @@ class BookAnalyticsService:
         df["score"] = (df["average_rating"] * np.log1p(df["ratings_count"])) / df[
             "price_usd"
         ]
+        return df
+
+    @metrics.timed("analytics.value_scores")
+    def value_scores(self, books: BookSource) -> dict:
+        df = self._scores(
+            self.cleaned_frame(
+                books, ["book_id", "average_rating", "ratings_count", "price_usd"]
+            )
+        )
         return dict(zip(df["book_id"], df["score"].astype(float)))
 
+    @metrics.timed("analytics.top_value_scores")
+    def top_value_scores(self, books: BookSource, limit: int = 10) -> dict:
+        """The ``limit`` best value scores, best first.
+
+        A NaN score (0/0 for a free book rated 0) ranks nowhere and is left
+        out, as in ``stream_top_value_scores``.
+        """
+        df = self._scores(
+            self.cleaned_frame(
+                books, ["book_id", "average_rating", "ratings_count", "price_usd"]
+            )
+        )
+        scores = df["score"].to_numpy(dtype=float)
+        keep = np.flatnonzero(~np.isnan(scores))
+        scores = scores[keep]
+        book_ids = df["book_id"].to_numpy()[keep]
+        best = top_k_indices(scores, limit)
+        return dict(zip(book_ids[best].tolist(), scores[best].tolist()))
+
+    @staticmethod
+    def _chunks(books: Iterable[Book], chunk_size: int) -> Iterator[List[Book]]:
+        it = iter(books)
+        while chunk := list(islice(it, chunk_size)):
+            yield chunk
+
+    @staticmethod
+    def _numeric(values: List) -> np.ndarray:
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(
+            dtype=float
+        )
+
+    @metrics.timed("analytics.stream_top_rated")
+    def stream_top_rated(
+        self,
+        books: Iterable[Book],
+        min_ratings: int = 1000,
+        limit: int = 10,
+        chunk_size: int = 10000,
+    ) -> List[Dict]:
+        """top_rated over a stream of Books in bounded memory.
+
+        Only ``limit`` candidates plus one chunk are held at a time and no
+        DataFrame is built; results are ``Book.to_dict()`` records.
+        """
+        top = StreamingTopK(limit)
+        for chunk in self._chunks(books, chunk_size):
+            counts = self._numeric([b.ratings_count for b in chunk])
+            keep = np.flatnonzero(counts >= min_ratings)
+            ratings = self._numeric([chunk[i].average_rating for i in keep])
+            top.push(ratings, [chunk[i] for i in keep])
+        return [book.to_dict() for book, _ in top.result()]
+
+    @metrics.timed("analytics.stream_top_value_scores")
+    def stream_top_value_scores(
+        self, books: Iterable[Book], limit: int = 10, chunk_size: int = 10000
+    ) -> dict:
+        """top_value_scores over a stream of Books in bounded memory."""
+        top = StreamingTopK(limit)
+        for chunk in self._chunks(books, chunk_size):
+            rating = self._numeric([b.average_rating for b in chunk])
+            count = self._numeric([b.ratings_count for b in chunk])
+            price = self._numeric([b.price_usd for b in chunk])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = rating * np.log1p(count) / price
+            keep = np.flatnonzero(~np.isnan(scores))
+            top.push(scores[keep], [chunk[i].book_id for i in keep])
+        return dict(top.result())
+
+    @metrics.timed("analytics.bayesian_weighted_by_genre")
     def bayesian_weighted_by_genre(
-        self, books: List[Book], m: int = 50
+        self, books: BookSource, m: int = 50
     ) -> pd.DataFrame:
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
+        df = self.cleaned_frame(books, ["genre", "average_rating", "ratings_count"])
         # compute mean rating per genre and median ratings_count per genre
         grouped = (
             df.groupby("genre")
@@ -78,84 +292,162 @@ class BookAnalyticsService:
         ) * global_mean
         return grouped.sort_values("weighted_rating", ascending=False)
 
+    @metrics.timed("analytics.sharded_aggregates")
+    def sharded_aggregates(
+        self,
+        repo,
+        m: int = 50,
+        max_workers: Optional[int] = None,
+        parallel: bool = True,
+    ) -> Dict:
+        """Catalog aggregates of a ShardedBookRepository, one shard per task.
+
+        Each shard is read and reduced to a CatalogPartial in a process pool
+        (in-process with ``parallel=False``) and the partials are merged, so
+        the work spreads over as many cores as there are shards. Returns
+        ``average_price``, the ``bayesian_weighted_by_genre`` frame and the
+        ``books_by_year`` / ``books_by_genre`` counts, matching the
+        DataFrame methods up to float rounding.
+        """
+        specs = repo.shard_specs()
+        if parallel and len(specs) > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                partials = list(pool.map(shard_partial, specs))
+        else:
+            partials = [shard_partial(spec) for spec in specs]
+        total = CatalogPartial.merged(partials)
+        rows = total.bayesian_weighted_by_genre(m)
+        return {
+            "average_price": total.average_price(),
+            "bayesian_weighted_by_genre": pd.DataFrame(
+                rows,
+                columns=[
+                    "genre",
+                    "mean_average_rating",
+                    "median_ratings_count",
+                    "weighted_rating",
+                ],
+            ),
+            "books_by_year": pd.Series(total.year_counts, dtype=int).sort_index(),
+            "books_by_genre": pd.Series(total.genre_counts, dtype=int).sort_values(
+                ascending=False, kind="stable"
+            ),
+        }
+
+    def _chart_job(self, name: str, df: pd.DataFrame) -> Tuple:
+        """``(render function, args, kwargs)`` for one chart, aggregated from ``df``.
+
+        Only the small aggregated Series/arrays are passed on, so the job
+        can be pickled to a worker process.
+        """
+        if name == "genre_counts":
+            counts = df["genre"].value_counts()
+            args = (counts, "bar", "Books per Genre", "Genre", "Count")
+            return render_series, args, {}
+        if name == "genre_ratings":
+            grouped = (
+                df.groupby("genre")["average_rating"]
+                .mean()
+                .sort_values(ascending=False)
+            )
+            args = (
+                grouped,
+                "bar",
+                "Average Rating by Genre",
+                "Genre",
+                "Average Rating",
+            )
+            return render_series, args, {}
+        if name == "price_vs_rating":
+            df = df.dropna(subset=["price_usd", "average_rating"])
+            args = (
+                df["price_usd"].to_numpy(),
+                df["average_rating"].to_numpy(),
+                "Price vs Average Rating",
+                "Price (USD)",
+                "Average Rating",
+            )
+            return render_scatter, args, {}
+        if name == "books_by_year":
+            df = df.dropna(subset=["publication_year"])
+            counts = df["publication_year"].value_counts().sort_index()
+            args = (counts, "line", "Books Released by Year", "Year", "Number of Books")
+            return render_series, args, {"figsize": (10, 5)}
+        if name == "availability_pie":
+            status = df["available"].value_counts()
+            args = (status, "pie", "Available vs Checked Out", "", "")
+            return render_series, args, {"figsize": (6, 6), "autopct": "%1.1f%%"}
+        raise ValueError(f"Unknown chart: {name}")
+
+    def _render_chart(self, name: str, books: BookSource, out_path: str) -> str:
+        df = self.cleaned_frame(books, CHARTS[name][1])
+        render, args, kwargs = self._chart_job(name, df)
+        render(*args, out_path=out_path, **kwargs)
+        return out_path
+
+    @metrics.timed("analytics.render_report")
+    def render_report(
+        self,
+        books: BookSource,
+        out_dir: str = ".",
+        max_workers: Optional[int] = None,
+        parallel: bool = True,
+    ) -> Dict[str, Dict]:
+        """Render all five charts into ``out_dir``.
+
+        The frame is built once and every chart's aggregate computed from
+        it; the figures are then rendered concurrently in a process pool
+        (in-process with ``parallel=False``). Returns
+        ``{"paths": {chart: path}, "timings": {...}}`` with seconds for the
+        aggregation step, each chart and the whole report.
+        """
+        start = time.perf_counter()
+        os.makedirs(out_dir, exist_ok=True)
+        columns = sorted({c for _, cols in CHARTS.values() for c in cols})
+        df = self.cleaned_frame(books, columns)
+        jobs = {name: self._chart_job(name, df) for name in CHARTS}
+        paths = {name: os.path.join(out_dir, CHARTS[name][0]) for name in CHARTS}
+        timings = {"aggregate": time.perf_counter() - start}
+        if parallel:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    name: pool.submit(render, *args, out_path=paths[name], **kwargs)
+                    for name, (render, args, kwargs) in jobs.items()
+                }
+                for name, future in futures.items():
+                    timings[name] = future.result()
+        else:
+            for name, (render, args, kwargs) in jobs.items():
+                timings[name] = render(*args, out_path=paths[name], **kwargs)
+        timings["total"] = time.perf_counter() - start
+        return {"paths": paths, "timings": timings}
+
+    @metrics.timed("analytics.genre_count_chart")
     def genre_count_chart(
-        self, books: List[Book], out_path: str = "genre_counts.png"
+        self, books: BookSource, out_path: str = "genre_counts.png"
     ) -> str:
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
-        counts = df["genre"].value_counts()
-        plt.figure(figsize=(8, 6))
-        counts.plot(kind="bar")
-        plt.title("Books per Genre")
-        plt.xlabel("Genre")
-        plt.ylabel("Count")
-        plt.tight_layout()
-        plt.savefig(out_path)
-        plt.close()
-        return out_path
+        return self._render_chart("genre_counts", books, out_path)
 
+    @metrics.timed("analytics.genre_rating_chart")
     def genre_rating_chart(
-        self, books: List[Book], out_path: str = "genre_ratings.png"
+        self, books: BookSource, out_path: str = "genre_ratings.png"
     ) -> str:
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
-        grouped = (
-            df.groupby("genre")["average_rating"].mean().sort_values(ascending=False)
-        )
-        plt.figure(figsize=(8, 6))
-        grouped.plot(kind="bar")
-        plt.title("Average Rating by Genre")
-        plt.xlabel("Genre")
-        plt.ylabel("Average Rating")
-        plt.tight_layout()
-        plt.savefig(out_path)
-        plt.close()
-        return out_path
+        return self._render_chart("genre_ratings", books, out_path)
 
+    @metrics.timed("analytics.scatter_price_rating")
     def scatter_price_rating(
-        self, books: List[Book], out_path: str = "price_vs_rating.png"
+        self, books: BookSource, out_path: str = "price_vs_rating.png"
     ) -> str:
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
-        df = df.dropna(subset=["price_usd", "average_rating"])
-        plt.figure(figsize=(8, 6))
-        plt.scatter(df["price_usd"], df["average_rating"], alpha=0.6)
-        plt.title("Price vs Average Rating")
-        plt.xlabel("Price (USD)")
-        plt.ylabel("Average Rating")
-        plt.tight_layout()
-        plt.savefig(out_path)
-        plt.close()
-        return out_path
+        return self._render_chart("price_vs_rating", books, out_path)
 
+    @metrics.timed("analytics.line_books_by_year")
     def line_books_by_year(
-        self, books: List[Book], out_path: str = "books_by_year.png"
+        self, books: BookSource, out_path: str = "books_by_year.png"
     ) -> str:
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
-        df = df.dropna(subset=["publication_year"])
-        counts = df["publication_year"].value_counts().sort_index()
-        plt.figure(figsize=(10, 5))
-        counts.plot(kind="line")
-        plt.title("Books Released by Year")
-        plt.xlabel("Year")
-        plt.ylabel("Number of Books")
-        plt.tight_layout()
-        plt.savefig(out_path)
-        plt.close()
-        return out_path
+        return self._render_chart("books_by_year", books, out_path)
 
+    @metrics.timed("analytics.pie_checked_in_vs_available")
     def pie_checked_in_vs_available(
-        self, books: List[Book], out_path: str = "availability_pie.png"
+        self, books: BookSource, out_path: str = "availability_pie.png"
     ) -> str:
-        df = self.df_from_books(books)
-        df = self.clean_df(df)
-        status = df["available"].value_counts()
-        plt.figure(figsize=(6, 6))
-        status.plot(kind="pie", autopct="%1.1f%%")
-        plt.title("Available vs Checked Out")
-        plt.ylabel("")
-        plt.tight_layout()
-        plt.savefig(out_path)
-        plt.close()
-        return out_path
+        return self._render_chart("availability_pie", books, out_path)
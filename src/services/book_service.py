@@ -1,54 +1,331 @@
-from typing import List, Optional, Dict
-from src.repositories.book_repository_protocol import BookRepositoryProtocol
+from typing import Iterator, List, Optional, Dict
+from src.repositories.book_query import (
+    encode_cursor,
+    parse_filters,
+    parse_order,
+    parse_sort,
+)
+from src.repositories.book_repository_protocol import (
+    BookRepositoryProtocol,
+    VersionConflictError,
+)
 from src.domain.book import Book
+from src.instrumentation import metrics
+from src.services.catalog_aggregates import CatalogAggregates
+from src.services.due_date_index import DueDateIndex
 
 
 class BookService:
-    def __init__(self, repo: BookRepositoryProtocol):
+    def __init__(
+        self,
+        repo: BookRepositoryProtocol,
+        aggregates: Optional[CatalogAggregates] = None,
+        due_dates: Optional[DueDateIndex] = None,
+    ):
         self.repo = repo
+        # kept current by every add/update/delete below; build it with
+        # CatalogAggregates.from_books(repo.iter_books())
+        self.aggregates = aggregates
+        # open loans by due date, kept current by check-out/check-in/delete;
+        # build it with DueDateIndex.from_books(repo.iter_books())
+        self.due_dates = due_dates
 
+    @metrics.timed("service.get_all_books")
     def get_all_books(self) -> List[Book]:
         return self.repo.get_all_books()
 
-    def add_book(self, book: Book) -> str:
+    @metrics.timed("service.list_books")
+    def list_books(
+        self,
+        after: Optional[str] = None,
+        limit: int = 20,
+        order_by: Optional[str] = None,
+    ) -> Dict:
+        """One page of books: ``{"books": [...], "next": cursor or None}``.
+
+        Pass ``next`` back as ``after`` (with the same ``order_by``) for the
+        following page. Books are ordered by ``order_by`` (``-field`` for
+        descending) and then book_id; the default is book_id alone.
+        """
+        field, _ = parse_order(order_by)
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError("limit must be a positive integer")
+        # one extra row tells whether another page exists
+        books = self.repo.list_books(after, limit + 1, order_by)
+        if len(books) <= limit:
+            return {"books": books, "next": None}
+        last = books[limit - 1]
+        cursor = encode_cursor(
+            order_by, {field: getattr(last, field), "book_id": last.book_id}
+        )
+        return {"books": books[:limit], "next": cursor}
+
+    def iter_books(self) -> Iterator[Book]:
+        """Stream the catalog one Book at a time."""
+        return self.repo.iter_books()
+
+    @staticmethod
+    def _validate(book: Book):
         if not book.title or not book.author:
             raise ValueError("Book must have title and author")
-        return self.repo.add_book(book)
 
+    @staticmethod
+    def _batch_result(book_id: str, error: Optional[str] = None) -> Dict:
+        return {"book_id": book_id, "ok": error is None, "error": error}
+
+    @metrics.timed("service.add_book")
+    def add_book(self, book: Book) -> str:
+        self._validate(book)
+        book_id = self.repo.add_book(book)
+        if self.aggregates is not None:
+            self.aggregates.add(book)
+        return book_id
+
+    @metrics.timed("service.add_books")
+    def add_books(self, books: List[Book]) -> List[Dict]:
+        """Validate every book, then persist the valid ones in one write.
+
+        Returns one ``{"book_id", "ok", "error"}`` result per input book.
+        """
+        results = []
+        valid = []
+        for book in books:
+            try:
+                self._validate(book)
+            except ValueError as e:
+                results.append(self._batch_result(book.book_id, str(e)))
+                continue
+            valid.append(book)
+            results.append(self._batch_result(book.book_id))
+        if valid:
+            self.repo.add_books(valid)
+            if self.aggregates is not None:
+                for book in valid:
+                    self.aggregates.add(book)
+        return results
+
+    @metrics.timed("service.get_book_by_id")
     def get_book_by_id(self, book_id: str) -> Optional[Book]:
         return self.repo.get_book_by_id(book_id)
 
+    @metrics.timed("service.update_book")
     def update_book(self, book_id: str, data: Dict) -> Optional[Book]:
-        return self.repo.update_book(book_id, data)
+        updated = self.repo.update_book(book_id, data)
+        if updated is not None and self.aggregates is not None:
+            self.aggregates.update(updated)
+        return updated
+
+    @metrics.timed("service.update_books")
+    def update_books(self, updates: Dict[str, Dict]) -> List[Dict]:
+        """Apply ``{book_id: data}`` updates with a single write."""
+        valid = {k: v for k, v in updates.items() if isinstance(v, dict)}
+        updated = dict(zip(valid, self.repo.update_books(valid))) if valid else {}
+        if self.aggregates is not None:
+            for book in updated.values():
+                if book is not None:
+                    self.aggregates.update(book)
+        results = []
+        for book_id, data in updates.items():
+            if book_id not in valid:
+                results.append(
+                    self._batch_result(book_id, "Update data must be a dict")
+                )
+            elif updated[book_id] is None:
+                results.append(self._batch_result(book_id, "Book not found"))
+            else:
+                results.append(self._batch_result(book_id))
+        return results
 
+    @metrics.timed("service.delete_book")
     def delete_book(self, book_id: str) -> bool:
-        return self.repo.delete_book(book_id)
+        deleted = self.repo.delete_book(book_id)
+        if deleted and self.aggregates is not None:
+            self.aggregates.remove(book_id)
+        if deleted and self.due_dates is not None:
+            self.due_dates.remove(book_id)
+        return deleted
+
+    @metrics.timed("service.delete_books")
+    def delete_books(self, book_ids: List[str]) -> List[Dict]:
+        """Delete several books with a single write."""
+        deleted = self.repo.delete_books(list(book_ids)) if book_ids else []
+        for book_id, ok in zip(book_ids, deleted):
+            if ok and self.aggregates is not None:
+                self.aggregates.remove(book_id)
+            if ok and self.due_dates is not None:
+                self.due_dates.remove(book_id)
+        return [
+            self._batch_result(book_id, None if ok else "Book not found")
+            for book_id, ok in zip(book_ids, deleted)
+        ]
 
+    @metrics.timed("service.circulate_books")
+    def circulate_books(self, requests: List[Dict], retries: int = 10) -> List[Dict]:
+        """Apply several check-outs/check-ins with a single write.
+
+        Each request is ``{"action": "check_out" | "check_in", "book_id",
+        "user_email", "due_date"}``. Requests apply in order, so a second
+        check-out of the same book fails like it would one call at a time.
+
+        Books are stored with ``compare_and_swap_books``: one that another
+        writer changed after it was read is not overwritten. Instead every
+        request on it is re-read and re-applied, up to ``retries`` times.
+        """
+        results: List[Optional[Dict]] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        for attempt in range(retries + 1):
+            staged: Dict[str, Book] = {}
+            changed = set()
+            # book_id -> positions of the requests that saw this read of it
+            readers: Dict[str, List[int]] = {}
+            for i in pending:
+                request = requests[i]
+                book_id = request.get("book_id")
+                book = staged.get(book_id) or self.repo.get_book_by_id(book_id)
+                if book is None:
+                    results[i] = self._batch_result(book_id, "Book not found")
+                    continue
+                staged[book_id] = book
+                readers.setdefault(book_id, []).append(i)
+                try:
+                    self._circulate(book, request)
+                except Exception as e:
+                    results[i] = self._batch_result(book_id, str(e))
+                    continue
+                changed.add(book_id)
+                results[i] = self._batch_result(book_id)
+            if not changed:
+                pending = []
+                break
+            writes = {
+                book_id: (book.version, book.to_dict())
+                for book_id, book in staged.items()
+                if book_id in changed
+            }
+            swapped = self.repo.compare_and_swap_books(writes)
+            pending = []
+            for book_id, outcome in zip(writes, swapped):
+                if isinstance(outcome, VersionConflictError):
+                    pending.extend(readers[book_id])
+                elif outcome is None:
+                    for i in readers[book_id]:
+                        results[i] = self._batch_result(book_id, "Book not found")
+            if not pending:
+                break
+            metrics.count("service.circulation_conflicts", len(pending))
+            pending.sort()
+        for i in pending:
+            results[i] = self._batch_result(
+                requests[i].get("book_id"), "Book was changed concurrently"
+            )
+        for request, result in zip(requests, results):
+            if result["ok"]:
+                self._track_loan(request["action"], request)
+        return results
+
+    @staticmethod
+    def _circulate(book: Book, request: Dict):
+        if request.get("action") == "check_out":
+            book.check_out(
+                user_email=request.get("user_email"),
+                due_date=request.get("due_date"),
+            )
+        elif request.get("action") == "check_in":
+            book.check_in(user_email=request.get("user_email"))
+        else:
+            raise ValueError(f"Unknown action: {request.get('action')}")
+
+    def _track_loan(self, action: str, request: Dict):
+        if self.due_dates is None:
+            return
+        if action == "check_out":
+            self.due_dates.add(
+                request["book_id"], request.get("user_email"), request.get("due_date")
+            )
+        else:
+            self.due_dates.remove(request["book_id"])
+
+    @metrics.timed("service.find_book_by_name")
     def find_book_by_name(self, query: str) -> List[Book]:
         if not isinstance(query, str):
             raise TypeError("Expected str, got something else.")
         return self.repo.find_book_by_name(query)
 
+    @metrics.timed("service.find_books")
+    def find_books(
+        self,
+        filters: Optional[Dict] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Book]:
+        """Books matching every filter, e.g. ``{"genre": "Mystery",
+        "publication_year__gt": 1990, "price_usd__lt": 20}``.
+
+        ``sort`` names a field, ``-field`` for descending. See
+        ``src.repositories.book_query`` for the operators.
+        """
+        parse_filters(filters)
+        parse_sort(sort)
+        if limit is not None and (not isinstance(limit, int) or limit < 1):
+            raise ValueError("limit must be a positive integer")
+        return self.repo.find_books(filters, sort, limit)
+
+    @metrics.timed("service.search_by_name")
+    def search_by_name(self, query: str, limit: int = 10) -> List[Book]:
+        """Return the ``limit`` best title matches, exact and prefix first."""
+        if not isinstance(query, str):
+            raise TypeError("Expected str, got something else.")
+        return self.repo.search_by_name(query, limit)
+
+    @staticmethod
+    def _page(offset: int, limit: int):
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError("offset must be a non-negative integer")
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError("limit must be a positive integer")
+
+    @metrics.timed("service.get_history")
+    def get_history(self, book_id: str, offset: int = 0, limit: int = 20) -> List[Dict]:
+        """A page of one book's checkout history, oldest first."""
+        self._page(offset, limit)
+        return self.repo.get_history(book_id, offset, limit)
+
+    @metrics.timed("service.get_user_history")
+    def get_user_history(
+        self, user_email: str, offset: int = 0, limit: int = 20
+    ) -> List[Dict]:
+        """A page of one user's checkouts and check-ins across all books."""
+        self._page(offset, limit)
+        return self.repo.get_user_history(user_email, offset, limit)
+
+    @metrics.timed("service.check_out")
     def check_out(
         self,
         book_id: str,
         user_email: Optional[str] = None,
         due_date: Optional[str] = None,
     ) -> Optional[Book]:
-        book = self.repo.get_book_by_id(book_id)
-        if not book:
+        # one atomic read-modify-write; a concurrent writer cannot be lost
+        updated = self.repo.mutate(
+            book_id,
+            lambda book: book.check_out(user_email=user_email, due_date=due_date),
+        )
+        if updated is None:
             raise ValueError("Book not found")
-        book.check_out(user_email=user_email, due_date=due_date)
-        # persist changes
-        updated = self.repo.update_book(book_id, book.to_dict())
+        self._track_loan(
+            "check_out",
+            {"book_id": book_id, "user_email": user_email, "due_date": due_date},
+        )
         return updated
 
+    @metrics.timed("service.check_in")
     def check_in(
         self, book_id: str, user_email: Optional[str] = None
     ) -> Optional[Book]:
-        book = self.repo.get_book_by_id(book_id)
-        if not book:
+        updated = self.repo.mutate(
+            book_id, lambda book: book.check_in(user_email=user_email)
+        )
+        if updated is None:
             raise ValueError("Book not found")
-        book.check_in(user_email=user_email)
-        updated = self.repo.update_book(book_id, book.to_dict())
+        self._track_loan("check_in", {"book_id": book_id})
         return updated
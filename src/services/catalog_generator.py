@@ -0,0 +1,351 @@
+import os
+from datetime import datetime
+from typing import Dict, IO, Iterator, List, Optional
+
+import numpy as np
+
+from src.repositories.columnar_snapshot import (
+    BOOL_COLUMNS,
+    CATEGORICAL_COLUMNS,
+    NUMERIC_COLUMNS,
+    STRING_COLUMNS,
+    ColumnarSnapshot,
+    source_signature,
+)
+from src.repositories.file_io import atomic_write
+
+GENRES = [
+    "Fantasy",
+    "Sci-Fi",
+    "Non-Fiction",
+    "Mystery",
+    "Romance",
+    "Technology",
+    "History",
+]
+PUBLISHERS = [
+    "North Star Press",
+    "Emerald House",
+    "Atlas Publishing",
+    "Blue River Books",
+]
+FORMATS = ["Hardcover", "Paperback", "Ebook", "Audiobook"]
+LANGUAGES = ["English"]
+
+FORMAT_BY_EXTENSION = {".json": "json", ".jsonl": "jsonl", ".npz": "npz"}
+
+WINDOW = np.timedelta64(182, "D")
+LOAN_PERIOD = np.timedelta64(14, "D")
+_MICROSECOND = np.timedelta64(1, "us")
+
+# every generated string comes from the vocabularies above, so rows can be
+# formatted directly instead of going through json.dumps
+_ROW = (
+    '{"book_id": "%s", "title": "%s", "author": "%s", "genre": "%s", '
+    '"publication_year": %d, "page_count": %d, "average_rating": %r, '
+    '"ratings_count": %d, "price_usd": %r, "publisher": "%s", '
+    '"language": "%s", "format": "%s", "in_print": %s, "sales_millions": %r, '
+    '"last_checkout": "%s", "available": %s, "checked_out_by": %s, '
+    '"checkout_history": %s}'
+)
+_CHECKOUT = (
+    '{"action": "checkout", "timestamp": "%s", "user_email": "%s", "due_date": "%s"}'
+)
+_CHECKIN = '{"action": "checkin", "timestamp": "%s", "user_email": "%s"}'
+
+_UUID_HEX_POSITIONS = [i for i in range(36) if i not in (8, 13, 18, 23)]
+
+
+def _uuid4s(rng: np.random.Generator, size: int) -> np.ndarray:
+    raw = rng.integers(0, 256, (size, 16), dtype=np.uint8)
+    raw[:, 6] = raw[:, 6] & 0x0F | 0x40  # version 4
+    raw[:, 8] = raw[:, 8] & 0x3F | 0x80  # RFC 4122 variant
+    digits = np.frombuffer(raw.tobytes().hex().encode(), dtype=np.uint8)
+    out = np.full((size, 36), ord("-"), dtype=np.uint8)
+    out[:, _UUID_HEX_POSITIONS] = digits.reshape(size, 32)
+    return out.view("S36").ravel().astype(str)
+
+
+def _pick(
+    rng: np.random.Generator, options: int, size: int, zipf: Optional[float]
+) -> np.ndarray:
+    """Indices into ``options`` choices, uniform or Zipf-skewed by rank."""
+    if not zipf:
+        return rng.integers(0, options, size)
+    weights = 1.0 / np.arange(1, options + 1) ** zipf
+    return rng.choice(options, size=size, p=weights / weights.sum())
+
+
+def _json_bools(values: np.ndarray) -> List[str]:
+    return np.where(values, "true", "false").tolist()
+
+
+class CatalogGenerator:
+    """Vectorized synthetic catalog for load tests.
+
+    Books are generated ``chunk_size`` at a time as NumPy columns and
+    written as they are produced, so memory stays bounded however large
+    ``count`` is (except for the ``.npz`` snapshot, which is written from
+    whole columns). The same ``seed``, ``chunk_size`` and ``now`` always
+    give the same catalog.
+
+    ``zipf`` skews author and genre popularity (rank ``k`` is drawn with
+    weight ``1 / k**zipf``); None draws them uniformly. With
+    ``histories=True`` every book gets a Poisson number of loans within the
+    last six months, consistent with its ``available``, ``checked_out_by``
+    and ``last_checkout`` fields.
+    """
+
+    def __init__(
+        self,
+        count: int = 500,
+        seed: Optional[int] = None,
+        chunk_size: int = 100_000,
+        authors: int = 80,
+        zipf: Optional[float] = None,
+        histories: bool = False,
+        mean_checkouts: float = 3.0,
+        users: int = 1000,
+        now: Optional[datetime] = None,
+    ):
+        self.count = count
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.authors = np.array([f"Author {i}" for i in range(1, authors + 1)])
+        self.zipf = zipf
+        self.histories = histories
+        self.mean_checkouts = mean_checkouts
+        self.users = users
+        self.window_start = np.datetime64(now or datetime.now(), "us") - WINDOW
+
+    def _vocabularies(self) -> Dict[str, np.ndarray]:
+        return {
+            "genre": np.array(GENRES),
+            "author": self.authors,
+            "publisher": np.array(PUBLISHERS),
+            "language": np.array(LANGUAGES),
+            "format": np.array(FORMATS),
+        }
+
+    def chunks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield the catalog as dicts of columns, ``chunk_size`` books each.
+
+        Categorical columns hold codes into ``_vocabularies()``.
+        """
+        rng = np.random.default_rng(self.seed)
+        window_us = int(WINDOW // _MICROSECOND)
+        for start in range(0, self.count, self.chunk_size):
+            n = min(self.chunk_size, self.count - start)
+            chunk = {
+                "book_id": _uuid4s(rng, n),
+                "title": np.char.add(
+                    "Book Title ", np.arange(start + 1, start + n + 1).astype(str)
+                ),
+                "author": _pick(rng, len(self.authors), n, self.zipf),
+                "genre": _pick(rng, len(GENRES), n, self.zipf),
+                "publication_year": rng.integers(1850, 2026, n),
+                "page_count": rng.integers(120, 1101, n),
+                "average_rating": np.round(rng.uniform(1.5, 4.9, n), 2),
+                "ratings_count": rng.integers(25, 10001, n),
+                "price_usd": np.round(rng.uniform(7.99, 149.99, n), 2),
+                "publisher": rng.integers(0, len(PUBLISHERS), n),
+                "language": np.zeros(n, dtype=np.int64),
+                "format": rng.integers(0, len(FORMATS), n),
+                "in_print": rng.random(n) < 0.8,
+                "sales_millions": np.round(rng.uniform(0.01, 15, n), 2),
+                "last_checkout": self.window_start
+                + rng.integers(0, window_us, n).astype("timedelta64[us]"),
+                "available": rng.random(n) < 0.5,
+            }
+            if self.histories:
+                self._add_histories(rng, chunk)
+            yield chunk
+
+    def _add_histories(self, rng: np.random.Generator, chunk: Dict):
+        available = chunk["available"]
+        n = len(available)
+        loans = rng.poisson(self.mean_checkouts, n)
+        # a checked-out book's last loan is still open
+        loans = np.where(available, loans, np.maximum(loans, 1))
+        events = 2 * loans - (~available)
+        total = int(events.sum())
+        owner = np.repeat(np.arange(n), events)
+        offsets = rng.integers(0, int(WINDOW // _MICROSECOND), total)
+        offsets = offsets[np.lexsort((offsets, owner))]
+        first = np.cumsum(events) - events
+        checkout = (np.arange(total) - np.repeat(first, events)) % 2 == 0
+        # each check-in is made by the user who checked the book out
+        user = rng.integers(1, self.users + 1, total)
+        checkins = np.flatnonzero(~checkout)
+        user[checkins] = user[checkins - 1]
+        times = self.window_start + offsets.astype("timedelta64[us]")
+        due = times + LOAN_PERIOD
+
+        entries = np.empty(total, dtype=object)
+        emails = np.char.add(np.char.add("user", user.astype(str)), "@example.com")
+        out = np.flatnonzero(checkout)
+        entries[out] = [
+            _CHECKOUT % row
+            for row in zip(
+                times[out].astype(str).tolist(),
+                emails[out].tolist(),
+                due[out].astype(str).tolist(),
+            )
+        ]
+        entries[checkins] = [
+            _CHECKIN % row
+            for row in zip(
+                times[checkins].astype(str).tolist(), emails[checkins].tolist()
+            )
+        ]
+        bounds = np.append(first, total).tolist()
+        chunk["checkout_history"] = [
+            "[" + ", ".join(entries[bounds[i] : bounds[i + 1]]) + "]" for i in range(n)
+        ]
+
+        has_loans = loans > 0
+        if not total:
+            chunk["checked_out_by"] = np.full(n, "")
+            return
+        last = first + events - 1 - available  # index of the latest checkout
+        chunk["last_checkout"] = np.where(
+            has_loans, times[np.where(has_loans, last, 0)], chunk["last_checkout"]
+        )
+        chunk["checked_out_by"] = np.where(
+            available, "", emails[np.where(available, 0, last)]
+        )
+
+    def rows(self, chunk: Dict[str, np.ndarray]) -> List[str]:
+        """One JSON object per book, in ``Book.to_dict`` key order."""
+        n = len(chunk["book_id"])
+        vocab = self._vocabularies()
+        if self.histories:
+            checked_out_by = [
+                f'"{email}"' if email else "null"
+                for email in chunk["checked_out_by"].tolist()
+            ]
+            history = chunk["checkout_history"]
+        else:
+            checked_out_by = ["null"] * n
+            history = ["[]"] * n
+        columns = [
+            chunk["book_id"].tolist(),
+            chunk["title"].tolist(),
+            vocab["author"][chunk["author"]].tolist(),
+            vocab["genre"][chunk["genre"]].tolist(),
+            chunk["publication_year"].tolist(),
+            chunk["page_count"].tolist(),
+            chunk["average_rating"].tolist(),
+            chunk["ratings_count"].tolist(),
+            chunk["price_usd"].tolist(),
+            vocab["publisher"][chunk["publisher"]].tolist(),
+            vocab["language"][chunk["language"]].tolist(),
+            vocab["format"][chunk["format"]].tolist(),
+            _json_bools(chunk["in_print"]),
+            chunk["sales_millions"].tolist(),
+            chunk["last_checkout"].astype(str).tolist(),
+            _json_bools(chunk["available"]),
+            checked_out_by,
+            history,
+        ]
+        return [_ROW % row for row in zip(*columns)]
+
+    def write(
+        self, path: str, fmt: Optional[str] = None, snapshot: bool = False
+    ) -> str:
+        """Write the catalog to ``path`` and return it.
+
+        ``fmt`` is "json" (an array, one book per line), "jsonl" or "npz" (a
+        ColumnarSnapshot); by default it follows the file extension. With
+        ``snapshot=True`` a text catalog also gets its ColumnarSnapshot,
+        built in the same pass and saved where ``for_repository`` looks.
+        """
+        fmt = fmt or FORMAT_BY_EXTENSION.get(os.path.splitext(path)[1], "json")
+        if fmt not in ("json", "jsonl", "npz"):
+            raise ValueError(f"Unknown catalog format: {fmt}")
+        pieces: Optional[Dict[str, list]] = None
+        if fmt == "npz" or snapshot:
+            pieces = {c: [] for c in STRING_COLUMNS + CATEGORICAL_COLUMNS}
+            pieces.update({c: [] for c in NUMERIC_COLUMNS + BOOL_COLUMNS})
+
+        def collect(chunk):
+            if pieces is not None:
+                for c in pieces:
+                    pieces[c].append(chunk[c])
+
+        if fmt == "npz":
+            for chunk in self.chunks():
+                collect(chunk)
+            self._snapshot(pieces, None).save(path)
+            return path
+
+        def write_text(f: IO):
+            separator = ",\n" if fmt == "json" else "\n"
+            if fmt == "json":
+                f.write("[\n")
+            first = True
+            for chunk in self.chunks():
+                collect(chunk)
+                if not first:
+                    f.write(separator)
+                f.write(separator.join(self.rows(chunk)))
+                first = False
+            f.write("\n]\n" if fmt == "json" else "\n" if self.count else "")
+
+        atomic_write(path, write_text)
+        if pieces is not None:
+            snap = self._snapshot(pieces, source_signature(path))
+            snap.save(ColumnarSnapshot.path_for(path))
+        return path
+
+    def _snapshot(self, pieces: Dict[str, list], signature) -> ColumnarSnapshot:
+        columns, categories = {}, {}
+        vocab = self._vocabularies()
+        for c, parts in pieces.items():
+            values = np.concatenate(parts) if parts else np.empty(0)
+            if c in CATEGORICAL_COLUMNS:
+                # drop categories no book uses, like from_records would
+                used, codes = np.unique(values.astype(np.int64), return_inverse=True)
+                columns[c] = codes.astype(np.int32)
+                categories[c] = vocab[c][used]
+            elif c in STRING_COLUMNS:
+                columns[c] = values.astype(str)
+            elif c == "available":
+                columns[c] = values.astype(bool)
+            else:
+                columns[c] = values.astype(np.float64)
+        return ColumnarSnapshot.from_columns(columns, categories, signature)
+
+
+def generate_catalog(
+    path: str, count: int = 500, fmt: Optional[str] = None, snapshot=False, **options
+) -> str:
+    """Write a synthetic catalog of ``count`` books; see CatalogGenerator."""
+    return CatalogGenerator(count, **options).write(path, fmt, snapshot)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic catalog.")
+    parser.add_argument("path", help="output file (.json, .jsonl or .npz)")
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--zipf", type=float, default=None)
+    parser.add_argument("--histories", action="store_true")
+    parser.add_argument("--snapshot", action="store_true")
+    args = parser.parse_args(argv)
+    generate_catalog(
+        args.path,
+        args.count,
+        snapshot=args.snapshot,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        zipf=args.zipf,
+        histories=args.histories,
+    )
+
+
+if __name__ == "__main__":
+    main()
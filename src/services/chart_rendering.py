@@ -0,0 +1,57 @@
+import time
+from typing import Tuple
+
+# matplotlib is imported inside the render functions: these run in worker
+# processes, and the object-oriented Figure API needs no pyplot global state
+
+
+def _new_axes(figsize: Tuple[float, float]):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    return fig, fig.subplots()
+
+
+def _finish(fig, ax, title: str, xlabel: str, ylabel: str, out_path: str):
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    fig.tight_layout()
+    fig.savefig(out_path)
+
+
+def render_series(
+    series,
+    kind: str,
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    out_path: str,
+    figsize: Tuple[float, float] = (8, 6),
+    **plot_kwargs,
+) -> float:
+    """Plot a pandas Series with ``Series.plot`` and save it.
+
+    Returns the seconds spent rendering.
+    """
+    start = time.perf_counter()
+    fig, ax = _new_axes(figsize)
+    series.plot(kind=kind, ax=ax, **plot_kwargs)
+    _finish(fig, ax, title, xlabel, ylabel, out_path)
+    return time.perf_counter() - start
+
+
+def render_scatter(
+    x,
+    y,
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    out_path: str,
+    figsize: Tuple[float, float] = (8, 6),
+) -> float:
+    start = time.perf_counter()
+    fig, ax = _new_axes(figsize)
+    ax.scatter(x, y, alpha=0.6)
+    _finish(fig, ax, title, xlabel, ylabel, out_path)
+    return time.perf_counter() - start
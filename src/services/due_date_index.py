@@ -0,0 +1,156 @@
+import heapq
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.domain.book import Book
+
+
+@dataclass(frozen=True, slots=True)
+class Loan:
+    book_id: str
+    user_email: Optional[str]
+    due_date: str
+
+
+def parse_due(value) -> Optional[float]:
+    """POSIX timestamp of an ISO due date, or None if it is not one."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def current_loan(book: Book) -> Optional[Loan]:
+    """The open loan of a checked-out book, from its last checkout entry."""
+    if book.available:
+        return None
+    history = book.checkout_history
+    for i in range(len(history) - 1, -1, -1):
+        if history[i].get("action") == "checkout":
+            entry = history[i]
+            return Loan(book.book_id, entry.get("user_email"), entry.get("due_date"))
+    return None
+
+
+class DueDateIndex:
+    """Open loans ordered by due date.
+
+    A min-heap of ``(due, seq, loan)`` with lazy deletion: check-ins and
+    re-checkouts only update the ``book_id -> (seq, loan)`` map, and heap
+    entries whose seq no longer matches are dropped when they surface (or
+    all at once when they outnumber the live ones). ``pop_due`` hands each
+    loan out once, in due order, at O(log n) per entry taken; the loan
+    stays open until it is removed.
+
+    BookService keeps it current through check_out, check_in and deletes.
+    Loans without a parseable due date are tracked but never come due.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._loans: Dict[str, Tuple[int, Loan]] = {}
+        self._heap: List[Tuple[float, int, Loan]] = []
+        self._seq = 0
+
+    @classmethod
+    def from_books(cls, books: Iterable[Book]) -> "DueDateIndex":
+        """Index the open loans of ``books``.
+
+        Only the history of checked-out books is read.
+        """
+        index = cls()
+        index.rebuild(books)
+        return index
+
+    def rebuild(self, books: Iterable[Book]):
+        self._reset()
+        for book in books:
+            loan = current_loan(book)
+            entry = self._track(loan) if loan is not None else None
+            if entry is not None:
+                self._heap.append(entry)
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._loans)
+
+    def __contains__(self, book_id: str) -> bool:
+        return book_id in self._loans
+
+    def get(self, book_id: str) -> Optional[Loan]:
+        item = self._loans.get(book_id)
+        return item[1] if item is not None else None
+
+    def _track(self, loan: Loan) -> Optional[Tuple[float, int, Loan]]:
+        # registers the loan; returns its heap entry, not yet on the heap
+        self._seq += 1
+        self._loans[loan.book_id] = (self._seq, loan)
+        due = parse_due(loan.due_date)
+        return None if due is None else (due, self._seq, loan)
+
+    def add(self, book_id: str, user_email: Optional[str], due_date: Optional[str]):
+        """Record a check-out, replacing any loan the book already had."""
+        entry = self._track(Loan(book_id, user_email, due_date))
+        if entry is not None:
+            heapq.heappush(self._heap, entry)
+            self._maybe_compact()
+
+    def remove(self, book_id: str):
+        """Record a check-in or delete."""
+        self._loans.pop(book_id, None)
+        self._maybe_compact()
+
+    def _live(self, entry: Tuple[float, int, Loan]) -> bool:
+        item = self._loans.get(entry[2].book_id)
+        return item is not None and item[0] == entry[1]
+
+    def _maybe_compact(self):
+        if len(self._heap) > 2 * len(self._loans) + 1024:
+            self._heap = [e for e in self._heap if self._live(e)]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, until: float, limit: Optional[int] = None) -> List[Loan]:
+        """Take the open loans due at or before ``until`` (a timestamp).
+
+        Each loan is returned by at most one call. ``limit`` caps the batch;
+        the rest stay queued for the next call.
+        """
+        taken: List[Loan] = []
+        heap = self._heap
+        while heap and heap[0][0] <= until:
+            if limit is not None and len(taken) >= limit:
+                break
+            entry = heapq.heappop(heap)
+            if self._live(entry):
+                taken.append(entry[2])
+        return taken
+
+    def requeue(self, loans: Iterable[Loan]):
+        """Put loans from ``pop_due`` back, e.g. after a failed delivery.
+
+        Loans that were checked in or replaced meanwhile are skipped.
+        """
+        for loan in loans:
+            item = self._loans.get(loan.book_id)
+            if item is not None and item[1] is loan:
+                heapq.heappush(self._heap, (parse_due(loan.due_date), item[0], loan))
+
+    def upcoming(self, until: float) -> Iterator[Loan]:
+        """Queued loans due at or before ``until``, earliest first.
+
+        Walks the heap from the root and only descends into nodes that are
+        due in time, so it costs O(k log k) for k results, not O(n).
+        """
+        heap = self._heap
+        frontier = [(heap[0], 0)] if heap and heap[0][0] <= until else []
+        while frontier:
+            entry, i = heapq.heappop(frontier)
+            if self._live(entry):
+                yield entry[2]
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap) and heap[child][0] <= until:
+                    heapq.heappush(frontier, (heap[child], child))
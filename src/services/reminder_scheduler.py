@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Protocol
+from src.instrumentation import metrics
+from src.services.due_date_index import DueDateIndex, Loan
+
+
+class ReminderSink(Protocol):
+    def send(self, reminders: List[Dict]) -> None: ...
+
+
+class OutboxSink:
+    """Appends reminders to a JSONL outbox file for a mailer to pick up."""
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+
+    def send(self, reminders: List[Dict]) -> None:
+        text = "".join(json.dumps(r) + "\n" for r in reminders)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+
+class ReminderScheduler:
+    """Sends one reminder per loan, ``lead`` before it falls due.
+
+    Each run takes only the loans due within ``lead`` of now from the
+    DueDateIndex and hands them to ``sink`` in batches of ``batch_size``.
+    A batch the sink rejects is requeued for the next run. A loan that is
+    checked in and out again gets a fresh reminder for its new due date.
+    """
+
+    def __init__(
+        self,
+        index: DueDateIndex,
+        sink: ReminderSink,
+        lead: timedelta = timedelta(days=7),
+        batch_size: int = 10_000,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self.index = index
+        self.sink = sink
+        self.lead = lead
+        self.batch_size = batch_size
+        self.clock = clock
+
+    @staticmethod
+    def _reminder(loan: Loan, now: datetime) -> Dict:
+        return {
+            "book_id": loan.book_id,
+            "user_email": loan.user_email,
+            "due_date": loan.due_date,
+            "sent_at": now.isoformat(),
+        }
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """Deliver every reminder that is due; returns how many were sent."""
+        now = now or self.clock()
+        until = (now + self.lead).timestamp()
+        sent = 0
+        with metrics.timer("reminders.run"):
+            while True:
+                loans = self.index.pop_due(until, self.batch_size)
+                if not loans:
+                    break
+                try:
+                    self.sink.send([self._reminder(loan, now) for loan in loans])
+                except Exception:
+                    self.index.requeue(loans)
+                    raise
+                sent += len(loans)
+        metrics.count("reminders.sent", sent)
+        return sent
+
+    def run_forever(
+        self, interval: float = 60.0, stop: Optional[threading.Event] = None
+    ):
+        """Call ``run_once`` every ``interval`` seconds until ``stop`` is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.run_once()
+            stop.wait(interval)
@@ -0,0 +1,134 @@
+import math
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple, Type
+from src.repositories.book_repository import BookRepository
+from src.services.catalog_aggregates import to_number
+
+
+class _GenrePartial:
+    __slots__ = ("rating_sum", "rating_n", "ratings_counts")
+
+    def __init__(self):
+        self.rating_sum = 0.0
+        self.rating_n = 0
+        # a median does not merge from summaries, so the values travel;
+        # a double array pickles as one buffer
+        self.ratings_counts = array("d")
+
+
+class CatalogPartial:
+    """Mergeable aggregates of one slice of the catalog.
+
+    Holds what average_price, bayesian_weighted_by_genre and the year/genre
+    counts need, in a form where the partials of several shards can be
+    added up: sums and counts, plus each genre's ratings counts for the
+    exact median. Values are coerced the way ``clean_df`` does it.
+    """
+
+    def __init__(self):
+        self.books = 0
+        self.price_sum = 0.0
+        self.price_n = 0
+        self.rating_sum = 0.0
+        self.rating_n = 0
+        self.genres: Dict[str, _GenrePartial] = {}
+        self.genre_counts: Counter = Counter()
+        self.year_counts: Counter = Counter()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "CatalogPartial":
+        partial = cls()
+        for record in records:
+            partial.add(record)
+        return partial
+
+    @classmethod
+    def merged(cls, partials: Iterable["CatalogPartial"]) -> "CatalogPartial":
+        total = cls()
+        for partial in partials:
+            total.merge(partial)
+        return total
+
+    def add(self, record: Dict):
+        self.books += 1
+        price = to_number(record.get("price_usd"))
+        rating = to_number(record.get("average_rating"))
+        year = to_number(record.get("publication_year"))
+        if price is not None:
+            self.price_sum += price
+            self.price_n += 1
+        if rating is not None:
+            self.rating_sum += rating
+            self.rating_n += 1
+        if year is not None:
+            self.year_counts[year] += 1
+        genre = record.get("genre")
+        if genre is None:
+            return
+        self.genre_counts[genre] += 1
+        stats = self.genres.get(genre)
+        if stats is None:
+            stats = self.genres[genre] = _GenrePartial()
+        if rating is not None:
+            stats.rating_sum += rating
+            stats.rating_n += 1
+        count = to_number(record.get("ratings_count"))
+        if count is not None:
+            stats.ratings_counts.append(count)
+
+    def merge(self, other: "CatalogPartial"):
+        self.books += other.books
+        self.price_sum += other.price_sum
+        self.price_n += other.price_n
+        self.rating_sum += other.rating_sum
+        self.rating_n += other.rating_n
+        self.genre_counts.update(other.genre_counts)
+        self.year_counts.update(other.year_counts)
+        for genre, theirs in other.genres.items():
+            stats = self.genres.get(genre)
+            if stats is None:
+                stats = self.genres[genre] = _GenrePartial()
+            stats.rating_sum += theirs.rating_sum
+            stats.rating_n += theirs.rating_n
+            stats.ratings_counts.extend(theirs.ratings_counts)
+
+    def average_price(self) -> float:
+        return self.price_sum / self.price_n if self.price_n else math.nan
+
+    def bayesian_weighted_by_genre(self, m: int = 50) -> List[Dict]:
+        """Rows as in CatalogAggregates.bayesian_weighted_by_genre."""
+        global_mean = self.rating_sum / self.rating_n if self.rating_n else math.nan
+        rows = []
+        for genre, stats in self.genres.items():
+            mean = stats.rating_sum / stats.rating_n if stats.rating_n else math.nan
+            counts = sorted(stats.ratings_counts)
+            n = len(counts)
+            if n == 0:
+                median = math.nan
+            else:
+                mid = n // 2
+                median = counts[mid] if n % 2 else (counts[mid - 1] + counts[mid]) / 2
+            weighted = (median / (median + m)) * mean + (m / (median + m)) * global_mean
+            rows.append(
+                {
+                    "genre": genre,
+                    "mean_average_rating": mean,
+                    "median_ratings_count": median,
+                    "weighted_rating": weighted,
+                }
+            )
+        rows.sort(
+            key=lambda r: (math.isnan(r["weighted_rating"]), -r["weighted_rating"])
+        )
+        return rows
+
+
+def shard_partial(spec: Tuple[Type[BookRepository], str]) -> CatalogPartial:
+    """Aggregate one shard from ``(repository_class, path)``; runs in a worker.
+
+    The worker opens the shard itself and streams its raw records, so only
+    the small partial is sent back to the parent.
+    """
+    repository_class, path = spec
+    return CatalogPartial.from_records(repository_class(path).iter_records())
@@ -0,0 +1,59 @@
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+
+
+def top_k_indices(values, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest values, largest first.
+
+    Uses partial selection (O(n) plus O(k log k) for the final order)
+    instead of a full sort. Ties are broken by position and NaN values rank
+    below everything, in position order, like ``sort_values`` with
+    ``na_position="last"``.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    k = max(0, min(int(k), len(values)))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    nan = np.isnan(values)
+    ids = np.flatnonzero(~nan)
+    v = values[ids]
+    if k < len(v):
+        kth = np.partition(v, len(v) - k)[len(v) - k]
+        above = ids[v > kth]
+        ties = ids[v == kth][: k - len(above)]
+        ids = np.concatenate([above, ties])
+    ids = ids[np.lexsort((ids, -values[ids]))]
+    if len(ids) < k:
+        ids = np.concatenate([ids, np.flatnonzero(nan)[: k - len(ids)]])
+    return ids
+
+
+class StreamingTopK:
+    """Running top-k over values that arrive in chunks.
+
+    Only the current best ``k`` entries and one chunk are held at a time.
+    Each entry carries an arbitrary key (a book_id, a record, ...). Ties go
+    to the entry pushed first.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self._values = np.empty(0, dtype=np.float64)
+        self._keys: List[Any] = []
+
+    def push(self, values, keys: Sequence[Any]):
+        values = np.asarray(values, dtype=np.float64)
+        if not isinstance(keys, Sequence):
+            keys = list(keys)
+        # select within the chunk first so only k keys are ever touched
+        local = top_k_indices(values, self.k)
+        merged = np.concatenate([self._values, values[local]])
+        merged_keys = self._keys + [keys[i] for i in local.tolist()]
+        best = top_k_indices(merged, self.k)
+        self._values = merged[best]
+        self._keys = [merged_keys[i] for i in best.tolist()]
+
+    def result(self) -> List[Tuple[Any, float]]:
+        """``(key, value)`` pairs, best first."""
+        return list(zip(self._keys, self._values.tolist()))
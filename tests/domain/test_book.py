@@ -0,0 +1,40 @@
+import pytest
+
+from src.domain.book import Book, BOOK_FIELDS
+
+
+def test_book_is_slotted():
+    book = Book(title="Dune", author="Herbert")
+    assert not hasattr(book, "__dict__")
+    with pytest.raises(AttributeError):
+        book.colour = "red"
+
+
+def test_from_dict_fills_defaults_without_mutating_input():
+    record = {"book_id": "1", "title": "Dune", "author": "Herbert"}
+    book = Book.from_dict(record)
+    assert book.available is True
+    assert book.checked_out_by is None
+    assert book.checkout_history == []
+    assert record == {"book_id": "1", "title": "Dune", "author": "Herbert"}
+
+
+def test_bulk_and_row_round_trips():
+    books = Book.from_records(
+        [{"title": "Dune", "author": "Herbert"}, {"title": "Emma", "author": "Austen"}]
+    )
+    assert [b.title for b in books] == ["Dune", "Emma"]
+    row = books[0].to_row()
+    assert len(row) == len(BOOK_FIELDS)
+    assert Book.from_row(row) == books[0]
+    assert Book.from_dict(books[1].to_dict()) == books[1]
+
+
+def test_check_out_and_in():
+    book = Book(title="Dune", author="Herbert")
+    book.check_out(user_email="a@example.com", due_date="2026-12-31")
+    with pytest.raises(Exception, match="already checked out"):
+        book.check_out()
+    book.check_in(user_email="a@example.com")
+    assert book.available is True
+    assert [h["action"] for h in book.checkout_history] == ["checkout", "checkin"]
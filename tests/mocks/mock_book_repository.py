@@ -1,4 +1,6 @@
 from src.domain.book import Book
+from src.repositories import book_query
+from src.repositories.book_repository_protocol import VersionConflictError
 
 
 class MockBookRepo:
@@ -9,6 +11,9 @@ class MockBookRepo:
     def get_all_books(self):
         return list(self.items)
 
+    def iter_books(self):
+        return iter(list(self.items))
+
     def add_book(self, book: Book):
         self.items.append(book)
         return book.book_id
@@ -19,6 +24,9 @@ class MockBookRepo:
             return []
         return [b for b in self.items if b.title and q in b.title.lower()]
 
+    def search_by_name(self, query, limit=10):
+        return self.find_book_by_name(query)[:limit]
+
     def get_book_by_id(self, book_id: str):
         for b in self.items:
             if b.book_id == book_id:
@@ -29,7 +37,9 @@ class MockBookRepo:
         for idx, item in enumerate(self.items):
             if item.book_id == book_id:
                 # apply dict updates
-                updated = Book.from_dict({**item.to_dict(), **data})
+                updated = Book.from_dict(
+                    {**item.to_dict(), **data, "version": item.version + 1}
+                )
                 self.items[idx] = updated
                 return updated
         return None
@@ -38,3 +48,69 @@ class MockBookRepo:
         before = len(self.items)
         self.items = [b for b in self.items if b.book_id != book_id]
         return len(self.items) < before
+
+    def add_books(self, books):
+        self.items.extend(books)
+        return [b.book_id for b in books]
+
+    def update_books(self, updates: dict):
+        return [self.update_book(book_id, data) for book_id, data in updates.items()]
+
+    def delete_books(self, book_ids):
+        return [self.delete_book(book_id) for book_id in book_ids]
+
+    def get_history(self, book_id, offset=0, limit=None):
+        book = self.get_book_by_id(book_id)
+        history = book.checkout_history if book else []
+        return history[offset:] if limit is None else history[offset : offset + limit]
+
+    def get_user_history(self, user_email, offset=0, limit=None):
+        entries = [
+            dict(entry, book_id=b.book_id)
+            for b in self.items
+            for entry in b.checkout_history
+            if entry.get("user_email") == user_email
+        ]
+        return entries[offset:] if limit is None else entries[offset : offset + limit]
+
+    def compare_and_swap(self, book_id, expected_version, data):
+        book = self.get_book_by_id(book_id)
+        if book is not None and book.version != expected_version:
+            raise VersionConflictError(book_id, expected_version, book.version)
+        return self.update_book(book_id, data)
+
+    def compare_and_swap_books(self, updates):
+        results = []
+        for book_id, (expected_version, data) in updates.items():
+            try:
+                results.append(self.compare_and_swap(book_id, expected_version, data))
+            except VersionConflictError as e:
+                results.append(e)
+        return results
+
+    def mutate(self, book_id, fn):
+        book = self.get_book_by_id(book_id)
+        if book is None:
+            return None
+        copy = Book.from_dict(
+            {**book.to_dict(), "checkout_history": list(book.checkout_history)}
+        )
+        fn(copy)
+        return self.update_book(book_id, copy.to_dict())
+
+    def find_books(self, filters=None, sort=None, limit=None):
+        conditions = book_query.parse_filters(filters)
+        found = [b for b in self.items if book_query.matches(b.to_dict(), conditions)]
+        by_id = {b.book_id: b for b in found}
+        ordered = book_query.order(
+            (b.to_dict() for b in found), book_query.parse_sort(sort), limit
+        )
+        return [by_id[r["book_id"]] for r in ordered]
+
+    def list_books(self, after=None, limit=20, order_by=None):
+        by_id = {b.book_id: b for b in self.items}
+        records = (b.to_dict() for b in self.items)
+        return [
+            by_id[r["book_id"]]
+            for r in book_query.page(records, order_by, after, limit)
+        ]
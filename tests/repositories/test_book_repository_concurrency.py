@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+
+fork = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+
+
+def _append_entries(cls, path, book_id, count):
+    repo = cls(path)
+    for i in range(count):
+        repo.append_checkout_history(book_id, {"action": "checkout", "seq": i})
+
+
+@fork
+@pytest.mark.parametrize("cls", [BookRepository, CachedBookRepository])
+def test_concurrent_writers_lose_no_updates(tmp_path, cls):
+    path = str(tmp_path / "books.json")
+    book_id = BookRepository(path).add_book(Book(title="Dune", author="Herbert"))
+
+    ctx = multiprocessing.get_context("fork")
+    procs = [
+        ctx.Process(target=_append_entries, args=(cls, path, book_id, 10))
+        for _ in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    assert all(p.exitcode == 0 for p in procs)
+    book = BookRepository(path).get_book_by_id(book_id)
+    assert len(book.checkout_history) == 40
+
+
+def test_failed_write_leaves_previous_file_intact(tmp_path, monkeypatch):
+    path = str(tmp_path / "books.json")
+    repo = BookRepository(path)
+    repo.add_book(Book(title="Dune", author="Herbert"))
+
+    def explode(*args, **kwargs):
+        raise RuntimeError("crash mid-write")
+
+    monkeypatch.setattr(os, "fsync", explode)
+    with pytest.raises(RuntimeError):
+        repo.add_book(Book(title="Emma", author="Austen"))
+    monkeypatch.undo()
+
+    assert [b.title for b in repo.get_all_books()] == ["Dune"]
+    assert sorted(os.listdir(tmp_path)) == ["books.json", "books.json.lock"]
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+
+
+@pytest.fixture()
+def path(tmp_path):
+    return str(tmp_path / "books.json")
+
+
+def test_lookup_served_from_cache(path, monkeypatch):
+    repo = CachedBookRepository(path)
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+
+    calls = []
+    original = repo._read_file
+    monkeypatch.setattr(repo, "_read_file", lambda: calls.append(1) or original())
+
+    assert repo.get_book_by_id(book_id).title == "Dune"
+    assert repo.get_book_by_id("missing") is None
+    assert calls == []
+
+
+def test_reloads_when_file_changes_on_disk(path):
+    repo = CachedBookRepository(path)
+    repo.add_book(Book(title="Dune", author="Herbert"))
+
+    other = BookRepository(path)
+    new_id = other.add_book(Book(title="Emma", author="Austen"))
+    # make sure the signature changes even on coarse mtime filesystems
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert repo.get_book_by_id(new_id).title == "Emma"
+
+
+def test_writes_keep_cache_and_file_in_sync(path):
+    repo = CachedBookRepository(path)
+    a = repo.add_book(Book(title="Dune", author="Herbert"))
+    b = repo.add_book(Book(title="Emma", author="Austen"))
+
+    assert repo.update_book(a, {"title": "Dune Messiah"}).title == "Dune Messiah"
+    assert repo.delete_book(b) is True
+    assert repo.delete_book(b) is False
+
+    on_disk = BookRepository(path).get_all_books()
+    assert [x.title for x in on_disk] == ["Dune Messiah"]
+    assert [x.title for x in repo.get_all_books()] == ["Dune Messiah"]
+
+
+def test_returned_books_do_not_alias_cached_history(path):
+    repo = CachedBookRepository(path)
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+
+    book = repo.get_book_by_id(book_id)
+    book.check_out(user_email="a@example.com")
+
+    assert repo.get_book_by_id(book_id).checkout_history == []
+
+
+def test_rejected_batch_leaves_cache_matching_disk(path, monkeypatch):
+    repo = CachedBookRepository(path, history_path=path + ".history.jsonl")
+    a, b = Book(title="A", author="X"), Book(title="B", author="X")
+    repo.add_books([a, b])
+    repo.mutate(b.book_id, lambda book: book.check_out(user_email="u@x"))
+
+    # history is append-only: the second item is rejected after the first
+    with pytest.raises(ValueError):
+        repo.update_books(
+            {a.book_id: {"title": "A-renamed"}, b.book_id: {"checkout_history": []}}
+        )
+    assert repo.get_book_by_id(a.book_id).title == "A"
+
+    # a failed write is not left behind in the cache either
+    def full_disk(data):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(repo, "_write_file", full_disk)
+    with pytest.raises(OSError):
+        repo.update_books({a.book_id: {"title": "A-renamed"}})
+    with pytest.raises(OSError):
+        repo.add_books([Book(title="C", author="X")])
+    monkeypatch.undo()
+    assert [x.title for x in repo.get_all_books()] == ["A", "B"]
+
+
+def test_failed_single_write_leaves_cache_matching_disk(path, monkeypatch):
+    repo = CachedBookRepository(path)
+    a = Book(title="A", author="X")
+    repo.add_book(a)
+
+    def full_disk(data):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(repo, "_write_file", full_disk)
+    with pytest.raises(OSError):
+        repo.add_book(Book(title="B", author="X"))
+    with pytest.raises(OSError):
+        repo.mutate(a.book_id, lambda book: book.check_out(user_email="u@x"))
+    with pytest.raises(OSError):
+        repo.delete_book(a.book_id)
+    monkeypatch.undo()
+    books = repo.get_all_books()
+    assert [b.title for b in books] == ["A"]
+    assert books[0].available is True
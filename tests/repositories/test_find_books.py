@@ -0,0 +1,149 @@
+import random
+
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_query import parse_filter_text, parse_filters
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.journaled_book_repository import JournaledBookRepository
+from src.repositories.sqlite_book_repository import SqliteBookRepository
+
+
+def catalog(n=300, seed=3):
+    rng = random.Random(seed)
+    books = []
+    for i in range(n):
+        books.append(
+            Book(
+                title=f"Book {i}",
+                author=f"Author {rng.randrange(20)}",
+                genre=rng.choice(["Mystery", "Fantasy", "Romance", None]),
+                publication_year=rng.choice([None, *range(1950, 2025)]),
+                price_usd=rng.choice([None, round(rng.uniform(1, 40), 2)]),
+                average_rating=round(rng.uniform(1, 5), 1),
+                available=rng.random() < 0.7,
+            )
+        )
+    return books
+
+
+@pytest.fixture(params=["json", "cached", "journaled", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "sqlite":
+        repo = SqliteBookRepository(str(tmp_path / "books.db"))
+    else:
+        cls = {
+            "json": BookRepository,
+            "cached": CachedBookRepository,
+            "journaled": JournaledBookRepository,
+        }[request.param]
+        repo = cls(str(tmp_path / "books.json"))
+    repo.add_books(catalog())
+    yield repo
+    if hasattr(repo, "close"):
+        repo.close()
+
+
+QUERIES = [
+    ({"genre": "Mystery", "publication_year__gt": 1990, "price_usd__lt": 20}, None),
+    ({"author__in": ["Author 3", "Author 7"], "available": True}, "-price_usd"),
+    ({"publication_year__gte": 2000, "publication_year__lte": 2004}, "title"),
+    ({"genre": None}, "publication_year"),
+    ({"price_usd": 12.5}, None),
+    ({}, "-average_rating"),
+]
+
+
+def expected(books, filters, sort, limit):
+    def ok(b):
+        for key, value in filters.items():
+            field, _, op = key.partition("__")
+            actual = getattr(b, field)
+            if op == "":
+                good = actual == value
+            elif op == "in":
+                good = actual in value
+            elif actual is None:
+                good = False
+            else:
+                good = {
+                    "gt": actual > value,
+                    "gte": actual >= value,
+                    "lt": actual < value,
+                    "lte": actual <= value,
+                }[op]
+            if not good:
+                return False
+        return True
+
+    found = [b for b in books if ok(b)]
+    if sort:
+        field = sort.lstrip("-")
+        present = [b for b in found if getattr(b, field) is not None]
+        present.sort(key=lambda b: getattr(b, field), reverse=sort.startswith("-"))
+        found = present + [b for b in found if getattr(b, field) is None]
+    return [b.book_id for b in found[:limit]]
+
+
+@pytest.mark.parametrize("filters,sort", QUERIES)
+@pytest.mark.parametrize("limit", [None, 5])
+def test_find_books_matches_brute_force(repo, filters, sort, limit):
+    books = repo.get_all_books()
+    got = [b.book_id for b in repo.find_books(filters, sort, limit)]
+    assert got == expected(books, filters, sort, limit)
+
+
+def test_cached_indexes_follow_writes(tmp_path):
+    repo = CachedBookRepository(str(tmp_path / "books.json"))
+    books = catalog(50)
+    repo.add_books(books)
+    query = {"genre": "Horror", "price_usd__lt": 5}
+    assert repo.find_books(query) == []
+
+    target = books[0].book_id
+    repo.update_book(target, {"genre": "Horror", "price_usd": 4.0})
+    repo.mutate(books[1].book_id, lambda b: setattr(b, "genre", "Horror"))
+    assert [b.book_id for b in repo.find_books(query)] == [target]
+
+    repo.delete_book(target)
+    assert repo.find_books(query) == []
+
+
+def test_planner_picks_most_selective_index(tmp_path):
+    repo = CachedBookRepository(str(tmp_path / "books.json"))
+    books = [
+        Book(title=f"B{i}", author="Common", genre="Mystery", publication_year=1900 + i)
+        for i in range(100)
+    ]
+    books[5].author = "Rare"
+    repo.add_books(books)
+
+    assert repo.explain({"author": "Rare", "genre": "Mystery"}) == {
+        "index": "author",
+        "rows": 1,
+    }
+    plan = repo.explain({"genre": "Mystery", "publication_year__gte": 1990})
+    assert plan == {"index": "publication_year", "rows": 10}
+    plan = repo.explain(
+        {"publication_year__gt": 1950, "publication_year__lt": 1953, "author": "Common"}
+    )
+    assert plan == {"index": "publication_year", "rows": 2}
+    assert repo.explain({"title": "B1"}) == {"index": None, "rows": 100}
+
+
+def test_query_validation_and_text_parsing():
+    with pytest.raises(ValueError):
+        parse_filters({"colour": "red"})
+    with pytest.raises(ValueError):
+        parse_filters({"price_usd__between": 1})
+    with pytest.raises(ValueError):
+        parse_filters({"price_usd__lt": "cheap"})
+    assert parse_filter_text(
+        "genre=Mystery, author__in=Author 1|Author 2, price_usd__lt=20, available=yes"
+    ) == {
+        "genre": "Mystery",
+        "author__in": ["Author 1", "Author 2"],
+        "price_usd__lt": 20,
+        "available": True,
+    }
@@ -0,0 +1,172 @@
+import json
+
+import pytest
+
+from src.domain.book import Book, LazyHistory
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.history_store import CheckoutHistoryStore
+from src.repositories.journaled_book_repository import JournaledBookRepository
+from src.repositories.sqlite_book_repository import SqliteBookRepository
+
+
+def entry(action, email="a@example.com", **extra):
+    return {"action": action, "user_email": email, **extra}
+
+
+def test_store_pages_by_book_and_user(tmp_path):
+    store = CheckoutHistoryStore(str(tmp_path / "history.jsonl"))
+    store.append_many(
+        [
+            ("b1", entry("checkout", seq=1)),
+            ("b2", entry("checkout", "b@example.com", seq=2)),
+            ("b1", entry("checkin", seq=3)),
+        ]
+    )
+    store.append("b1", entry("checkout", "b@example.com", seq=4))
+
+    assert store.count("b1") == 3
+    assert [e["seq"] for e in store.for_book("b1")] == [1, 3, 4]
+    assert [e["seq"] for e in store.for_book("b1", offset=1, limit=1)] == [3]
+    assert store.for_book("missing") == []
+    assert [(e["book_id"], e["seq"]) for e in store.for_user("b@example.com")] == [
+        ("b2", 2),
+        ("b1", 4),
+    ]
+
+    # a second store on the same file indexes it from scratch
+    other = CheckoutHistoryStore(store.path)
+    assert [e["seq"] for e in other.for_book("b1")] == [1, 3, 4]
+    store.append("b2", entry("checkin", seq=5))
+    assert [e["seq"] for e in other.for_book("b2")] == [2, 5]
+
+
+def test_store_repairs_torn_tail(tmp_path):
+    path = tmp_path / "history.jsonl"
+    store = CheckoutHistoryStore(str(path))
+    store.append("b1", entry("checkout", seq=1))
+    with open(path, "ab") as f:
+        f.write(b'{"book_id": "b1", "ent')
+
+    store = CheckoutHistoryStore(str(path))
+    assert store.count("b1") == 1
+    store.append("b1", entry("checkin", seq=2))
+    assert [e["seq"] for e in store.for_book("b1")] == [1, 2]
+    assert len(path.read_bytes().splitlines()) == 2
+
+
+@pytest.fixture(params=["json", "cached", "journaled", "sqlite"])
+def repo(request, tmp_path):
+    catalog = str(tmp_path / "books.json")
+    history = str(tmp_path / "history.jsonl")
+    if request.param == "json":
+        yield BookRepository(catalog, history_path=history)
+    elif request.param == "cached":
+        yield CachedBookRepository(catalog, history_path=history)
+    elif request.param == "journaled":
+        repo = JournaledBookRepository(catalog, history_path=history)
+        yield repo
+        repo.close()
+    else:
+        repo = SqliteBookRepository(str(tmp_path / "books.db"))
+        yield repo
+        repo.close()
+
+
+def test_history_is_loaded_lazily_and_appended(repo):
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    book = repo.get_book_by_id(book_id)
+    assert isinstance(book.checkout_history, LazyHistory)
+    assert not book.checkout_history.loaded
+
+    book.check_out(user_email="a@example.com")
+    repo.update_book(book_id, book.to_dict())
+    assert not book.checkout_history.loaded
+    repo.append_checkout_history(book_id, entry("note"))
+    book = repo.get_book_by_id(book_id)
+    book.check_in(user_email="a@example.com")
+    repo.update_books({book_id: book.to_dict()})
+
+    stored = repo.get_book_by_id(book_id).checkout_history
+    assert [e["action"] for e in stored] == ["checkout", "note", "checkin"]
+    assert [e["action"] for e in repo.get_history(book_id, 1, 5)] == [
+        "note",
+        "checkin",
+    ]
+    assert [e["book_id"] for e in repo.get_user_history("a@example.com")] == [
+        book_id
+    ] * 3
+
+
+def test_catalog_file_carries_no_history(tmp_path):
+    catalog = tmp_path / "books.json"
+    repo = BookRepository(str(catalog), history_path=str(tmp_path / "h.jsonl"))
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    repo.append_checkout_history(book_id, entry("checkout"))
+
+    records = json.loads(catalog.read_text())
+    assert "checkout_history" not in records[0]
+    assert len(repo.get_history(book_id)) == 1
+
+
+def test_shortened_history_is_rejected(tmp_path):
+    repo = BookRepository(str(tmp_path / "books.json"), str(tmp_path / "h.jsonl"))
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    repo.append_checkout_history(book_id, entry("checkout"))
+    with pytest.raises(ValueError):
+        repo.update_book(book_id, {"checkout_history": []})
+
+
+@pytest.mark.parametrize("repo_cls", [BookRepository, CachedBookRepository])
+def test_failed_write_stores_no_history(tmp_path, repo_cls, monkeypatch):
+    repo = repo_cls(str(tmp_path / "books.json"), str(tmp_path / "h.jsonl"))
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+
+    def full_disk(data):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(repo, "_write_file", full_disk)
+    with pytest.raises(OSError):
+        repo.mutate(book_id, lambda book: book.check_out(user_email="a@example.com"))
+    monkeypatch.undo()
+    assert repo.get_book_by_id(book_id).available is True
+    assert repo.get_history(book_id) == []
+
+    # the retry stores its entry exactly once
+    repo.mutate(book_id, lambda book: book.check_out(user_email="a@example.com"))
+    assert len(repo.get_history(book_id)) == 1
+
+
+@pytest.mark.parametrize(
+    "repo_cls", [BookRepository, CachedBookRepository, JournaledBookRepository]
+)
+def test_migration_moves_inline_history_once(tmp_path, repo_cls):
+    catalog = str(tmp_path / "books.json")
+    legacy = BookRepository(catalog)
+    book_id = legacy.add_book(Book(title="Dune", author="Herbert"))
+    legacy.append_checkout_history(book_id, entry("checkout"))
+    legacy.append_checkout_history(book_id, entry("checkin"))
+
+    repo = repo_cls(catalog, history_path=str(tmp_path / "h.jsonl"))
+    assert repo.migrate_checkout_history() == 2
+    assert repo.migrate_checkout_history() == 0
+    if hasattr(repo, "close"):
+        repo.close()
+
+    assert BookRepository(catalog).get_history(book_id) == []
+    fresh = repo_cls(catalog, history_path=str(tmp_path / "h.jsonl"))
+    assert [e["action"] for e in fresh.get_history(book_id)] == ["checkout", "checkin"]
+
+
+def test_migration_resumes_a_partial_move(tmp_path):
+    catalog = str(tmp_path / "books.json")
+    legacy = BookRepository(catalog)
+    book_id = legacy.add_book(Book(title="Dune", author="Herbert"))
+    for action in ("u0", "u1", "u2"):
+        legacy.append_checkout_history(book_id, entry(action))
+
+    # a crashed migration that got one entry into the store
+    repo = BookRepository(catalog, history_path=str(tmp_path / "h.jsonl"))
+    repo.history.append(book_id, entry("u0"))
+    assert repo.migrate_checkout_history() == 2
+    assert [e["action"] for e in repo.get_history(book_id)] == ["u0", "u1", "u2"]
@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.journaled_book_repository import JournaledBookRepository
+
+
+@pytest.fixture()
+def path(tmp_path):
+    return str(tmp_path / "books.json")
+
+
+def test_mutations_append_to_journal_not_snapshot(path):
+    repo = JournaledBookRepository(path, compact_threshold=None)
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    repo.append_checkout_history(book_id, {"action": "checkout"})
+    repo.close()
+
+    assert not os.path.exists(path)
+    with open(repo.journal_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+
+
+def test_reload_replays_journal_over_snapshot(path):
+    repo = JournaledBookRepository(path, compact_threshold=None)
+    a = repo.add_book(Book(title="Dune", author="Herbert"))
+    b = repo.add_book(Book(title="Emma", author="Austen"))
+    repo.compact()
+    repo.update_book(a, {"title": "Dune Messiah"})
+    repo.delete_book(b)
+    repo.append_checkout_history(a, {"action": "checkout"})
+    repo.close()
+
+    reopened = JournaledBookRepository(path)
+    books = reopened.get_all_books()
+    assert [x.title for x in books] == ["Dune Messiah"]
+    assert books[0].checkout_history == [{"action": "checkout"}]
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_compaction_folds_journal_into_snapshot(path, background):
+    repo = JournaledBookRepository(path, compact_threshold=None)
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    repo.compact(background=background)
+    repo.update_book(book_id, {"title": "Children of Dune"})
+    repo.close()
+
+    assert [x.title for x in BookRepository(path).get_all_books()] == ["Dune"]
+    assert not os.path.exists(repo.journal_path + ".compacting")
+    reopened = JournaledBookRepository(path)
+    assert reopened.get_book_by_id(book_id).title == "Children of Dune"
+
+
+def test_compacts_automatically_at_threshold(path):
+    repo = JournaledBookRepository(path, compact_threshold=3)
+    for i in range(3):
+        repo.add_book(Book(title=f"Book {i}", author="A"))
+    repo.close()
+
+    assert len(BookRepository(path).get_all_books()) == 3
+    assert not os.path.exists(repo.journal_path)
+
+
+def test_torn_journal_tail_is_discarded(path):
+    repo = JournaledBookRepository(path, compact_threshold=None)
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    repo.close()
+    with open(repo.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "delete", "book_')
+
+    reopened = JournaledBookRepository(path, compact_threshold=None)
+    assert reopened.get_book_by_id(book_id) is not None
+    reopened.update_book(book_id, {"title": "Dune 2"})
+    reopened.close()
+
+    with open(repo.journal_path, encoding="utf-8") as f:
+        ops = [json.loads(line) for line in f]
+    assert [op["op"] for op in ops] == ["add", "update"]
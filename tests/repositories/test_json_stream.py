@@ -0,0 +1,77 @@
+import io
+import json
+
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.json_stream import iter_json_array
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1 << 16])
+@pytest.mark.parametrize(
+    "value",
+    [
+        [],
+        [{"a": 1}],
+        [{"title": "x, y]", "n": [1, 2, {"k": None}]}, 12345, -0.5e3, "s", True],
+    ],
+)
+def test_matches_json_load(value, chunk_size):
+    for text in (json.dumps(value), json.dumps(value, indent=2)):
+        f = io.StringIO(text)
+        assert list(iter_json_array(f, chunk_size=chunk_size)) == value
+
+
+@pytest.mark.parametrize("text", ["", "{}", "[1, 2", "[1 2]", '[{"a": ]'])
+def test_malformed_input_raises(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO(text), chunk_size=2))
+
+
+def test_repository_iter_books_streams_file(tmp_path):
+    repo = BookRepository(str(tmp_path / "books.json"))
+    books = [Book(title=f"Book {i}", author="A") for i in range(5)]
+    repo.add_books(books)
+
+    it = repo.iter_books()
+    assert next(it) == books[0]
+    assert list(it) == books[1:]
+    assert [b.title for b in repo.find_book_by_name("book 3")] == ["Book 3"]
+
+
+def test_repository_iter_books_missing_or_corrupt_file(tmp_path):
+    path = tmp_path / "books.json"
+    repo = BookRepository(str(path))
+    assert list(repo.iter_books()) == []
+    path.write_text("[{", encoding="utf-8")
+    assert list(repo.iter_books()) == []
+
+
+class CountingReader(io.StringIO):
+    def __init__(self, text):
+        super().__init__(text)
+        self.chars_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.chars_read += len(chunk)
+        return chunk
+
+
+@pytest.mark.parametrize("bad", ['{"a": ]', '{"a": 1 "b": 2}', "[1, 2}"])
+def test_malformed_element_fails_without_reading_the_rest(bad):
+    text = "[" + '{"a": 1}, ' * 10 + bad + ', {"b": 2}' * 100_000 + "]"
+    f = CountingReader(text)
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(f, chunk_size=64))
+    assert f.chars_read < 1000
+
+
+def test_element_longer_than_max_element_raises():
+    f = CountingReader('["' + "x" * 100_000 + '"]')
+    with pytest.raises(json.JSONDecodeError, match="longer than"):
+        list(iter_json_array(f, chunk_size=64, max_element=1000))
+    assert f.chars_read < 2000
+    f = io.StringIO('["' + "x" * 5000 + '", 1.5e-3]')
+    assert list(iter_json_array(f, chunk_size=7)) == ["x" * 5000, 1.5e-3]
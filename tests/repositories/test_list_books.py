@@ -0,0 +1,78 @@
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_query import encode_cursor
+from src.services.book_service import BookService
+from tests.repositories.test_find_books import catalog, repo  # noqa: F401
+
+
+def expected(books, order_by):
+    field = (order_by or "book_id").lstrip("-")
+    present = [b for b in books if getattr(b, field) is not None]
+    present.sort(key=lambda b: b.book_id)
+    present.sort(key=lambda b: getattr(b, field), reverse=order_by.startswith("-"))
+    missing = sorted(
+        (b for b in books if getattr(b, field) is None), key=lambda b: b.book_id
+    )
+    return [b.book_id for b in present + missing]
+
+
+def walk(svc, order_by, limit):
+    seen, after = [], None
+    while True:
+        page = svc.list_books(after=after, limit=limit, order_by=order_by)
+        assert len(page["books"]) <= limit
+        seen += [b.book_id for b in page["books"]]
+        after = page["next"]
+        if after is None:
+            return seen
+
+
+@pytest.mark.parametrize(
+    "order_by",
+    ["book_id", "-book_id", "price_usd", "-publication_year", "genre", "-available"],
+)
+def test_pages_cover_catalog_in_order(repo, order_by):
+    books = repo.get_all_books()
+    assert walk(BookService(repo), order_by, 17) == expected(books, order_by)
+
+
+def test_pages_stay_stable_across_writes(repo):
+    svc = BookService(repo)
+    first = svc.list_books(limit=50, order_by="price_usd")
+    seen = [b.book_id for b in first["books"]]
+    # delete something already shown and something still to come, add a new book
+    repo.delete_book(seen[0])
+    later = repo.list_books(after=first["next"], limit=5, order_by="price_usd")[-1]
+    repo.delete_book(later.book_id)
+    repo.add_book(Book(title="New", author="A", price_usd=0.5))
+
+    rest = walk_from(svc, first["next"], "price_usd")
+    assert not set(seen) & set(rest)
+    assert later.book_id not in rest
+    # the new book sorts before the cursor; seen[0] was shown before it went
+    assert len(seen) + len(rest) == len(repo.get_all_books())
+
+
+def walk_from(svc, after, order_by):
+    seen = []
+    while after is not None:
+        page = svc.list_books(after=after, limit=40, order_by=order_by)
+        seen += [b.book_id for b in page["books"]]
+        after = page["next"]
+    return seen
+
+
+def test_cursor_validation(repo):
+    cursor = encode_cursor("price_usd", {"price_usd": 3.0, "book_id": "x"})
+    with pytest.raises(ValueError, match="different order_by"):
+        repo.list_books(after=cursor, order_by="-price_usd")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        repo.list_books(after="not a cursor", order_by="price_usd")
+    with pytest.raises(ValueError, match="Cannot order by"):
+        repo.list_books(order_by="colour")
+
+
+def test_service_rejects_bad_limit(repo):
+    with pytest.raises(ValueError):
+        BookService(repo).list_books(limit=0)
@@ -0,0 +1,114 @@
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.book_repository_protocol import VersionConflictError
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.journaled_book_repository import JournaledBookRepository
+from src.repositories.sqlite_book_repository import SqliteBookRepository
+
+
+@pytest.fixture(params=["json", "cached", "journaled", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "sqlite":
+        repo = SqliteBookRepository(str(tmp_path / "books.db"))
+    else:
+        cls = {
+            "json": BookRepository,
+            "cached": CachedBookRepository,
+            "journaled": JournaledBookRepository,
+        }[request.param]
+        repo = cls(str(tmp_path / "books.json"))
+    yield repo
+    if hasattr(repo, "close"):
+        repo.close()
+
+
+def test_every_write_bumps_the_version(repo):
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    assert repo.get_book_by_id(book_id).version == 0
+    assert repo.update_book(book_id, {"title": "Dune", "version": 40}).version == 1
+    assert repo.update_books({book_id: {"price_usd": 9.5}})[0].version == 2
+    assert repo.get_book_by_id(book_id).version == 2
+
+
+def test_compare_and_swap_rejects_stale_versions(repo):
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    assert repo.compare_and_swap(book_id, 0, {"title": "Dune II"}).version == 1
+    with pytest.raises(VersionConflictError) as err:
+        repo.compare_and_swap(book_id, 0, {"title": "Lost"})
+    assert (err.value.expected, err.value.actual) == (0, 1)
+    assert repo.get_book_by_id(book_id).title == "Dune II"
+    assert repo.compare_and_swap("missing", 0, {"title": "x"}) is None
+
+
+def test_mutate_writes_once_and_skips_on_error(repo):
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    book = repo.mutate(book_id, lambda b: b.check_out(user_email="a@example.com"))
+    assert book.version == 1 and book.available is False
+
+    with pytest.raises(Exception, match="already checked out"):
+        repo.mutate(book_id, lambda b: b.check_out())
+    stored = repo.get_book_by_id(book_id)
+    assert stored.version == 1
+    assert [e["action"] for e in stored.checkout_history] == ["checkout"]
+    assert repo.mutate("missing", lambda b: None) is None
+
+
+def test_sqlite_mutate_retries_after_a_concurrent_write(tmp_path):
+    path = str(tmp_path / "books.db")
+    repo = SqliteBookRepository(path)
+    other = SqliteBookRepository(path)
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    calls = []
+
+    def rename(book):
+        if not calls:
+            # another connection wins the race on the first attempt
+            other.update_book(book_id, {"price_usd": 9.5})
+        calls.append(book.version)
+        book.title = "Dune II"
+
+    book = repo.mutate(book_id, rename)
+    assert calls == [0, 1]
+    assert (book.title, book.price_usd, book.version) == ("Dune II", 9.5, 2)
+    other.close()
+    repo.close()
+
+
+def test_sqlite_adds_version_column_to_old_databases(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "books.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE books (book_id TEXT PRIMARY KEY, title TEXT NOT NULL, "
+        "author TEXT NOT NULL, genre TEXT, publication_year INTEGER, "
+        "page_count INTEGER, average_rating REAL, ratings_count INTEGER, "
+        "price_usd REAL, publisher TEXT, language TEXT, format TEXT, "
+        "in_print INTEGER, sales_millions REAL, last_checkout TEXT, "
+        "available INTEGER NOT NULL DEFAULT 1, checked_out_by TEXT)"
+    )
+    conn.execute("INSERT INTO books (book_id, title, author) VALUES ('1', 'D', 'H')")
+    conn.commit()
+    conn.close()
+
+    repo = SqliteBookRepository(path)
+    assert repo.mutate("1", lambda b: None).version == 1
+    repo.close()
+
+
+def test_compare_and_swap_books_checks_each_book(repo):
+    a = repo.add_book(Book(title="A", author="X"))
+    b = repo.add_book(Book(title="B", author="X"))
+    repo.update_book(b, {"title": "B2"})
+
+    swapped = repo.compare_and_swap_books(
+        {a: (0, {"title": "A2"}), b: (0, {"title": "Lost"}), "nope": (0, {})}
+    )
+
+    assert swapped[0].title == "A2" and swapped[0].version == 1
+    assert isinstance(swapped[1], VersionConflictError)
+    assert swapped[1].actual == 1
+    assert swapped[2] is None
+    assert repo.get_book_by_id(b).title == "B2"
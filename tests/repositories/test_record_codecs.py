@@ -0,0 +1,99 @@
+import io
+import os
+
+import pytest
+
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.journaled_book_repository import JournaledBookRepository
+from src.repositories.record_codecs import (
+    CodecError,
+    RecordCodec,
+    available_codecs,
+    decode_any,
+    detect,
+    get_codec,
+    iter_file,
+)
+from tests.repositories.test_find_books import catalog
+
+RECORDS = [
+    {"book_id": "a", "title": "Ünïcode ✓", "price_usd": 9.5, "genre": None},
+    {"book_id": "b", "title": "Short", "available": False, "tags": [1, {"x": 2}]},
+    {"book_id": "c"},
+]
+
+
+@pytest.mark.parametrize("name", available_codecs())
+def test_round_trip_and_detection(name):
+    codec = get_codec(name)
+    data = codec.encode(RECORDS)
+    assert codec.decode(data) == RECORDS
+    assert decode_any(data) == RECORDS
+    assert list(iter_file(io.BytesIO(data))) == RECORDS
+    detected = detect(io.BytesIO(data))
+    assert detected.compression == codec.compression
+    # both JSON array codecs are read by the same decoder
+    assert detected.format.name == codec.format.name.replace("json-compact", "json")
+
+
+def test_rows_streams_across_frames(monkeypatch):
+    monkeypatch.setattr("src.repositories.record_codecs.ROWS_PER_FRAME", 7)
+    records = [b.to_dict() for b in catalog(50)]
+    data = get_codec("rows").encode(records)
+    assert list(iter_file(io.BytesIO(data))) == records
+
+
+def test_compact_codecs_are_smaller():
+    records = [b.to_dict() for b in catalog(200)]
+    size = {name: len(get_codec(name).encode(records)) for name in available_codecs()}
+    assert size["json-compact"] < size["json"]
+    assert size["rows"] < size["json-compact"]
+    assert size["json+gzip"] < size["json-compact"]
+
+
+@pytest.mark.parametrize(
+    "data", [b"", b"   ", b"\x00BKROWS\x05\x00", b"\x1f\x8bnot gzip", b'[{"a": 1}']
+)
+def test_corrupt_data_raises_codec_error(data):
+    with pytest.raises(CodecError):
+        decode_any(data)
+
+
+def test_unknown_codec_names():
+    with pytest.raises(ValueError):
+        get_codec("xml")
+    with pytest.raises(ValueError):
+        get_codec("json+snappy")
+    assert isinstance(get_codec("jsonl+bz2"), RecordCodec)
+
+
+@pytest.mark.parametrize(
+    "cls", [BookRepository, CachedBookRepository, JournaledBookRepository]
+)
+def test_repository_writes_configured_codec_and_reads_any(tmp_path, cls):
+    path = str(tmp_path / "books.json")
+    books = catalog(40)
+    BookRepository(path).add_books(books)  # indented JSON, as before
+
+    repo = cls(path, codec="rows+gzip")
+    assert len(repo.get_all_books()) == 40
+    repo.update_book(books[0].book_id, {"title": "Renamed"})
+    if hasattr(repo, "compact"):
+        repo.compact()
+    with open(path, "rb") as f:
+        assert detect(f).name == "rows+gzip"
+
+    reader = BookRepository(path)
+    assert reader.get_book_by_id(books[0].book_id).title == "Renamed"
+    assert [r["book_id"] for r in reader.iter_records()] == [b.book_id for b in books]
+    assert len(reader.find_books({}, "-price_usd", 5)) == 5
+
+
+def test_malformed_file_reads_as_empty(tmp_path):
+    path = tmp_path / "books.json"
+    path.write_bytes(b"\x00BKROWS garbage")
+    repo = BookRepository(str(path))
+    assert repo.get_all_books() == []
+    assert list(repo.iter_records()) == []
+    assert os.path.exists(path)
@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository_protocol import VersionConflictError
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.sharded_book_repository import ShardedBookRepository, shard_of
+from src.services.book_service import BookService
+from tests.repositories.test_find_books import QUERIES, catalog, expected
+
+
+@pytest.fixture(params=[None, CachedBookRepository])
+def sharded(request, tmp_path):
+    kwargs = {} if request.param is None else {"repository_class": request.param}
+    repo = ShardedBookRepository(str(tmp_path / "shards"), shards=4, **kwargs)
+    books = catalog(200)
+    repo.add_books(books)
+    return repo, books
+
+
+def test_each_book_lives_in_its_hash_shard(sharded):
+    repo, books = sharded
+    for n, path in enumerate(repo.shard_paths):
+        with open(path) as f:
+            ids = [item["book_id"] for item in json.load(f)]
+        assert ids and all(shard_of(book_id, 4) == n for book_id in ids)
+    assert sorted(b.book_id for b in repo.iter_books()) == sorted(
+        b.book_id for b in books
+    )
+
+
+def test_point_and_batch_operations_route(sharded):
+    repo, books = sharded
+    a, b = books[0].book_id, books[1].book_id
+    assert repo.get_book_by_id(a).title == books[0].title
+    assert [
+        x and x.title
+        for x in repo.update_books({b: {"title": "B"}, "nope": {}, a: {"title": "A"}})
+    ] == ["B", None, "A"]
+    with pytest.raises(VersionConflictError):
+        repo.compare_and_swap(a, 0, {"title": "stale"})
+    assert repo.mutate(a, lambda book: setattr(book, "genre", "Horror")).version == 2
+    assert repo.delete_books([a, "nope", a, b]) == [True, False, False, True]
+    assert repo.get_book_by_id(a) is None
+    assert len(repo.get_all_books()) == len(books) - 2
+
+
+@pytest.mark.parametrize("filters,sort", QUERIES)
+def test_find_books_merges_shards(sharded, filters, sort):
+    repo, books = sharded
+    got = [b.book_id for b in repo.find_books(filters, sort, 7)]
+    want = expected(books, filters, sort, 7)
+    if sort is None:
+        # unsorted results come in shard order rather than insertion order
+        assert len(got) == len(want)
+        assert set(got) <= set(expected(books, filters, None, None))
+    else:
+        field = sort.lstrip("-")
+        by_id = {b.book_id: getattr(b, field) for b in books}
+        assert [by_id[i] for i in got] == [by_id[i] for i in want]
+
+
+def test_list_books_pages_across_shards(sharded):
+    repo, books = sharded
+    svc = BookService(repo)
+    seen, after = [], None
+    while True:
+        page = svc.list_books(after=after, limit=15, order_by="-price_usd")
+        seen += page["books"]
+        after = page["next"]
+        if after is None:
+            break
+    assert sorted(b.book_id for b in seen) == sorted(b.book_id for b in books)
+    prices = [b.price_usd for b in seen if b.price_usd is not None]
+    assert prices == sorted(prices, reverse=True)
+    assert all(b.price_usd is None for b in seen[len(prices) :])
+
+
+def test_search_by_name_ranks_across_shards(sharded):
+    repo, _ = sharded
+    found = repo.search_by_name("book 1", limit=5)
+    assert found[0].title == "Book 1"
+    assert all("book 1" in b.title.lower() for b in found)
+
+
+def test_shard_count_is_fixed_per_directory(tmp_path):
+    ShardedBookRepository(str(tmp_path), shards=4)
+    with pytest.raises(ValueError, match="holds 4 shards"):
+        ShardedBookRepository(str(tmp_path), shards=8)
+
+
+def test_shared_history_store(tmp_path):
+    repo = ShardedBookRepository(str(tmp_path), shards=4, history=True)
+    books = [Book(title=f"B{i}", author="A") for i in range(12)]
+    repo.add_books(books)
+    for book in books:
+        repo.append_checkout_history(book.book_id, {"user_email": "u@x.org"})
+    assert os.path.exists(tmp_path / "history.jsonl")
+    assert len(repo.get_user_history("u@x.org")) == 12
+    assert len(repo.get_user_history("u@x.org", offset=10, limit=5)) == 2
+    assert repo.get_history(books[3].book_id) == [{"user_email": "u@x.org"}]
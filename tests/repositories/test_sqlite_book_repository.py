@@ -0,0 +1,68 @@
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.sqlite_book_repository import SqliteBookRepository
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    repo = SqliteBookRepository(str(tmp_path / "books.db"))
+    yield repo
+    repo.close()
+
+
+def test_crud_round_trip(repo):
+    book = Book(title="Dune", author="Herbert", genre="Sci-Fi", in_print=True)
+    book_id = repo.add_book(book)
+
+    fetched = repo.get_book_by_id(book_id)
+    assert fetched == book
+
+    updated = repo.update_book(book_id, {"title": "Dune Messiah", "available": False})
+    assert updated.title == "Dune Messiah"
+    assert updated.available is False
+
+    assert repo.delete_book(book_id) is True
+    assert repo.delete_book(book_id) is False
+    assert repo.get_book_by_id(book_id) is None
+
+
+def test_history_lives_in_child_table(repo):
+    book = Book(title="Dune", author="Herbert")
+    repo.add_book(book)
+    book.check_out(user_email="a@example.com", due_date="2026-12-31")
+    repo.update_book(book.book_id, book.to_dict())
+    repo.append_checkout_history(book.book_id, {"action": "checkin"})
+
+    history = repo.get_book_by_id(book.book_id).checkout_history
+    assert [h["action"] for h in history] == ["checkout", "checkin"]
+    assert history[0]["due_date"] == "2026-12-31"
+
+    repo.delete_book(book.book_id)
+    count = repo.conn.execute("SELECT COUNT(*) FROM checkout_history").fetchone()[0]
+    assert count == 0
+
+
+def test_find_book_by_name_is_case_insensitive_substring(repo):
+    repo.add_book(Book(title="The Hobbit", author="Tolkien"))
+    repo.add_book(Book(title="Emma", author="Austen"))
+
+    assert [b.title for b in repo.find_book_by_name("HOB")] == ["The Hobbit"]
+    assert repo.find_book_by_name(3) == []
+
+
+def test_update_rejects_unknown_fields(repo):
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    with pytest.raises(ValueError, match="Unknown book field"):
+        repo.update_book(book_id, {"colour": "red"})
+
+
+def test_import_json(repo, tmp_path):
+    json_repo = BookRepository(str(tmp_path / "books.json"))
+    books = [Book(title=f"Book {i}", author="A") for i in range(3)]
+    for book in books:
+        json_repo.add_book(book)
+
+    assert repo.import_json(json_repo.filepath) == 3
+    assert repo.get_all_books() == books
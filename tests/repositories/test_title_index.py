@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.repositories.sqlite_book_repository import SqliteBookRepository
+from src.repositories.title_index import TrigramIndex
+
+TITLES = ["The Hobbit", "Hobbit Tales", "hobbit", "Emma", "Dune", "Dune Messiah", ""]
+
+
+def test_index_matches_substring_scan():
+    rng = random.Random(7)
+    words = ["ab", "abc", "bca", "The", "Dune", "ü", "x"]
+    texts = {str(i): " ".join(rng.choices(words, k=3)) for i in range(200)}
+    index = TrigramIndex()
+    index.rebuild(texts.items())
+    index.remove("0")
+    del texts["0"]
+
+    for query in ["", "a", "ab", "abc", "CA B", "dune x", "zzz", "Ü"]:
+        expected = {k for k, t in texts.items() if query.lower() in t.lower()}
+        assert set(index.search(query)) == expected
+
+
+@pytest.fixture(params=["json", "cached", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "json":
+        repo = BookRepository(str(tmp_path / "books.json"))
+    elif request.param == "cached":
+        repo = CachedBookRepository(str(tmp_path / "books.json"))
+    else:
+        repo = SqliteBookRepository(str(tmp_path / "books.db"))
+    for title in TITLES:
+        repo.add_book(Book(title=title, author="A"))
+    return repo
+
+
+def test_find_book_by_name_keeps_catalog_order(repo):
+    assert [b.title for b in repo.find_book_by_name("hobbit")] == TITLES[:3]
+    assert [b.title for b in repo.find_book_by_name("")] == TITLES[:-1]
+
+
+def test_search_by_name_ranks_and_limits(repo):
+    assert [b.title for b in repo.search_by_name("hobbit", limit=2)] == [
+        "hobbit",
+        "Hobbit Tales",
+    ]
+    assert [b.title for b in repo.search_by_name("dune")] == ["Dune", "Dune Messiah"]
+
+
+def test_cached_index_follows_writes(tmp_path):
+    repo = CachedBookRepository(str(tmp_path / "books.json"))
+    book_id = repo.add_book(Book(title="Dune", author="Herbert"))
+    repo.update_book(book_id, {"title": "Emma"})
+    assert repo.find_book_by_name("dune") == []
+    assert [b.book_id for b in repo.find_book_by_name("emm")] == [book_id]
+    repo.delete_book(book_id)
+    assert repo.find_book_by_name("emm") == []
@@ -0,0 +1,99 @@
+import dataclasses
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from src.domain.book import Book
+from src.repositories.columnar_snapshot import ColumnarSnapshot
+from src.services.book_analytics_service import BookAnalyticsService
+
+
+def make_books():
+    return [
+        Book(
+            title=f"Book {i}",
+            author="A",
+            genre=["Mystery", "Fantasy"][i % 2],
+            average_rating=1 + i % 4,
+            ratings_count=100 * i,
+            price_usd=10.0 + i,
+        )
+        for i in range(20)
+    ]
+
+
+def test_frame_is_built_once_per_catalog_version():
+    svc = BookAnalyticsService()
+    books = make_books()
+
+    svc.average_price(books)
+    svc.top_rated(books, min_ratings=0)
+    svc.value_scores(iter(books))
+    svc.bayesian_weighted_by_genre(books)
+    assert svc.cache_info()["misses"] == 1
+    assert svc.cache_info()["hits"] == 3
+
+    books[0].price_usd = 99.0
+    assert svc.average_price(books) == pytest.approx(
+        sum(b.price_usd for b in books) / len(books)
+    )
+    assert svc.cache_info()["misses"] == 2
+
+
+def test_lru_eviction():
+    svc = BookAnalyticsService(cache_size=1)
+    a, b = make_books(), make_books()
+    svc.average_price(a)
+    svc.average_price(b)
+    svc.average_price(a)
+    assert svc.cache_info() == {"hits": 0, "misses": 3, "size": 1, "max_size": 1}
+
+
+def test_snapshot_frames_widen_to_cover_later_calls():
+    svc = BookAnalyticsService()
+    snap = ColumnarSnapshot.from_records(b.to_dict() for b in make_books())
+
+    svc.average_price(snap)
+    svc.bayesian_weighted_by_genre(snap)
+    svc.average_price(snap)
+    assert svc.cache_info()["misses"] == 2
+    assert svc.cache_info()["hits"] == 1
+    assert svc.cache_info()["size"] == 1
+
+
+def test_cached_frame_is_not_mutated_by_methods():
+    svc = BookAnalyticsService()
+    books = make_books()
+    before = svc.cleaned_frame(books).copy()
+    svc.value_scores(books)
+    svc.top_rated(books, min_ratings=0)
+    assert svc.cleaned_frame(books).equals(before)
+
+
+def test_history_change_is_not_served_stale():
+    svc = BookAnalyticsService()
+    books = make_books()
+    svc.top_rated(books, min_ratings=0, limit=20)
+
+    # as re-read from a repository: new Books, only the history differs
+    books = list(books)
+    books[3] = dataclasses.replace(
+        books[3], checkout_history=[{"action": "checkout", "user_email": "a@x"}]
+    )
+    top = {r["book_id"]: r for r in svc.top_rated(books, min_ratings=0, limit=20)}
+    assert top[books[3].book_id]["checkout_history"] == books[3].checkout_history
+    assert svc.cache_info()["hits"] == 1
+
+
+def test_unhashable_field_values_are_fingerprinted():
+    svc = BookAnalyticsService()
+    books = make_books()
+    books[0].genre = ["Mystery", "Fantasy"]
+    svc.average_price(books)
+    svc.average_price(books)
+    assert svc.cache_info()["hits"] == 1
+
+    books[0].genre = ["Mystery"]
+    svc.average_price(books)
+    assert svc.cache_info()["misses"] == 2
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("matplotlib")
+
+from src.domain.book import Book
+from src.services.book_analytics_service import CHARTS, BookAnalyticsService
+
+
+def make_books():
+    return [
+        Book(
+            title=f"Book {i}",
+            author="A",
+            genre=["Mystery", "Fantasy", "Horror"][i % 3],
+            publication_year=1990 + i % 7,
+            average_rating=1 + i % 4,
+            ratings_count=100 * i,
+            price_usd=10.0 + i,
+            available=i % 5 != 0,
+        )
+        for i in range(30)
+    ]
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_render_report_writes_every_chart(tmp_path, parallel):
+    svc = BookAnalyticsService()
+    report = svc.render_report(make_books(), str(tmp_path), parallel=parallel)
+
+    assert set(report["paths"]) == set(CHARTS)
+    for name, path in report["paths"].items():
+        assert path == os.path.join(str(tmp_path), CHARTS[name][0])
+        assert os.path.getsize(path) > 0
+    assert set(report["timings"]) == set(CHARTS) | {"aggregate", "total"}
+    assert report["timings"]["total"] >= report["timings"]["aggregate"]
+
+
+def test_render_report_builds_frame_once(tmp_path):
+    svc = BookAnalyticsService()
+    svc.render_report(make_books(), str(tmp_path), parallel=False)
+    assert svc.cache_info()["misses"] == 1
+
+
+def test_chart_methods_still_write_their_file(tmp_path):
+    svc = BookAnalyticsService()
+    out = svc.genre_rating_chart(make_books(), str(tmp_path / "ratings.png"))
+    assert os.path.getsize(out) > 0
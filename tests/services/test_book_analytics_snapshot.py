@@ -0,0 +1,100 @@
+import math
+import os
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.columnar_snapshot import ColumnarSnapshot
+from src.services.book_analytics_service import BookAnalyticsService
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    repo = BookRepository(str(tmp_path / "books.json"))
+    genres = ["Mystery", "Fantasy", None]
+    repo.add_books(
+        [
+            Book(
+                title=f"Book {i}",
+                author=f"Author {i % 4}",
+                genre=genres[i % 3],
+                publication_year=1990 + i % 7,
+                average_rating=1 + (i * 7 % 40) / 10,
+                ratings_count=i * 37 % 2000,
+                price_usd=None if i % 5 == 0 else 5 + i % 30,
+                available=i % 2 == 0,
+            )
+            for i in range(60)
+        ]
+    )
+    return repo
+
+
+def test_snapshot_matches_book_path(repo):
+    svc = BookAnalyticsService()
+    books = repo.get_all_books()
+    snap = ColumnarSnapshot.from_repository(repo)
+
+    assert len(snap) == 60
+    assert math.isclose(svc.average_price(snap), svc.average_price(books))
+    assert svc.value_scores(snap) == pytest.approx(svc.value_scores(books))
+    assert [r["book_id"] for r in svc.top_rated(snap, min_ratings=500)] == [
+        r["book_id"] for r in svc.top_rated(books, min_ratings=500)
+    ]
+    by_genre = svc.bayesian_weighted_by_genre(snap)
+    expected = svc.bayesian_weighted_by_genre(books)
+    assert list(by_genre["genre"].astype(str)) == list(expected["genre"])
+    assert list(by_genre["weighted_rating"]) == pytest.approx(
+        list(expected["weighted_rating"])
+    )
+
+
+def test_snapshot_is_saved_and_rebuilt_when_stale(repo):
+    path = ColumnarSnapshot.path_for(repo.filepath)
+    first = ColumnarSnapshot.for_repository(repo)
+    loaded = ColumnarSnapshot.for_repository(repo)
+    assert loaded.signature == first.signature
+    assert list(loaded.column("book_id")) == list(first.column("book_id"))
+
+    repo.add_book(Book(title="New", author="A", price_usd=1.0))
+    rebuilt = ColumnarSnapshot.for_repository(repo)
+    assert len(rebuilt) == 61
+    assert ColumnarSnapshot.load(path).signature == rebuilt.signature
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_snapshot_files_are_closed(repo, monkeypatch):
+    def open_files():
+        return len(os.listdir("/proc/self/fd"))
+
+    # keep every loaded snapshot alive, so only close() can free its file
+    loaded = []
+    load = ColumnarSnapshot.load.__func__
+
+    def tracking_load(cls, path):
+        loaded.append(load(cls, path))
+        return loaded[-1]
+
+    monkeypatch.setattr(ColumnarSnapshot, "load", classmethod(tracking_load))
+    ColumnarSnapshot.for_repository(repo)
+    before = open_files()
+    for i in range(5):
+        # each call finds the saved snapshot stale and rebuilds it
+        repo.add_book(Book(title=f"New {i}", author="A"))
+        ColumnarSnapshot.for_repository(repo)
+    with ColumnarSnapshot.for_repository(repo) as snap:
+        book_ids = snap.column("book_id")
+        assert open_files() == before + 1
+    assert len(loaded) == 6
+    assert len(book_ids) == 65
+    assert open_files() == before
+
+
+def test_charts_accept_snapshot(repo, tmp_path):
+    svc = BookAnalyticsService()
+    snap = ColumnarSnapshot.from_repository(repo)
+    out = svc.pie_checked_in_vs_available(snap, str(tmp_path / "pie.png"))
+    assert (tmp_path / "pie.png").exists() and out.endswith("pie.png")
@@ -0,0 +1,136 @@
+import pytest
+
+from src.domain.book import Book
+import src.services.book_service as book_service
+from src.repositories.book_repository import BookRepository
+from src.repositories.cached_book_repository import CachedBookRepository
+from tests.mocks.mock_book_repository import MockBookRepo
+
+
+@pytest.fixture()
+def repo():
+    return MockBookRepo()
+
+
+@pytest.fixture()
+def svc(repo):
+    return book_service.BookService(repo)
+
+
+def test_add_books_reports_per_item_results(svc):
+    good = Book(title="Good", author="A")
+    bad = Book(title="", author="A")
+
+    results = svc.add_books([good, bad])
+
+    assert results == [
+        {"book_id": good.book_id, "ok": True, "error": None},
+        {
+            "book_id": bad.book_id,
+            "ok": False,
+            "error": "Book must have title and author",
+        },
+    ]
+    assert svc.get_book_by_id(good.book_id) is not None
+    assert svc.get_book_by_id(bad.book_id) is None
+
+
+def test_update_and_delete_books(repo, svc):
+    existing = repo.get_all_books()[0].book_id
+
+    updates = svc.update_books({existing: {"title": "New"}, "missing": {"title": "x"}})
+    assert [r["ok"] for r in updates] == [True, False]
+    assert updates[1]["error"] == "Book not found"
+    assert svc.get_book_by_id(existing).title == "New"
+
+    deletes = svc.delete_books([existing, existing])
+    assert [r["ok"] for r in deletes] == [True, False]
+
+
+def test_json_repository_bulk_ops_write_once(tmp_path, monkeypatch):
+    repo = BookRepository(str(tmp_path / "books.json"))
+    writes = []
+    original = repo._write_file
+    monkeypatch.setattr(repo, "_write_file", lambda d: writes.append(1) or original(d))
+    svc = book_service.BookService(repo)
+
+    books = [Book(title=f"Book {i}", author="A") for i in range(50)]
+    svc.add_books(books)
+    svc.update_books({b.book_id: {"genre": "Mystery"} for b in books})
+    svc.delete_books([b.book_id for b in books[:10]])
+
+    assert len(writes) == 3
+    remaining = svc.get_all_books()
+    assert len(remaining) == 40
+    assert {b.genre for b in remaining} == {"Mystery"}
+
+
+def test_circulate_books_applies_in_order_with_one_write(tmp_path):
+    repo = BookRepository(str(tmp_path / "books.json"))
+    svc = book_service.BookService(repo)
+    a, b = Book(title="A", author="X"), Book(title="B", author="Y")
+    svc.add_books([a, b])
+    writes = []
+    original = repo._write_file
+    repo._write_file = lambda data: writes.append(1) or original(data)
+
+    results = svc.circulate_books(
+        [
+            {"action": "check_out", "book_id": a.book_id, "user_email": "u@x"},
+            {"action": "check_out", "book_id": a.book_id, "user_email": "v@x"},
+            {"action": "check_in", "book_id": b.book_id},
+            {"action": "check_out", "book_id": "missing"},
+        ]
+    )
+
+    assert [r["ok"] for r in results] == [True, False, False, False]
+    assert results[1]["error"] == "Book is already checked out."
+    assert results[3]["error"] == "Book not found"
+    assert len(writes) == 1
+    stored = svc.get_book_by_id(a.book_id)
+    assert stored.available is False
+    assert stored.checked_out_by == "u@x"
+    assert len(stored.checkout_history) == 1
+
+
+def test_history_pages_through_repo(svc):
+    book = svc.get_all_books()[0]
+    for _ in range(3):
+        svc.check_out(book.book_id, user_email="a@example.com")
+        svc.check_in(book.book_id, user_email="a@example.com")
+
+    page = svc.get_history(book.book_id, offset=2, limit=3)
+    assert [e["action"] for e in page] == ["checkout", "checkin", "checkout"]
+    assert len(svc.get_user_history("a@example.com", limit=100)) == 6
+    with pytest.raises(ValueError):
+        svc.get_history(book.book_id, limit=0)
+
+
+def test_circulate_books_detects_a_concurrent_checkout(tmp_path):
+    path = str(tmp_path / "books.json")
+    mine, theirs = CachedBookRepository(path), CachedBookRepository(path)
+    book = Book(title="A", author="X")
+    mine.add_book(book)
+    svc = book_service.BookService(mine)
+    other = book_service.BookService(theirs)
+
+    # the other worker checks the book out between our read and our write
+    read = mine.get_book_by_id
+    raced = []
+
+    def racing_read(book_id):
+        found = read(book_id)
+        if not raced:
+            raced.append(other.check_out(book_id, user_email="them@x"))
+        return found
+
+    mine.get_book_by_id = racing_read
+    results = svc.circulate_books(
+        [{"action": "check_out", "book_id": book.book_id, "user_email": "me@x"}]
+    )
+
+    assert results[0]["ok"] is False
+    assert results[0]["error"] == "Book is already checked out."
+    stored = CachedBookRepository(path).get_book_by_id(book.book_id)
+    assert stored.checked_out_by == "them@x"
+    assert [e.get("user_email") for e in stored.checkout_history] == ["them@x"]
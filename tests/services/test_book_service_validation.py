@@ -18,3 +18,21 @@ def test_get_all_books_positive(svc):
 def test_find_book_name_negative(svc, bad_name):
     with pytest.raises(TypeError, match=r"Expected str, got"):
         svc.find_book_by_name(bad_name)
+
+
+@pytest.mark.parametrize(
+    "filters,sort,limit",
+    [
+        ({"colour": "red"}, None, None),
+        ("genre=Mystery", None, None),
+        ({}, "-colour", None),
+        ({}, None, 0),
+    ],
+)
+def test_find_books_rejects_bad_queries(svc, filters, sort, limit):
+    with pytest.raises(ValueError):
+        svc.find_books(filters, sort, limit)
+
+
+def test_find_books_delegates_to_repo(svc):
+    assert [b.title for b in svc.find_books({"author": "author"}, limit=1)] == ["test"]
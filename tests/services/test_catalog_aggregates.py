@@ -0,0 +1,73 @@
+import math
+import random
+
+import pytest
+
+from src.domain.book import Book
+import src.services.book_service as book_service
+from src.services.catalog_aggregates import CatalogAggregates
+from tests.mocks.mock_book_repository import MockBookRepo
+
+
+def random_book(rng, i):
+    return Book(
+        title=f"Book {i}",
+        author="A",
+        genre=rng.choice(["Mystery", "Fantasy", "History", None]),
+        average_rating=rng.choice([None, round(rng.uniform(1, 5), 2)]),
+        ratings_count=rng.choice([None, rng.randint(0, 5000)]),
+        price_usd=rng.choice([None, round(rng.uniform(5, 50), 2), "12.50"]),
+    )
+
+
+def test_service_writes_keep_aggregates_equal_to_rebuild():
+    rng = random.Random(3)
+    repo = MockBookRepo()
+    svc = book_service.BookService(
+        repo, aggregates=CatalogAggregates.from_books(repo.get_all_books())
+    )
+
+    ids = [svc.add_book(random_book(rng, i)) for i in range(40)]
+    svc.add_books([random_book(rng, i) for i in range(40, 60)])
+    for book_id in ids[:10]:
+        svc.update_book(book_id, {"price_usd": 20.0, "genre": "Mystery"})
+    svc.update_books({book_id: {"average_rating": 4.5} for book_id in ids[10:15]})
+    svc.delete_book(ids[20])
+    svc.delete_books(ids[21:25])
+
+    rebuilt = CatalogAggregates.from_books(repo.get_all_books())
+    assert len(svc.aggregates) == len(rebuilt) == 56
+    assert svc.aggregates.average_price() == pytest.approx(rebuilt.average_price())
+    live = svc.aggregates.bayesian_weighted_by_genre()
+    fresh = rebuilt.bayesian_weighted_by_genre()
+    assert [r["genre"] for r in live] == [r["genre"] for r in fresh]
+    for a, b in zip(live, fresh):
+        for key in ("mean_average_rating", "median_ratings_count", "weighted_rating"):
+            assert a[key] == pytest.approx(b[key], nan_ok=True)
+
+
+def test_removing_last_book_of_genre_drops_it():
+    agg = CatalogAggregates()
+    book = Book(title="Dune", author="H", genre="Sci-Fi", price_usd=10.0)
+    agg.add(book)
+    agg.remove(book.book_id)
+    assert agg.bayesian_weighted_by_genre() == []
+    assert math.isnan(agg.average_price())
+
+
+def test_matches_pandas_analytics():
+    pytest.importorskip("pandas")
+    from src.services.book_analytics_service import BookAnalyticsService
+
+    rng = random.Random(11)
+    books = [random_book(rng, i) for i in range(200)]
+    agg = CatalogAggregates.from_books(books)
+    analytics = BookAnalyticsService()
+
+    assert agg.average_price() == pytest.approx(analytics.average_price(books))
+    expected = analytics.bayesian_weighted_by_genre(books).to_dict(orient="records")
+    actual = agg.bayesian_weighted_by_genre()
+    assert [r["genre"] for r in actual] == [r["genre"] for r in expected]
+    for a, b in zip(actual, expected):
+        assert a["weighted_rating"] == pytest.approx(b["weighted_rating"])
+        assert a["median_ratings_count"] == pytest.approx(b["median_ratings_count"])
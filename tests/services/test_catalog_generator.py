@@ -0,0 +1,99 @@
+import json
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.columnar_snapshot import ColumnarSnapshot
+from src.services.book_generator_service import generate_books
+from src.services.catalog_generator import CatalogGenerator
+
+NOW = datetime(2026, 1, 1)
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_same_seed_gives_same_catalog(tmp_path):
+    a = CatalogGenerator(50, seed=7, chunk_size=16, now=NOW)
+    b = CatalogGenerator(50, seed=7, chunk_size=16, now=NOW)
+    assert load(a.write(str(tmp_path / "a.json"))) == load(
+        b.write(str(tmp_path / "b.json"))
+    )
+    other = CatalogGenerator(50, seed=8, chunk_size=16, now=NOW)
+    assert load(other.write(str(tmp_path / "c.json"))) != load(str(tmp_path / "a.json"))
+
+
+def test_records_load_as_books(tmp_path):
+    path = generate_books(str(tmp_path / "books.json"), count=25, seed=1)
+    books = BookRepository(path).get_all_books()
+    assert [b.title for b in books] == [f"Book Title {i}" for i in range(1, 26)]
+    assert len({b.book_id for b in books}) == 25
+    assert all(1.5 <= b.average_rating <= 4.9 for b in books)
+    assert all(b.checkout_history == [] for b in books)
+
+
+def test_jsonl_has_one_record_per_line(tmp_path):
+    path = CatalogGenerator(30, seed=2, chunk_size=7).write(str(tmp_path / "b.jsonl"))
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 30
+    Book.from_records(records)
+
+
+def test_empty_catalog_is_valid(tmp_path):
+    assert load(CatalogGenerator(0).write(str(tmp_path / "b.json"))) == []
+
+
+def test_histories_match_availability(tmp_path):
+    gen = CatalogGenerator(200, seed=3, histories=True, now=NOW)
+    for record in load(gen.write(str(tmp_path / "b.json"))):
+        history = record["checkout_history"]
+        actions = [e["action"] for e in history]
+        assert actions == ["checkout", "checkin"] * (len(actions) // 2) + (
+            ["checkout"] if len(actions) % 2 else []
+        )
+        assert [e["timestamp"] for e in history] == sorted(
+            e["timestamp"] for e in history
+        )
+        if record["available"]:
+            assert record["checked_out_by"] is None
+            assert len(history) % 2 == 0
+        else:
+            assert history[-1]["user_email"] == record["checked_out_by"]
+            assert history[-1]["timestamp"] == record["last_checkout"]
+        for out, back in zip(history[::2], history[1::2]):
+            assert out["user_email"] == back["user_email"]
+
+
+def test_zipf_skews_genres(tmp_path):
+    gen = CatalogGenerator(2000, seed=4, zipf=1.5)
+    genres = Counter(r["genre"] for r in load(gen.write(str(tmp_path / "b.json"))))
+    counts = [n for _, n in genres.most_common()]
+    assert counts[0] > 3 * counts[-1]
+
+
+def test_snapshot_is_written_alongside_and_fresh(tmp_path):
+    path = str(tmp_path / "books.json")
+    CatalogGenerator(40, seed=5).write(path, snapshot=True)
+    repo = BookRepository(path)
+    saved = ColumnarSnapshot.load(ColumnarSnapshot.path_for(path))
+    rebuilt = ColumnarSnapshot.from_repository(repo)
+    assert ColumnarSnapshot.for_repository(repo).signature == saved.signature
+    pd = pytest.importorskip("pandas")
+    pd.testing.assert_frame_equal(
+        saved.to_frame().astype({"genre": str, "author": str}),
+        rebuilt.to_frame().astype({"genre": str, "author": str}),
+        check_categorical=False,
+    )
+
+
+def test_npz_output(tmp_path):
+    path = CatalogGenerator(12, seed=6).write(str(tmp_path / "books.npz"))
+    assert len(ColumnarSnapshot.load(path)) == 12
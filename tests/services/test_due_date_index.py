@@ -0,0 +1,111 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.domain.book import Book
+from src.services.book_service import BookService
+from src.services.due_date_index import DueDateIndex, parse_due
+from src.services.reminder_scheduler import OutboxSink, ReminderScheduler
+from tests.mocks.mock_book_repository import MockBookRepo
+
+NOW = datetime(2026, 1, 1, 9, 0)
+
+
+def day(n: int) -> str:
+    return (NOW + timedelta(days=n)).isoformat()
+
+
+def test_pop_due_takes_each_live_loan_once_in_order():
+    index = DueDateIndex()
+    index.add("a", "a@x.io", day(10))
+    index.add("b", "b@x.io", day(3))
+    index.add("c", "c@x.io", day(5))
+    index.add("c", "c@x.io", day(30))  # re-checkout replaces the loan
+    index.remove("b")
+    index.add("d", None, "not a date")
+
+    assert len(index) == 3
+    until = parse_due(day(12))
+    assert [loan.book_id for loan in index.upcoming(until)] == ["a"]
+    assert [loan.book_id for loan in index.pop_due(until)] == ["a"]
+    assert index.pop_due(until) == []
+    assert "a" in index  # still on loan until checked in
+    assert [loan.book_id for loan in index.pop_due(parse_due(day(31)))] == ["c"]
+
+
+def test_upcoming_walks_only_due_part_of_heap():
+    index = DueDateIndex()
+    for i in range(200):
+        index.add(f"b{i}", None, day(i))
+    got = [loan.book_id for loan in index.upcoming(parse_due(day(9)))]
+    assert got == [f"b{i}" for i in range(10)]
+
+
+def test_service_keeps_index_current_and_rebuild_matches():
+    repo = MockBookRepo()
+    books = [Book(title=f"T{i}", author="A") for i in range(3)]
+    repo.add_books(books)
+    svc = BookService(repo, due_dates=DueDateIndex())
+    svc.check_out(books[0].book_id, user_email="a@x.io", due_date=day(2))
+    svc.check_out(books[1].book_id, user_email="b@x.io", due_date=day(4))
+    svc.circulate_books(
+        [
+            {"action": "check_in", "book_id": books[1].book_id},
+            {"action": "check_out", "book_id": books[2].book_id, "due_date": day(1)},
+        ]
+    )
+    svc.delete_book(books[0].book_id)
+
+    assert [l.book_id for l in svc.due_dates.upcoming(parse_due(day(9)))] == [
+        books[2].book_id
+    ]
+    rebuilt = DueDateIndex.from_books(repo.iter_books())
+    assert rebuilt.get(books[2].book_id) == svc.due_dates.get(books[2].book_id)
+    assert len(rebuilt) == 1
+
+
+class FlakySink:
+    def __init__(self):
+        self.batches = []
+        self.fail = True
+
+    def send(self, reminders):
+        if self.fail:
+            self.fail = False
+            raise OSError("mailer down")
+        self.batches.append(reminders)
+
+
+def test_scheduler_sends_within_lead_and_requeues_on_failure():
+    index = DueDateIndex()
+    for i in range(5):
+        index.add(f"b{i}", f"u{i}@x.io", day(i * 3))
+    sink = FlakySink()
+    scheduler = ReminderScheduler(index, sink, batch_size=2, clock=lambda: NOW)
+
+    with pytest.raises(OSError):
+        scheduler.run_once()
+    assert scheduler.run_once() == 3  # due on days 0, 3, 6
+    assert [[r["book_id"] for r in batch] for batch in sink.batches] == [
+        ["b0", "b1"],
+        ["b2"],
+    ]
+    assert scheduler.run_once() == 0
+    assert scheduler.run_once(NOW + timedelta(days=6)) == 2
+
+
+def test_outbox_sink_appends_jsonl(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    index = DueDateIndex()
+    index.add("b1", "a@x.io", day(1))
+    ReminderScheduler(index, OutboxSink(str(path))).run_once(NOW)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines == [
+        {
+            "book_id": "b1",
+            "user_email": "a@x.io",
+            "due_date": day(1),
+            "sent_at": NOW.isoformat(),
+        }
+    ]
@@ -0,0 +1,39 @@
+import math
+
+import pytest
+
+from src.domain.book import Book
+from src.repositories.book_repository import BookRepository
+from src.repositories.sharded_book_repository import ShardedBookRepository
+from src.services.book_analytics_service import BookAnalyticsService
+from src.services.book_generator_service import generate_books
+
+
+@pytest.fixture()
+def sharded(tmp_path):
+    path = tmp_path / "catalog.json"
+    generate_books(str(path), count=600, seed=5)
+    books = BookRepository(str(path)).get_all_books()
+    books.append(Book(title="odd", author="x", genre=None, price_usd=None))
+    repo = ShardedBookRepository(str(tmp_path / "shards"), shards=3)
+    repo.add_books(books)
+    return repo, books
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_sharded_aggregates_match_dataframe_methods(sharded, parallel):
+    repo, books = sharded
+    svc = BookAnalyticsService()
+    got = svc.sharded_aggregates(repo, parallel=parallel, max_workers=2)
+
+    assert math.isclose(got["average_price"], svc.average_price(books))
+    want = svc.bayesian_weighted_by_genre(books).reset_index(drop=True)
+    have = got["bayesian_weighted_by_genre"]
+    assert list(have["genre"]) == list(want["genre"])
+    for column in ("mean_average_rating", "median_ratings_count", "weighted_rating"):
+        assert have[column].tolist() == pytest.approx(want[column].tolist())
+
+    df = svc.cleaned_frame(books)
+    years = df["publication_year"].dropna().value_counts().sort_index()
+    assert got["books_by_year"].to_dict() == years.to_dict()
+    assert got["books_by_genre"].to_dict() == df["genre"].value_counts().to_dict()
@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from src.domain.book import Book
+from src.services.book_analytics_service import BookAnalyticsService
+from src.services.top_k import StreamingTopK, top_k_indices
+
+
+def reference(values, k):
+    # stable descending sort, NaN last in position order
+    finite = sorted(
+        (i for i, v in enumerate(values) if not np.isnan(v)), key=lambda i: -values[i]
+    )
+    nan = [i for i, v in enumerate(values) if np.isnan(v)]
+    return (finite + nan)[:k]
+
+
+@pytest.mark.parametrize("k", [0, 1, 5, 50, 500])
+def test_top_k_indices_matches_stable_sort(k):
+    rng = np.random.default_rng(5)
+    values = rng.integers(0, 20, size=300).astype(float)
+    values[rng.integers(0, 300, size=30)] = np.nan
+    values[:3] = [np.inf, -np.inf, np.inf]
+    assert top_k_indices(values, k).tolist() == reference(values.tolist(), k)
+
+
+def test_streaming_top_k_matches_single_pass():
+    rng = np.random.default_rng(9)
+    values = rng.integers(0, 50, size=1000).astype(float)
+    top = StreamingTopK(7)
+    for start in range(0, 1000, 64):
+        chunk = values[start : start + 64]
+        top.push(chunk, range(start, start + len(chunk)))
+    assert [key for key, _ in top.result()] == reference(values.tolist(), 7)
+
+
+def make_books(n=300):
+    rng = random.Random(2)
+    return [
+        Book(
+            title=f"Book {i}",
+            author="A",
+            average_rating=rng.choice([None, round(rng.uniform(1, 5), 1)]),
+            ratings_count=rng.randint(0, 3000),
+            price_usd=rng.choice([None, 0.0, round(rng.uniform(5, 50), 2)]),
+        )
+        for i in range(n)
+    ]
+
+
+def test_analytics_top_k_agrees_with_full_sort():
+    svc = BookAnalyticsService()
+    books = make_books()
+
+    top = svc.top_rated(books, min_ratings=1000, limit=15)
+    df = svc.cleaned_frame(books)
+    expected = (
+        df[df["ratings_count"] >= 1000]
+        .sort_values("average_rating", ascending=False, kind="stable")
+        .head(15)
+    )
+    assert [r["book_id"] for r in top] == list(expected["book_id"])
+
+    scores = svc.value_scores(books)
+    best = sorted(scores.items(), key=lambda kv: -kv[1])[:10]
+    assert list(svc.top_value_scores(books, 10).items()) == best
+
+
+def test_streaming_variants_match_frame_variants():
+    svc = BookAnalyticsService()
+    books = make_books()
+
+    streamed = svc.stream_top_rated(iter(books), min_ratings=1000, chunk_size=37)
+    assert [r["book_id"] for r in streamed] == [
+        r["book_id"] for r in svc.top_rated(books, min_ratings=1000)
+    ]
+    assert svc.stream_top_value_scores(iter(books), chunk_size=37) == (
+        svc.top_value_scores(books)
+    )
+
+
+def test_value_score_variants_both_drop_nan_scores():
+    svc = BookAnalyticsService()
+    # 0 * log1p(10) / 0 is NaN
+    free = Book(
+        title="Free", author="A", average_rating=0.0, ratings_count=10, price_usd=0.0
+    )
+    books = [free] + [
+        Book(title=f"B{i}", author="A", average_rating=i, ratings_count=10, price_usd=1)
+        for i in range(1, 4)
+    ]
+
+    top = svc.top_value_scores(books, limit=10)
+    assert free.book_id not in top
+    assert len(top) == 3
+    assert svc.stream_top_value_scores(iter(books), limit=10) == top
@@ -0,0 +1,46 @@
+import json
+
+from benchmarks.suite import BASELINE, compare, main
+
+
+def results(**cases):
+    return {
+        "results": {
+            name: {"p50_ms": p50, "throughput": throughput}
+            for name, (p50, throughput) in cases.items()
+        }
+    }
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = results(fast=(10.0, 100.0), steady=(10.0, 100.0), gone=(1.0, 1.0))
+    current = results(fast=(13.0, 70.0), steady=(12.0, 90.0), new=(99.0, 1.0))
+
+    regressions = compare(current, baseline, tolerance=0.25)
+    assert regressions == [
+        "fast: p50 10.000 -> 13.000 ms",
+        "fast: throughput 100.0 -> 70.0/s",
+    ]
+    assert compare(current, baseline, tolerance=0.5) == []
+
+
+def test_committed_baseline_is_the_default():
+    with open(BASELINE, encoding="utf-8") as f:
+        baseline = json.load(f)
+    assert all(
+        {"p50_ms", "throughput"} <= stats.keys()
+        for stats in baseline["results"].values()
+    )
+    # a run that matches the baseline exactly passes it
+    assert compare(baseline, baseline, tolerance=0.0) == []
+
+
+def test_main_fails_on_a_regression(tmp_path, monkeypatch, capsys):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results(case=(1.0, 1000.0))))
+    monkeypatch.setattr("benchmarks.suite.run", lambda args: results(case=(5.0, 200.0)))
+
+    argv = ["--output", str(tmp_path / "out.json"), "--baseline", str(baseline)]
+    assert main(argv) == 1
+    assert "REGRESSION case: p50" in capsys.readouterr().out
+    assert main(argv[:2] + ["--no-baseline"]) == 0
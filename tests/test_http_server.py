@@ -0,0 +1,154 @@
+import asyncio
+import json
+
+from src.domain.book import Book
+from src.http_server import BookHTTPServer
+from src.repositories.cached_book_repository import CachedBookRepository
+from src.services.book_service import BookService
+from src.services.due_date_index import DueDateIndex
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n"
+        "Connection: close\r\n\r\n".encode() + data
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def serve(tmp_path, scenario, **options):
+    repo = CachedBookRepository(str(tmp_path / "books.json"))
+    service = BookService(repo)
+    book = Book(title="Dune", author="Herbert")
+    service.add_book(book)
+
+    async def main():
+        server = BookHTTPServer(service, port=0, **options)
+        await server.start()
+        try:
+            return await scenario(server, book.book_id)
+        finally:
+            await server.close()
+
+    return asyncio.run(main()), repo
+
+
+def test_crud_and_search(tmp_path):
+    async def scenario(server, book_id):
+        port = server.port
+        assert (await request(port, "GET", f"/books/{book_id}"))[1]["title"] == "Dune"
+        status, added = await request(
+            port, "POST", "/books", {"title": "Emma", "author": "Austen"}
+        )
+        assert status == 201 and added["title"] == "Emma"
+        status, updated = await request(
+            port, "PATCH", f"/books/{added['book_id']}", {"price_usd": 9.5}
+        )
+        assert status == 200 and updated["price_usd"] == 9.5
+        status, found = await request(port, "GET", "/books/search?q=em")
+        assert [b["title"] for b in found] == ["Emma"]
+        status, found = await request(
+            port, "GET", "/books?price_usd__gte=9&sort=-title"
+        )
+        assert status == 200 and [b["title"] for b in found] == ["Emma"]
+        assert (await request(port, "GET", "/books?colour=red"))[0] == 400
+        assert len((await request(port, "GET", "/books?limit=1"))[1]) == 1
+        assert (await request(port, "DELETE", f"/books/{added['book_id']}"))[0] == 200
+        assert (await request(port, "GET", f"/books/{added['book_id']}"))[0] == 404
+        assert (await request(port, "POST", "/books", {"nope": 1}))[0] == 400
+        assert (await request(port, "PUT", "/books"))[0] == 405
+
+    serve(tmp_path, scenario)
+
+
+def test_concurrent_checkouts_share_one_write(tmp_path):
+    async def scenario(server, book_id):
+        port = server.port
+        ids = []
+        for i in range(20):
+            _, book = await request(
+                port, "POST", "/books", {"title": f"B{i}", "author": "A"}
+            )
+            ids.append(book["book_id"])
+        batches = server.writes.batches
+        responses = await asyncio.gather(
+            *(
+                request(port, "POST", f"/books/{i}/checkout", {"user_email": "u@x"})
+                for i in ids + [ids[0]]
+            )
+        )
+        statuses = sorted(status for status, _ in responses)
+        assert statuses == [200] * 20 + [409]
+        # far fewer writes than requests
+        assert server.writes.batches - batches < 5
+        return ids
+
+    ids, repo = serve(tmp_path, scenario, window=0.05)
+    repo.invalidate()
+    assert all(not repo.get_book_by_id(i).available for i in ids)
+    assert repo.get_book_by_id(ids[0]).checked_out_by == "u@x"
+
+
+def test_history_routes_page(tmp_path):
+    async def scenario(server, book_id):
+        port = server.port
+        for path in ("checkout", "checkin", "checkout"):
+            await request(
+                port, "POST", f"/books/{book_id}/{path}", {"user_email": "a@x.io"}
+            )
+        status, book = await request(port, "GET", f"/books/{book_id}")
+        assert status == 200 and "checkout_history" not in book
+        status, page = await request(
+            port, "GET", f"/books/{book_id}/history?offset=1&limit=5"
+        )
+        assert status == 200
+        assert [e["action"] for e in page] == ["checkin", "checkout"]
+        status, page = await request(port, "GET", "/users/a%40x.io/history?limit=2")
+        assert [e["book_id"] for e in page] == [book_id, book_id]
+        assert (await request(port, "GET", "/books/missing/history"))[0] == 404
+
+    serve(tmp_path, scenario)
+
+
+def test_bad_request_fails_alone_in_its_batch(tmp_path):
+    path = str(tmp_path / "books.json")
+    repo = CachedBookRepository(path, history_path=path + ".history.jsonl")
+    service = BookService(repo, due_dates=DueDateIndex())
+    dune, emma = Book(title="Dune", author="A"), Book(title="Emma", author="A")
+    service.add_books([dune, emma])
+
+    async def main():
+        server = BookHTTPServer(service, port=0, window=0.05)
+        await server.start()
+        port = server.port
+        try:
+            return await asyncio.gather(
+                request(
+                    port,
+                    "POST",
+                    f"/books/{dune.book_id}/checkout",
+                    {"user_email": "u@x"},
+                ),
+                # history is append-only, so this PATCH is rejected...
+                request(
+                    port, "PATCH", f"/books/{dune.book_id}", {"checkout_history": []}
+                ),
+                # ...while this one, coalesced into the same write, still lands
+                request(port, "PATCH", f"/books/{emma.book_id}", {"price_usd": 5.0}),
+            )
+        finally:
+            await server.close()
+
+    (s1, out), (s2, bad), (s3, good) = asyncio.run(main())
+    assert s1 == 200 and out["checked_out_by"] == "u@x"
+    assert s2 == 400 and "append-only" in bad["error"]
+    assert s3 == 200 and good["price_usd"] == 5.0
+    assert service.due_dates.get(dune.book_id) is not None
+    stored = CachedBookRepository(path).get_book_by_id(dune.book_id)
+    assert stored.checked_out_by == "u@x"
@@ -0,0 +1,89 @@
+import pytest
+
+from src.domain.book import Book
+from src.instrumentation import Metrics, metrics
+from src.repositories.book_repository import BookRepository
+from src.services.book_service import BookService
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics()
+    calls = []
+    fn = m.timed("op")(lambda x: calls.append(x) or x)
+    with m.timer("block"):
+        pass
+    m.count("bytes", 10)
+    assert fn(3) == 3 and calls == [3]
+    assert m.snapshot() == {"timers": {}, "counters": {}}
+
+
+def test_timers_and_counters():
+    m = Metrics(enabled=True, max_samples=3)
+    fn = m.timed("op")(lambda: None)
+    for _ in range(5):
+        fn()
+    with m.timer("block"):
+        pass
+    m.count("bytes", 10)
+    m.count("bytes", 5)
+
+    snap = m.snapshot()
+    assert snap["timers"]["op"]["count"] == 5
+    assert snap["timers"]["block"]["count"] == 1
+    assert snap["timers"]["op"]["p50_ms"] <= snap["timers"]["op"]["max_ms"]
+    assert snap["counters"] == {"bytes": 15}
+    assert len(m._samples["op"]) == 3
+    assert "op" in m.report()
+
+
+def test_timed_records_calls_that_raise():
+    m = Metrics(enabled=True)
+
+    @m.timed("boom")
+    def boom():
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        boom()
+    assert m.snapshot()["timers"]["boom"]["count"] == 1
+
+
+def test_profile_capture():
+    m = Metrics()
+    m.start_profile()
+    assert m.profiling
+    sum(range(1000))
+    out = m.stop_profile()
+    assert "function calls" in out
+    assert not m.profiling
+    assert m.stop_profile() == "No profile running"
+
+
+def test_repository_and_service_are_instrumented(tmp_path, enabled_metrics):
+    svc = BookService(BookRepository(str(tmp_path / "books.json")))
+    book_id = svc.add_book(Book(title="Dune", author="Herbert"))
+    svc.get_book_by_id(book_id)
+    svc.get_all_books()
+
+    snap = enabled_metrics.snapshot()
+    for name in (
+        "service.add_book",
+        "service.get_book_by_id",
+        "repo.read",
+        "repo.parse",
+        "repo.serialize",
+        "repo.write",
+        "repo.from_records",
+    ):
+        assert snap["timers"][name]["count"] >= 1, name
+    assert snap["counters"]["repo.bytes_written"] > 0
+    assert snap["counters"]["repo.bytes_read"] > 0
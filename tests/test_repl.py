@@ -0,0 +1,81 @@
+import subprocess
+import sys
+
+import pytest
+
+import src.repl as repl
+from tests.mocks.mock_book_repository import MockBookRepo
+from src.services.book_service import BookService
+
+HEAVY = ("pandas", "numpy", "matplotlib", "requests")
+
+
+def test_importing_repl_does_not_load_heavy_dependencies():
+    code = (
+        "import sys, src.repl; "
+        f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
+
+
+def test_catalog_generated_only_when_missing_or_requested(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(repl, "generate_books", lambda path: calls.append(path))
+    monkeypatch.setattr(repl.BookREPL, "start", lambda self: None)
+    catalog = tmp_path / "books.json"
+
+    repl.main(["--catalog", str(catalog)])
+    assert calls == [str(catalog)]
+
+    catalog.write_text("[]", encoding="utf-8")
+    repl.main(["--catalog", str(catalog)])
+    assert len(calls) == 1
+
+    repl.main(["--catalog", str(catalog), "--generate"])
+    assert len(calls) == 2
+
+
+def test_analytics_service_created_on_first_use(monkeypatch):
+    analytics = pytest.importorskip("src.services.book_analytics_service")
+    built = []
+
+    class CountingAnalyticsService(analytics.BookAnalyticsService):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            built.append(self)
+
+    monkeypatch.setattr(analytics, "BookAnalyticsService", CountingAnalyticsService)
+    shell = repl.BookREPL(BookService(MockBookRepo()))
+    assert shell._book_analytics_svc is None
+    assert built == []
+
+    svc = shell.book_analytics_svc
+    assert isinstance(svc, analytics.BookAnalyticsService)
+    assert shell.book_analytics_svc is svc
+    assert built == [svc]
+
+
+def test_stats_command(capsys):
+    from src.instrumentation import metrics
+
+    shell = repl.BookREPL(BookService(MockBookRepo()))
+    try:
+        shell.handle_command("stats on")
+        shell.book_svc.find_book_by_name("x")
+        shell.handle_command("stats")
+        out = capsys.readouterr().out
+        assert "service.find_book_by_name" in out
+
+        shell.handle_command("stats reset")
+        shell.handle_command("stats")
+        assert "No metrics recorded" in capsys.readouterr().out
+
+        shell.handle_command("stats profile")
+        shell.handle_command("stats profile")
+        assert "function calls" in capsys.readouterr().out
+    finally:
+        metrics.disable()
+        metrics.reset()